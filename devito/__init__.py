@@ -10,9 +10,12 @@ from devito.finite_difference import *  # noqa
 from devito.grid import *  # noqa
 from devito.logger import error, warning, info, set_log_level  # noqa
 from devito.parameters import *  # noqa
+from devito.scheduler import *  # noqa
+from devito.streaming import *  # noqa
 from devito.tools import *  # noqa
 
-from devito.compiler import compiler_registry
+from devito.compiler import compiler_registry, default_jit_dir
+from devito.operator import compile_operators  # noqa
 from devito.backends import backends_registry, init_backend
 
 
@@ -34,6 +37,13 @@ def _cast_and_update_compiler(val):
 configuration.add('openmp', 0, [0, 1], callback=_cast_and_update_compiler)
 configuration.add('debug_compiler', 0, [0, 1], lambda i: bool(i))
 
+# Where to store JIT-compiled shared objects across Python processes (0 disables
+# the persistent cache, thus resorting to a process-private temporary directory)
+configuration.add('jit_cache', default_jit_dir())
+
+# How many compilations may be carried out concurrently in the background
+configuration.add('jit_workers', os.cpu_count() or 1)
+
 # ... then the backend configuration. The order is important since the
 # backend might depend on the compiler configuration.
 configuration.add('backend', 'core', list(backends_registry),
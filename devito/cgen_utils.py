@@ -156,6 +156,23 @@ class CodePrinter(C99CodePrinter):
     def _print_IntDiv(self, expr):
         return str(expr)
 
+    def _print_Max(self, expr):
+        """Print max using the ternary operator, which, unlike ``fmax``, is
+        suitable for integer expressions such as loop bounds."""
+        if len(expr.args) == 1:
+            return self._print(expr.args[0])
+        lhs = self._print(expr.args[0])
+        rhs = self._print(expr.func(*expr.args[1:]))
+        return "((%s > %s) ? %s : %s)" % (lhs, rhs, lhs, rhs)
+
+    def _print_Min(self, expr):
+        """Print min using the ternary operator; see ``_print_Max``."""
+        if len(expr.args) == 1:
+            return self._print(expr.args[0])
+        lhs = self._print(expr.args[0])
+        rhs = self._print(expr.func(*expr.args[1:]))
+        return "((%s < %s) ? %s : %s)" % (lhs, rhs, lhs, rhs)
+
 
 def ccode(expr, **settings):
     """Generate C++ code from an expression calling CodePrinter class
@@ -1,10 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import partial
 from hashlib import sha1
-from os import environ, path
-from tempfile import mkdtemp
+from os import environ, getuid, path
+from tempfile import gettempdir, mkdtemp
 from time import time
 from sys import platform
 from distutils import version
+import fcntl
+import os
+import shutil
 import subprocess
 
 import numpy.ctypeslib as npct
@@ -12,11 +17,12 @@ from codepy.jit import extension_file_from_string
 from codepy.toolchain import GCCToolchain
 
 from devito.exceptions import CompilationError
-from devito.logger import log
+from devito.logger import DEBUG, log
 from devito.parameters import configuration
 from devito.tools import change_directory, sniff_compiler_version
 
-__all__ = ['jit_compile', 'load', 'make', 'GNUCompiler']
+__all__ = ['jit_compile', 'jit_executor', 'load', 'make', 'clear_jit_cache',
+           'GNUCompiler']
 
 
 class Compiler(GCCToolchain):
@@ -215,6 +221,82 @@ def get_tmp_dir():
     return _devito_compiler_tmpdir
 
 
+def default_jit_dir():
+    """Return the default location of the persistent JIT cache."""
+    return path.join(gettempdir(), "devito-jitcache-uid%d" % getuid())
+
+
+def get_jit_dir():
+    """
+    Return the directory in which JIT-compiled shared objects are stored.
+
+    If ``configuration['jit_cache']`` is disabled (set to 0), a fresh,
+    process-private temporary directory is used, which implies that identical
+    kernels are recompiled by each Python process.
+    """
+    cachedir = configuration['jit_cache']
+    if not cachedir:
+        return get_tmp_dir()
+    if not path.isdir(cachedir):
+        try:
+            os.makedirs(cachedir)
+        except FileExistsError:
+            # Created in the meanwhile by a concurrent process
+            pass
+    return cachedir
+
+
+def jit_hash(ccode, compiler):
+    """
+    Return a key uniquely identifying the shared object obtained by compiling
+    ``ccode`` through ``compiler``. Besides the source code, the key accounts for
+    the compiler class, the compiler version and all of the compilation flags.
+    """
+    key = [str(ccode), compiler.__class__.__name__, compiler.cc, str(compiler.version)]
+    key.extend(' '.join(i) for i in [compiler.cflags, compiler.ldflags,
+                                     compiler.include_dirs, compiler.libraries,
+                                     compiler.library_dirs, compiler.defines,
+                                     compiler.undefines])
+    return sha1('\n'.join(key).encode()).hexdigest()
+
+
+@contextmanager
+def jit_lock(basename, blocking=True):
+    """
+    Acquire an exclusive file lock on the JIT cache entry ``basename``, thus
+    preventing concurrent processes from compiling the same kernel at the same
+    time. If ``blocking=False``, yield False rather than waiting when the lock
+    is held by someone else.
+
+    The lock file may be removed by its holder (see :func:`evict_jit_cache`),
+    so once acquired the lock is only retained if the lock file is still in
+    place; otherwise, a fresh lock file is created and locked.
+    """
+    lockfile = "%s.lock" % basename
+    while True:
+        f = open(lockfile, "w")
+        try:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else
+                            fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                if os.stat(lockfile).st_ino != os.fstat(f.fileno()).st_ino:
+                    # Removed (and possibly recreated) while we were waiting
+                    continue
+            except FileNotFoundError:
+                continue
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            return
+        finally:
+            f.close()
+
+
 def load(basename, compiler):
     """Load a compiled library
 
@@ -225,35 +307,195 @@ def load(basename, compiler):
     return npct.load_library(basename, '.')
 
 
+def jit_executor():
+    """
+    Return the pool of ``configuration['jit_workers']`` threads to which
+    background JIT compilation is submitted. As the actual compilation is
+    carried out by a separate (compiler) process, threads suffice to overlap
+    multiple compilations with each other as well as with Python.
+    """
+    global _jit_executor
+    executor, nworkers = _jit_executor
+    if nworkers != configuration['jit_workers']:
+        if executor is not None:
+            # Any pending compilation will complete nonetheless
+            executor.shutdown(wait=False)
+        nworkers = configuration['jit_workers']
+        _jit_executor = (ThreadPoolExecutor(max_workers=nworkers), nworkers)
+    return _jit_executor[0]
+
+
+def jit_files(ccode, compiler):
+    """
+    Return the JIT cache key of ``ccode`` as well as the paths of the source
+    file and of the shared object, which may or may not exist yet.
+    """
+    hash_key = jit_hash(ccode, compiler)
+    basename = path.join(get_jit_dir(), hash_key)
+
+    src_file = "%s.%s" % (basename, compiler.src_ext)
+    if platform == "linux" or platform == "linux2":
+        lib_ext = "so"
+    elif platform == "darwin":
+        lib_ext = "dylib"
+    elif platform == "win32" or platform == "win64":
+        lib_ext = "dll"
+    lib_file = "%s.%s" % (basename, lib_ext)
+
+    return hash_key, src_file, lib_file
+
+
 def jit_compile(ccode, compiler):
     """JIT compile the given ccode.
 
+    The generated shared object is stored in a persistent, on-disk cache
+    (see ``configuration['jit_cache']``), keyed on source code, compiler and
+    compilation flags. If a matching shared object is already available,
+    perhaps produced by a different Python process, compilation is skipped.
+
     :param ccode: String of C source code.
     :param compiler: The toolchain used for compilation.
 
     :return: The name of the compilation unit.
     """
-    hash_key = sha1(str(ccode).encode()).hexdigest()
-    basename = path.join(get_tmp_dir(), hash_key)
+    def build(src_file, lib_file):
+        tic = time()
+        extension_file_from_string(toolchain=compiler, ext_file=lib_file,
+                                   source_string=ccode, source_name=src_file,
+                                   debug=configuration['debug_compiler'])
+        toc = time()
+        log("%s: compiled %s [%.2f s]" % (compiler, src_file, toc-tic))
 
-    src_file = "%s.%s" % (basename, compiler.src_ext)
-    if platform == "linux" or platform == "linux2":
-        lib_file = "%s.so" % basename
-    elif platform == "darwin":
-        lib_file = "%s.dylib" % basename
-    elif platform == "win32" or platform == "win64":
-        lib_file = "%s.dll" % basename
+    return jit_insert(ccode, compiler, build)
 
-    tic = time()
-    extension_file_from_string(toolchain=compiler, ext_file=lib_file,
-                               source_string=ccode, source_name=src_file,
-                               debug=configuration['debug_compiler'])
-    toc = time()
-    log("%s: compiled %s [%.2f s]" % (compiler, src_file, toc-tic))
+
+def jit_insert(ccode, compiler, build):
+    """
+    Insert into the JIT cache the shared object obtained from ``ccode``, unless
+    already there.
+
+    :param ccode: String of C source code.
+    :param compiler: The toolchain used for compilation.
+    :param build: Either a callable, which receives the paths of a source file
+                  and of a shared object and must create the latter, or the
+                  shared object itself, as a sequence of bytes (e.g., because
+                  compiled by another process or machine).
+
+    :return: The name of the compilation unit.
+    """
+    hash_key, src_file, lib_file = jit_files(ccode, compiler)
+    cachedir, basename = path.dirname(lib_file), path.splitext(lib_file)[0]
+
+    with jit_lock(basename):
+        if path.exists(lib_file):
+            # Mark as recently used, so that it will outlive eviction
+            os.utime(lib_file)
+            log("%s: cache hit %s" % (compiler, lib_file), DEBUG)
+            return basename
+
+        # Create within a private directory, then atomically move the
+        # shared object into the cache, so that no other process may ever
+        # load a partially written file
+        tmpdir = mkdtemp(prefix="tmp-", dir=cachedir)
+        try:
+            tmp_src_file = path.join(tmpdir, path.basename(src_file))
+            tmp_lib_file = path.join(tmpdir, path.basename(lib_file))
+
+            if callable(build):
+                build(tmp_src_file, tmp_lib_file)
+            else:
+                with open(tmp_src_file, 'w') as f:
+                    f.write(str(ccode))
+                with open(tmp_lib_file, 'wb') as f:
+                    f.write(build)
+
+            os.rename(tmp_src_file, src_file)
+            os.rename(tmp_lib_file, lib_file)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if cachedir != get_tmp_dir():
+        evict_jit_cache(cachedir, exclude=hash_key)
 
     return basename
 
 
+def jit_cache_entries(cachedir):
+    """
+    Return a list of ``(hash_key, files, mtime, size)`` tuples, one for each
+    complete entry in the JIT cache ``cachedir``, sorted from the least to the
+    most recently used.
+    """
+    entries = {}
+    for i in os.listdir(cachedir):
+        filename = path.join(cachedir, i)
+        if not path.isfile(filename):
+            continue
+        key, ext = path.splitext(i)
+        entries.setdefault(key, []).append((filename, ext))
+
+    ret = []
+    for key, files in entries.items():
+        libs = [f for f, ext in files if ext in ('.so', '.dylib', '.dll')]
+        if not libs:
+            # Either not a cache entry or currently being compiled
+            continue
+        try:
+            mtime = path.getmtime(libs[0])
+            size = sum(path.getsize(f) for f, ext in files if ext != '.lock')
+        except OSError:
+            # Evicted in the meanwhile by a concurrent process
+            continue
+        ret.append((key, [f for f, _ in files], mtime, size))
+
+    return sorted(ret, key=lambda i: i[2])
+
+
+def remove_jit_cache_entry(basename, files):
+    """
+    Remove ``files``, the JIT cache entry ``basename``, along with its lock
+    file. The caller must hold the lock (see :func:`jit_lock`); the lock file
+    goes last, so that it never outlives the entry.
+    """
+    for f in [i for i in files if not i.endswith('.lock')] + ["%s.lock" % basename]:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def evict_jit_cache(cachedir, exclude=None):
+    """
+    Enforce the eviction policy described by ``cache_options`` on the JIT
+    cache ``cachedir``: first, all entries that have not been used for more
+    than ``maxage`` seconds are dropped; then, the least recently used entries
+    are dropped until the cache size falls below ``maxsize`` bytes. Entries
+    locked by a concurrent process, as well as ``exclude``, are never dropped.
+    """
+    entries = jit_cache_entries(cachedir)
+    size = sum(i[3] for i in entries)
+    entries = [i for i in entries if i[0] != exclude]
+
+    now = time()
+    for key, files, mtime, nbytes in entries:
+        if now - mtime <= cache_options['maxage'] and size <= cache_options['maxsize']:
+            # Since /entries/ is sorted by age, nothing else can be evicted
+            break
+        with jit_lock(path.join(cachedir, key), blocking=False) as acquired:
+            if not acquired:
+                continue
+            remove_jit_cache_entry(path.join(cachedir, key), files)
+        size -= nbytes
+
+
+def clear_jit_cache():
+    """Remove all entries from the JIT cache."""
+    cachedir = get_jit_dir()
+    for key, files, _, _ in jit_cache_entries(cachedir):
+        with jit_lock(path.join(cachedir, key)):
+            remove_jit_cache_entry(path.join(cachedir, key), files)
+
+
 def make(loc, args):
     """
     Invoke ``make`` command from within ``loc`` with arguments ``args``.
@@ -298,3 +540,13 @@ compiler_registry = {
 }
 compiler_registry.update({'gcc-%s' % i: partial(GNUCompiler, suffix=i)
                           for i in ['4.9', '5', '6', '7']})
+
+
+cache_options = {
+    'maxsize': 2*1024**3,
+    'maxage': 30*24*60*60
+}
+"""JIT cache eviction policy. ``maxsize`` is in bytes, ``maxage`` in seconds."""
+
+_jit_executor = (None, 0)
+"""The thread pool for background JIT compilation, along with its size."""
@@ -4,15 +4,29 @@ common to all other backends. The ``core`` backend (and therefore the ``base``
 backend as well) are used to run Devito on standard CPU architectures.
 """
 
+from os import path
+
+from devito.compiler import default_jit_dir
 from devito.dle import (BasicRewriter, AdvancedRewriter, AdvancedRewriterSafeMath,
-                        SpeculativeRewriter, init_dle)
+                        AdvancedRewriterTimeTiling, SpeculativeRewriter, init_dle)
 from devito.parameters import Parameters, add_sub_configuration
 
 core_configuration = Parameters('core')
-core_configuration.add('autotuning', 'basic', ['none', 'basic', 'aggressive'])
+core_configuration.add('autotuning', 'basic',
+                       ['none', 'basic', 'aggressive', 'model', 'online'])
+
+# The time, in seconds, that online auto-tuning may spend on the first timesteps
+# of a run before settling on a block shape
+core_configuration.add('autotuning_budget', 1.)
+
+# Where to store the outcome of auto-tuning across Python processes (0 disables
+# the database, thus auto-tuning from scratch upon each ``apply(autotune=True)``)
+core_configuration.add('autotuning_db', path.join(default_jit_dir(), 'autotuning.json'))
 
 env_vars_mapper = {
     'DEVITO_AUTOTUNING': 'autotuning',
+    'DEVITO_AUTOTUNING_DB': 'autotuning_db',
+    'DEVITO_AUTOTUNING_BUDGET': 'autotuning_budget',
 }
 
 add_sub_configuration(core_configuration, env_vars_mapper)
@@ -21,6 +35,7 @@ add_sub_configuration(core_configuration, env_vars_mapper)
 modes = {'basic': BasicRewriter,
          'advanced': AdvancedRewriter,
          'advanced-safemath': AdvancedRewriterSafeMath,
+         'advanced-timetiling': AdvancedRewriterTimeTiling,
          'speculative': SpeculativeRewriter}
 init_dle(modes)
 
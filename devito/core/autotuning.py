@@ -1,16 +1,25 @@
 from __future__ import absolute_import
 
 from collections import OrderedDict
+from ctypes import c_double
 from itertools import combinations
 from functools import reduce
 from operator import mul
+from os import path
+import json
+import os
 import resource
 
-from devito.ir.iet import Iteration, FindNodes, FindSymbols
+from devito.compiler import jit_lock
+from devito.dle import TimeTilingArg, default_nthreads
+from devito.ir.iet import Expression, Iteration, FindNodes, FindSymbols
+from devito.ir.support import Backward
 from devito.logger import info, info_at
 from devito.parameters import configuration
+from devito.profiling import Trace
+from devito.symbolics import estimate_memory
 
-__all__ = ['autotune']
+__all__ = ['autotune', 'autotune_online', 'autotuning_db_fetch', 'autotuning_db_insert']
 
 
 def autotune(operator, arguments, tunable):
@@ -18,7 +27,24 @@ def autotune(operator, arguments, tunable):
     Acting as a high-order function, take as input an operator and a list of
     operator arguments to perform empirical autotuning. Some of the operator
     arguments are marked as tunable.
+
+    Besides the block sizes, the sub-block sizes of a two-level blocking and
+    the runtime arguments controlling the thread-level parallelism (number of
+    threads, loop schedule), if any, are tuned too.
     """
+    # The runtime arguments are tuned once the best block shape is known
+    runtime = OrderedDict([(i.argument.name, i) for i in tunable
+                           if not i.argument.is_Dimension])
+    tunable = [i for i in tunable if i.argument.is_Dimension]
+
+    # Reuse the block shape found by a previous auto-tuning session, if any
+    key = autotuning_db_key(operator, arguments)
+    best = autotuning_db_fetch(key)
+    if best is not None and \
+            set(best) == {i.argument.symbolic_size.name for i in tunable} | set(runtime):
+        info("Auto-tuned block shape (from database): %s" % best)
+        return tuned_arguments(operator, arguments, best)
+
     at_arguments = arguments.copy()
 
     # User-provided output data must not be altered
@@ -27,20 +53,28 @@ def autotune(operator, arguments, tunable):
         if k in output:
             at_arguments[k] = v.copy()
 
+    # The auto-tuning runs must not be traced
+    if Trace.name in at_arguments:
+        at_arguments[Trace.name] = Trace()
+
     iterations = FindNodes(Iteration).visit(operator.body)
     dim_mapper = {i.dim.name: i.dim for i in iterations}
 
     # Shrink the iteration space of time-stepping dimension so that auto-tuner
     # runs will finish quickly
     steppers = [i for i in iterations if i.dim.is_Time]
+    squeezer = options['at_squeezer']
+    if any(isinstance(i, TimeTilingArg) for i in runtime.values()):
+        # Enough timesteps for the largest time tile attempted
+        squeezer = max([squeezer] + options['at_time_tiles'])
     if len(steppers) == 0:
         timesteps = 1
     elif len(steppers) == 1:
         stepper = steppers[0]
         start = at_arguments[stepper.dim.min_name]
-        timesteps = stepper.extent(start=start, finish=options['at_squeezer']) - 1
+        timesteps = stepper.extent(start=start, finish=squeezer) - 1
         if timesteps < 0:
-            timesteps = options['at_squeezer'] - timesteps
+            timesteps = squeezer - timesteps
             info_at("Adjusted auto-tuning timestep to %d" % timesteps)
         at_arguments[stepper.dim.min_name] = start
         at_arguments[stepper.dim.max_name] = timesteps
@@ -53,31 +87,36 @@ def autotune(operator, arguments, tunable):
 
     # Attempted block sizes ...
     mapper = OrderedDict([(i.argument.symbolic_size.name, i) for i in tunable])
+    # ... The sub-blocks are tuned once the best block shape is known
+    subblocks = subblock_parents(mapper)
+    blocks = [i for i in mapper if i not in subblocks]
     # ... Defaults (basic mode)
-    blocksizes = [OrderedDict([(i, v) for i in mapper]) for v in options['at_blocksize']]
+    blocksizes = [OrderedDict([(i, v) for i in blocks]) for v in options['at_blocksize']]
     # ... Always try the entire iteration space (degenerate block)
     datashape = [at_arguments[mapper[i].original_dim.symbolic_end.name] -
-                 at_arguments[mapper[i].original_dim.symbolic_start.name] for i in mapper]
+                 at_arguments[mapper[i].original_dim.symbolic_start.name] for i in blocks]
     blocksizes.append(OrderedDict([(i, mapper[i].iteration.extent(0, j))
-                      for i, j in zip(mapper, datashape)]))
+                      for i, j in zip(blocks, datashape)]))
     # ... More attempts if auto-tuning in aggressive mode
     if configuration.core['autotuning'] == 'aggressive':
         blocksizes = more_heuristic_attempts(blocksizes)
 
     # How many temporaries are allocated on the stack?
     # Will drop block sizes that might lead to a stack overflow
-    functions = FindSymbols('symbolics').visit(operator.body +
-                                               operator.elemental_functions)
-    stack_shapes = [i.symbolic_shape for i in functions if i.is_Array and i._mem_stack]
-    stack_space = sum(reduce(mul, i, 1) for i in stack_shapes)*operator._dtype().itemsize
+    stack_space = stack_footprint(operator)
 
-    # Note: there is only a single loop over 'blocksize' because only
-    # square blocks are tested
     timings = OrderedDict()
-    for bs in blocksizes:
-        illegal = False
+
+    def run(bs):
+        """Time a run with block shape ``bs``; return None if ``bs`` is illegal."""
+        key = tuple(bs.items())
+        if key in timings:
+            return timings[key]
+
         for k, v in at_arguments.items():
-            if k in bs:
+            if k in runtime:
+                at_arguments[k] = bs.get(k, arguments[k])
+            elif k in bs:
                 val = bs[k]
                 start = at_arguments[mapper[k].original_dim.symbolic_start.name]
                 end = at_arguments[mapper[k].original_dim.symbolic_end.name]
@@ -85,51 +124,326 @@ def autotune(operator, arguments, tunable):
                     at_arguments[k] = val
                 else:
                     # Block size cannot be larger than actual dimension
-                    illegal = True
-                    break
-        if illegal:
-            continue
+                    return None
+        # Unless attempted, sub-blocks are as large as their enclosing blocks
+        for k, v in subblocks.items():
+            if k not in bs:
+                at_arguments[k] = at_arguments[v]
 
         # Make sure we remain within stack bounds, otherwise skip block size
-        dim_sizes = {}
-        for k, v in at_arguments.items():
-            if k in bs:
-                dim_sizes[mapper[k].argument.symbolic_size] = bs[k]
-            elif k in dim_mapper:
-                dim_sizes[dim_mapper[k].symbolic_size] = v
-        try:
-            bs_stack_space = stack_space.xreplace(dim_sizes)
-        except AttributeError:
-            bs_stack_space = stack_space
-        try:
-            if int(bs_stack_space) > options['at_stack_limit']:
-                continue
-        except TypeError:
-            # We should never get here
-            info_at("Couldn't determine stack size, skipping block size %s" % str(bs))
-            continue
+        if not within_stack(stack_space, at_arguments, bs, mapper, dim_mapper):
+            return None
 
         # Use AT-specific profiler structs
         timer = operator.profiler.new()
         at_arguments[operator.profiler.name] = timer
 
         operator.cfunction(*list(at_arguments.values()))
-        elapsed = sum(getattr(timer._obj, i) for i, _ in timer._obj._fields_)
-        timings[tuple(bs.items())] = elapsed
-        info_at("Block shape <%s> took %f (s) in %d time steps" %
-                (','.join('%d' % i for i in bs.values()), elapsed, timesteps))
+        elapsed = sum(getattr(timer._obj, i) for i, dtype in timer._obj._fields_
+                      if dtype is c_double)
+        timings[key] = elapsed
+        shape = ','.join('%d' % v for k, v in bs.items() if k in blocks)
+        setup = ''.join(', %s=%d' % (k, v) for k, v in bs.items()
+                        if k in subblocks or k in runtime)
+        info_at("Block shape <%s>%s took %f (s) in %d time steps" %
+                (shape, setup, elapsed, timesteps))
+        return elapsed
+
+    if configuration.core['autotuning'] == 'model':
+        extents = OrderedDict([(i, mapper[i].iteration.extent(0, j))
+                               for i, j in zip(blocks, datashape)])
+        # The unblocked space dimensions (if any) contribute to a block footprint
+        blocked = [i.original_dim for i in mapper.values()]
+        inner = reduce(mul, [at_arguments[d.max_name] - at_arguments[d.min_name] + 1
+                             for d in set(dim_mapper.values())
+                             if d.is_Space and d not in blocked], 1)
+        exprs = FindNodes(Expression).visit(operator.body + operator.elemental_functions)
+        footprint = estimate_memory([e.expr for e in exprs])*inner
+        footprint *= operator._dtype().itemsize
+        descent(run, model_blockshape(extents, footprint), extents)
+    else:
+        # Note: only square blocks are tested, besides the degenerate block
+        for bs in blocksizes:
+            run(bs)
+
+    # Search the sub-block shape, using the best block shape
+    if subblocks and timings:
+        blockshape = OrderedDict(min(timings, key=timings.get))
+        for attempt in subblock_attempts(blockshape, subblocks):
+            bs = OrderedDict(blockshape)
+            bs.update(attempt)
+            run(bs)
+
+    # Search the thread-level parallelism setup, using the best block shape
+    if runtime and timings:
+        blockshape = OrderedDict(min(timings, key=timings.get))
+        for attempt in runtime_attempts(arguments, runtime):
+            bs = OrderedDict(blockshape)
+            bs.update(attempt)
+            run(bs)
 
     try:
         best = dict(min(timings, key=timings.get))
+        best.update({k: best[v] for k, v in subblocks.items() if k not in best})
+        best.update({k: arguments[k] for k in runtime if k not in best})
         info("Auto-tuned block shape: %s" % best)
     except ValueError:
         info("Auto-tuning request, but couldn't find legal block sizes")
         return arguments
 
-    # Build the new argument list
+    autotuning_db_insert(key, best)
+
+    return tuned_arguments(operator, arguments, best)
+
+
+def autotune_online(operator, arguments, tunable):
+    """
+    Auto-tune ``operator`` while actually running it. The first timesteps are
+    run in chunks of ``options['at_squeezer']`` timesteps, each chunk with a
+    different block shape, until either all block shapes have been attempted or
+    the time budget ``configuration.core['autotuning_budget']`` (in seconds) is
+    exhausted. The remaining timesteps are then run with the fastest block shape.
+
+    Unlike ``autotune``, no data is copied, as the auto-tuning runs are part of
+    the actual computation. The profiling timers in ``arguments`` accumulate the
+    time of all runs. Return the best block shape.
+    """
+    runtime = OrderedDict([(i.argument.name, i) for i in tunable
+                           if not i.argument.is_Dimension])
+    tunable = [i for i in tunable if i.argument.is_Dimension]
+    mapper = OrderedDict([(i.argument.symbolic_size.name, i) for i in tunable])
+    subblocks = subblock_parents(mapper)
+    blocks = [i for i in mapper if i not in subblocks]
+
+    iterations = FindNodes(Iteration).visit(operator.body)
+    dim_mapper = {i.dim.name: i.dim for i in iterations}
+    stack_space = stack_footprint(operator)
+    timer = arguments[operator.profiler.name]
+
+    steppers = [i for i in iterations if i.dim.is_Time]
+    if len(steppers) == 1:
+        stepper = steppers[0]
+        timesteppers = [stepper.dim]
+        if stepper.dim.is_Stepping:
+            timesteppers.append(stepper.dim.parent)
+    else:
+        timesteppers = []
+
+    def run(bs, first=None, last=None):
+        """Run timesteps ``[first, last]`` (by default, all of them) with block
+        shape ``bs``; return the elapsed time, or None if ``bs`` is illegal."""
+        at_arguments = tuned_arguments(operator, arguments, bs)
+        for k, v in subblocks.items():
+            if k not in bs:
+                at_arguments[k] = at_arguments[v]
+        for k in bs:
+            if k in mapper:
+                start = at_arguments[mapper[k].original_dim.symbolic_start.name]
+                end = at_arguments[mapper[k].original_dim.symbolic_end.name]
+                if bs[k] > mapper[k].iteration.extent(start, end):
+                    # Block size cannot be larger than actual dimension
+                    return None
+        if not within_stack(stack_space, at_arguments, bs, mapper, dim_mapper):
+            return None
+        if first is not None:
+            for d in timesteppers:
+                at_arguments[d.min_name] = first
+                at_arguments[d.max_name] = last
+
+        operator.cfunction(*list(at_arguments.values()))
+
+        # Accumulate the time of this run into the actual profiling timers
+        elapsed = 0.
+        for i, dtype in timer._obj._fields_:
+            section = getattr(at_arguments[operator.profiler.name]._obj, i)
+            setattr(timer._obj, i, getattr(timer._obj, i) + section)
+            if dtype is c_double:
+                # A timer, rather than a hardware counter
+                elapsed += section
+        return elapsed
+
+    # Reuse the block shape found by a previous auto-tuning session, if any
+    key = autotuning_db_key(operator, arguments)
+    best = autotuning_db_fetch(key)
+    if best is not None and set(best) == set(mapper) | set(runtime):
+        info("Auto-tuned block shape (from database): %s" % best)
+        run(best)
+        return best
+    elif not timesteppers:
+        info_at("Couldn't understand loop structure, giving up online auto-tuning")
+        run({})
+        return {}
+
+    # Attempted block sizes, as in the basic mode, plus the degenerate block
+    blocksizes = [OrderedDict([(i, v) for i in blocks]) for v in options['at_blocksize']]
+    datashape = [arguments[mapper[i].original_dim.symbolic_end.name] -
+                 arguments[mapper[i].original_dim.symbolic_start.name] for i in blocks]
+    blocksizes.append(OrderedDict([(i, mapper[i].iteration.extent(0, j))
+                      for i, j in zip(blocks, datashape)]))
+
+    # The chunks of timesteps are run along the actual iteration direction
+    start = arguments[stepper.dim.min_name]
+    finish = arguments[stepper.dim.max_name]
+    chunk = options['at_squeezer']
+    budget = float(configuration.core['autotuning_budget'])
+    timings = OrderedDict()
+    done = 0
+
+    def attempt(bs):
+        """Run the next chunk of timesteps with block shape ``bs``."""
+        # At least one chunk of timesteps is left to the best block shape
+        if sum(timings.values()) >= budget or finish - start + 1 - done <= chunk:
+            return
+        if tuple(bs.items()) in timings:
+            # E.g., the degenerate block coincides with one of the default blocks
+            return
+        if stepper.direction is Backward:
+            first, last = finish - done - chunk + 1, finish - done
+        else:
+            first, last = start + done, start + done + chunk - 1
+        elapsed = run(bs, first, last)
+        if elapsed is None:
+            return
+        timings[tuple(bs.items())] = elapsed
+        shape = ','.join('%d' % v for k, v in bs.items() if k in blocks)
+        setup = ''.join(', %s=%d' % (k, v) for k, v in bs.items()
+                        if k in subblocks or k in runtime)
+        info_at("Block shape <%s>%s took %f (s) in %d time steps (online)" %
+                (shape, setup, elapsed, chunk))
+        return chunk
+
+    for bs in blocksizes:
+        done += attempt(bs) or 0
+    if subblocks and timings:
+        blockshape = OrderedDict(min(timings, key=timings.get))
+        for i in subblock_attempts(blockshape, subblocks):
+            bs = OrderedDict(blockshape)
+            bs.update(i)
+            done += attempt(bs) or 0
+    if runtime and timings:
+        blockshape = OrderedDict(min(timings, key=timings.get))
+        for i in runtime_attempts(arguments, runtime):
+            bs = OrderedDict(blockshape)
+            bs.update(i)
+            done += attempt(bs) or 0
+
+    if timings:
+        best = dict(min(timings, key=timings.get))
+        best.update({k: best[v] for k, v in subblocks.items() if k not in best})
+        best.update({k: arguments[k] for k in runtime if k not in best})
+        info("Auto-tuned block shape (online): %s" % best)
+        autotuning_db_insert(key, best)
+    else:
+        info("Online auto-tuning request, but too few time steps or no legal "
+             "block sizes")
+        best = {}
+
+    # Run the remaining timesteps with the best block shape
+    if stepper.direction is Backward:
+        run(best, start, finish - done)
+    else:
+        run(best, start + done, finish)
+
+    return best
+
+
+def stack_footprint(operator):
+    """
+    Return the size, in bytes, of the temporaries ``operator`` allocates on the
+    stack, as a function of the block sizes.
+    """
+    functions = FindSymbols('symbolics').visit(operator.body +
+                                               operator.elemental_functions)
+    stack_shapes = [i.symbolic_shape for i in functions if i.is_Array and i._mem_stack]
+    return sum(reduce(mul, i, 1) for i in stack_shapes)*operator._dtype().itemsize
+
+
+def within_stack(stack_space, arguments, bs, mapper, dim_mapper):
+    """
+    Return True if the temporaries allocated on the stack, whose size is
+    ``stack_space``, fit within the stack limit when using block shape ``bs``.
+    """
+    dim_sizes = {}
+    for k, v in arguments.items():
+        if k in mapper and k in bs:
+            dim_sizes[mapper[k].argument.symbolic_size] = bs[k]
+        elif k in dim_mapper:
+            dim_sizes[dim_mapper[k].symbolic_size] = v
+    try:
+        bs_stack_space = stack_space.xreplace(dim_sizes)
+    except AttributeError:
+        bs_stack_space = stack_space
+    try:
+        return int(bs_stack_space) <= options['at_stack_limit']
+    except TypeError:
+        # We should never get here
+        info_at("Couldn't determine stack size, skipping block size %s" % str(bs))
+        return False
+
+
+def subblock_parents(mapper):
+    """
+    Return a mapper from the sub-block sizes of a two-level blocking to the
+    sizes of the enclosing blocks.
+
+    :param mapper: A mapper from block size names to :class:`BlockingArg`s.
+    """
+    return OrderedDict([(k, v.parent.symbolic_size.name) for k, v in mapper.items()
+                        if v.parent is not None])
+
+
+def subblock_attempts(blockshape, subblocks):
+    """
+    Return the sub-block shapes worth trying within the blocks of ``blockshape``.
+    Sub-blocks as large as their enclosing blocks are not attempted, since
+    that is the case already timed along with ``blockshape``.
+
+    :param blockshape: A mapper from block size names to block sizes.
+    :param subblocks: A mapper from sub-block size names to block size names.
+    """
+    attempts = []
+    for i in options['at_subblocksize']:
+        attempt = OrderedDict([(k, min(i, blockshape[v])) for k, v in subblocks.items()])
+        if any(attempt[k] < blockshape[v] for k, v in subblocks.items()) and \
+                attempt not in attempts:
+            attempts.append(attempt)
+    return attempts
+
+
+def runtime_attempts(arguments, runtime):
+    """
+    Return the runtime setups (number of threads, loop schedule, time tile size)
+    worth trying.
+
+    :param arguments: The arguments the Operator would be run with.
+    :param runtime: A mapper from names to the tunable :class:`RuntimeArg`s.
+    """
+    attempts = []
+    if 'nthreads' in runtime:
+        nthreads = [int(arguments['nthreads']*i) for i in options['at_nthreads']]
+        attempts = [OrderedDict([('nthreads', i)]) for i in nthreads if i > 0]
+    if 'sched_kind' in runtime and 'sched_chunk' in runtime:
+        schedules = [OrderedDict([('sched_kind', kind), ('sched_chunk', chunk)])
+                     for kind, chunk in options['at_schedules']]
+        attempts = [OrderedDict(list(i.items()) + list(j.items()))
+                    for i in attempts or [OrderedDict()] for j in schedules]
+    for k, v in runtime.items():
+        if isinstance(v, TimeTilingArg):
+            attempts = [OrderedDict(list(i.items()) + [(k, j)])
+                        for i in attempts or [OrderedDict()]
+                        for j in options['at_time_tiles']]
+    unique = []
+    for i in attempts:
+        if i not in unique:
+            unique.append(i)
+    return unique
+
+
+def tuned_arguments(operator, arguments, best):
+    """Return a copy of ``arguments`` in which the block sizes are ``best``."""
     tuned = OrderedDict()
     for k, v in arguments.items():
-        tuned[k] = best[k] if k in mapper else v
+        tuned[k] = best.get(k, v)
 
     # Reset the profiling struct
     assert operator.profiler.name in tuned
@@ -138,6 +452,80 @@ def autotune(operator, arguments, tunable):
     return tuned
 
 
+def autotuning_db_key(operator, arguments):
+    """
+    Return a key identifying an auto-tuning problem, that is the JIT-compiled
+    code (hence the compiler and its flags too), the problem shape, the number
+    of threads, the target platform and the auto-tuning mode.
+    """
+    code = path.basename(operator.compile)
+    # The problem shape is given by both the iteration space and the data
+    # shapes (e.g., the number of time buffers is not hard-coded in the code)
+    shape = [(d.name, arguments[d.max_name] - arguments[d.min_name] + 1)
+             for d in operator.dimensions
+             if not d.is_Time and d.min_name in arguments and d.max_name in arguments]
+    shape.extend((p.name, arguments[p.name].shape) for p in operator.parameters
+                 if p.is_Tensor)
+    if 'nthreads' in arguments:
+        nthreads = int(arguments['nthreads'])
+    elif configuration['openmp']:
+        nthreads = default_nthreads()
+    else:
+        nthreads = 1
+    platform = [configuration['platform'], configuration['isa']]
+    return json.dumps([code, shape, nthreads, platform,
+                       configuration.core['autotuning']])
+
+
+def autotuning_db_fetch(key):
+    """
+    Return the block shape stored in the auto-tuning database for ``key``,
+    or None if ``key`` was never auto-tuned (or if the database is disabled).
+    """
+    dbfile = configuration.core['autotuning_db']
+    if not dbfile or not path.exists(dbfile):
+        return None
+    with open(dbfile) as f:
+        try:
+            return json.load(f).get(key)
+        except ValueError:
+            info_at("Ignoring corrupted auto-tuning database %s" % dbfile)
+            return None
+
+
+def autotuning_db_insert(key, blockshape):
+    """
+    Store in the auto-tuning database the best block shape for ``key``. The
+    database may be shared by concurrent processes, so it is locked while
+    updated, and then atomically replaced.
+    """
+    dbfile = configuration.core['autotuning_db']
+    if not dbfile:
+        return
+    dbdir = path.dirname(path.abspath(dbfile))
+    if not path.isdir(dbdir):
+        try:
+            os.makedirs(dbdir)
+        except FileExistsError:
+            # Created in the meanwhile by a concurrent process
+            pass
+
+    with jit_lock(dbfile):
+        db = {}
+        if path.exists(dbfile):
+            with open(dbfile) as f:
+                try:
+                    db = json.load(f)
+                except ValueError:
+                    pass
+        db[key] = blockshape
+
+        tmpfile = "%s.tmp%d" % (dbfile, os.getpid())
+        with open(tmpfile, 'w') as f:
+            json.dump(db, f, indent=1, sort_keys=True)
+        os.replace(tmpfile, dbfile)
+
+
 def more_heuristic_attempts(blocksizes):
     # Ramp up to higher block sizes
     handle = OrderedDict([(i, options['at_blocksize'][-1]) for i in blocksizes[0]])
@@ -167,9 +555,91 @@ def more_heuristic_attempts(blocksizes):
     return unique
 
 
+def model_blockshape(extents, footprint):
+    """
+    Return the block shape whose working set, as predicted by a simple cache
+    capacity model, fits in (a fraction of) the L2 cache.
+
+    :param extents: A mapper from block size names to the extent of the
+                    corresponding (blocked) :class:`Iteration`s, outermost first.
+    :param footprint: The bytes accessed per point of a block.
+    """
+    blockshape = OrderedDict(extents)
+    capacity = options['at_cache_size']*options['at_cache_fraction']
+    while footprint*reduce(mul, blockshape.values(), 1) > capacity:
+        # Shrink the largest block extent -- the outermost, in case of ties,
+        # so as to preserve long unit-stride rows
+        k = max(blockshape, key=blockshape.get)
+        if blockshape[k] <= options['at_blocksize'][0]:
+            break
+        blockshape[k] = max(blockshape[k] // 2, options['at_blocksize'][0])
+    return blockshape
+
+
+def descent(run, blockshape, extents):
+    """
+    Refine ``blockshape`` through coordinate descent: each block size, in turn,
+    is halved and doubled, and any improvement is retained, until no block
+    size may be improved or the evaluation budget is exhausted. Block shapes
+    thus need not be square.
+
+    :param run: A callable timing a block shape, or returning None if illegal.
+    :param blockshape: The initial block shape.
+    :param extents: The largest legal value for each block size.
+    """
+    budget = options['at_max_evaluations'] - 1
+    best = run(blockshape)
+    improved = best is not None
+    while improved and budget > 0:
+        improved = False
+        for k in blockshape:
+            candidates = [blockshape[k] // 2, min(blockshape[k]*2, extents[k])]
+            for v in candidates:
+                if v < options['at_blocksize'][0] or v == blockshape[k] or budget == 0:
+                    continue
+                attempt = OrderedDict(blockshape)
+                attempt[k] = v
+                budget -= 1
+                elapsed = run(attempt)
+                if elapsed is not None and elapsed < best:
+                    blockshape, best, improved = attempt, elapsed, True
+                    break
+    return blockshape
+
+
+def cache_size(level=2):
+    """
+    Return the size, in bytes, of the cache at ``level``, as reported by the
+    operating system, or None if unknown.
+    """
+    root = '/sys/devices/system/cpu/cpu0/cache'
+    try:
+        for i in sorted(os.listdir(root)):
+            with open(path.join(root, i, 'level')) as f:
+                if int(f.read()) != level:
+                    continue
+            with open(path.join(root, i, 'size')) as f:
+                size = f.read().strip()
+            units = {'K': 1024, 'M': 1024**2}
+            return int(size[:-1])*units[size[-1]] if size[-1] in units else int(size)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
 options = {
     'at_squeezer': 4,
     'at_blocksize': sorted({8, 16, 24, 32, 40, 64, 128}),
-    'at_stack_limit': resource.getrlimit(resource.RLIMIT_STACK)[0] / 4
+    'at_subblocksize': [4, 8, 16, 32],
+    'at_stack_limit': resource.getrlimit(resource.RLIMIT_STACK)[0] / 4,
+    'at_cache_size': cache_size() or 256*1024,
+    'at_cache_fraction': 0.5,
+    'at_max_evaluations': 12,
+    'at_nthreads': [1, 0.5],
+    'at_schedules': [(1, 0), (2, 1), (2, 8), (3, 0)],
+    'at_time_tiles': [2, 4, 8, 16]
 }
-"""Autotuning options."""
+"""Autotuning options. The number of threads is attempted as a fraction
+of the default, while the loop schedules are given as ``(kind, chunk)``,
+with ``kind`` as in OpenMP's ``omp_sched_t`` and ``chunk=0`` meaning the
+default chunk size. The time tile sizes are the number of timesteps per tile."""
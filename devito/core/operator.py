@@ -2,11 +2,13 @@ from __future__ import absolute_import
 
 from collections import OrderedDict
 
-from devito.core.autotuning import autotune
+from devito.core.autotuning import autotune, autotune_online
 from devito.cgen_utils import printmark
 from devito.ir.iet import List, Transformer, filter_iterations, retrieve_iteration_tree
 from devito.ir.support import align_accesses
+from devito.logger import warning
 from devito.operator import OperatorRunnable
+from devito.parameters import configuration
 from devito.tools import flatten
 
 __all__ = ['Operator']
@@ -19,12 +21,33 @@ class OperatorCore(OperatorRunnable):
         expressions = [align_accesses(e) for e in expressions]
         return super(OperatorCore, self)._specialize_exprs(expressions)
 
+    def apply(self, **kwargs):
+        if not kwargs.get('autotune', False) or \
+                configuration.core['autotuning'] != 'online' or \
+                not self.dle_flags.get('blocking', False) or self.body is None:
+            return super(OperatorCore, self).apply(**kwargs)
+
+        # Online auto-tuning: the auto-tuner runs the Operator itself, trying
+        # different block shapes over the first timesteps of the actual run
+        kwargs.pop('autotune')
+        args = self.arguments(**kwargs)
+        autotune_online(self, OrderedDict([(p.name, args[p.name])
+                                           for p in self.parameters]), self.dle_args)
+
+        # Output summary of performance achieved
+        return self._profile_output(args)
+
     def _autotune(self, args):
         """
         Use auto-tuning on this Operator to determine empirically the
         best block sizes when loop blocking is in use.
         """
         if self.dle_flags.get('blocking', False):
+            if self.body is None:
+                # Unpickled Operator, which lacks the IET required by the AT
+                warning("Cannot auto-tune an unpickled Operator; using the "
+                        "default block sizes")
+                return args
             # AT assumes and ordered dict, so let's feed it one
             args = OrderedDict([(p.name, args[p.name]) for p in self.parameters])
             return autotune(self, args, self.dle_args)
@@ -1,20 +1,37 @@
 from __future__ import absolute_import
 
 import abc
+from collections import OrderedDict
+import errno
 from functools import reduce
+import mmap
 from operator import mul
+import os
+import sys
+import tempfile
+import threading
 
 import numpy as np
 from sympy import Eq
 import ctypes
 from ctypes.util import find_library
+try:
+    from numpy.lib.array_utils import byte_bounds
+except ImportError:
+    # numpy < 2.0
+    from numpy import byte_bounds
 
 from devito.parameters import configuration
 from devito.tools import as_tuple, numpy_to_ctypes
 import devito
 
 __all__ = ['ALLOC_FLAT', 'ALLOC_NUMA_LOCAL', 'ALLOC_NUMA_ANY',
-           'ALLOC_KNL_MCDRAM', 'ALLOC_KNL_DRAM']
+           'ALLOC_KNL_MCDRAM', 'ALLOC_KNL_DRAM', 'ALLOC_HUGEPAGES', 'ALLOC_MMAP',
+           'PoolAllocator', 'pool_allocator']
+
+configuration.add('alloc_pool', 0, [0, 1], lambda i: bool(i))
+configuration.add('hugepages', 0, [0, 1], lambda i: bool(i))
+configuration.add('save_dir', 0)
 
 
 class MemoryAllocator(object):
@@ -25,10 +42,19 @@ class MemoryAllocator(object):
 
     is_Posix = False
     is_Numa = False
+    is_Mmap = False
 
     _attempted_init = False
     lib = None
 
+    def __reduce__(self):
+        # The predefined allocators (e.g., ALLOC_FLAT) are pickled by reference,
+        # so that they are unpickled as themselves
+        for k, v in globals().items():
+            if k.startswith('ALLOC_') and v is self:
+                return k
+        return super(MemoryAllocator, self).__reduce__()
+
     @classmethod
     def available(cls):
         if cls._attempted_init is False:
@@ -198,11 +224,321 @@ class NumaAllocator(MemoryAllocator):
         return self._node == 'local'
 
 
+class HugepagesAllocator(MemoryAllocator):
+
+    """
+    Memory allocator backing large allocations with huge pages, which reduces
+    the TLB misses when sweeping through large arrays. Explicit huge pages,
+    through ``mmap`` with ``MAP_HUGETLB``, are attempted first; these are only
+    available if reserved by the system administrator (see
+    ``/proc/sys/vm/nr_hugepages``). Otherwise, the memory is aligned to huge
+    page boundaries and the kernel is asked to back it with transparent huge
+    pages, through ``madvise``. Should that be impossible too (e.g.,
+    transparent huge pages are disabled), regular pages are used.
+
+    Allocations smaller than a huge page are aligned to page boundaries.
+    """
+
+    HUGEPAGE = 2**21
+    """The size of a huge page, in bytes."""
+
+    # From the Linux headers
+    _PROT_READ_WRITE = 0x1 | 0x2
+    _MAP_PRIVATE_ANONYMOUS = 0x02 | 0x20
+    _MAP_HUGETLB = 0x40000
+    _MAP_FAILED = ctypes.c_void_p(-1).value
+    _MADV_HUGEPAGE = 14
+
+    @classmethod
+    def initialize(cls):
+        if not sys.platform.startswith('linux'):
+            return
+        handle = find_library('c')
+        if handle is None:
+            return
+        lib = ctypes.CDLL(handle)
+        lib.mmap.restype = ctypes.c_void_p
+        lib.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                             ctypes.c_int, ctypes.c_int, ctypes.c_long]
+        lib.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        lib.madvise.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+        cls.lib = lib
+
+    def __init__(self):
+        super(HugepagesAllocator, self).__init__()
+        # The allocations served through `mmap`, which must be released through
+        # `munmap` rather than `free`
+        self._mapped = set()
+
+    def _alloc_C_libcall(self, size, ctype):
+        if not self.available():
+            raise RuntimeError("Couldn't find `libc`'s `mmap` to allocate memory")
+        nbytes = size * ctypes.sizeof(ctype)
+        if nbytes >= self.HUGEPAGE:
+            nbytes = -(-nbytes // self.HUGEPAGE) * self.HUGEPAGE
+            c_pointer = self.lib.mmap(None, nbytes, self._PROT_READ_WRITE,
+                                      self._MAP_PRIVATE_ANONYMOUS | self._MAP_HUGETLB,
+                                      -1, 0)
+            if c_pointer not in (None, self._MAP_FAILED):
+                self._mapped.add(c_pointer)
+                return ctypes.c_void_p(c_pointer)
+            alignment = self.HUGEPAGE
+        else:
+            alignment = self.lib.getpagesize()
+        c_pointer = ctypes.c_void_p()
+        ret = self.lib.posix_memalign(ctypes.byref(c_pointer), alignment,
+                                      ctypes.c_size_t(nbytes))
+        if ret != 0:
+            return None
+        if alignment == self.HUGEPAGE:
+            # Failures are harmless, as regular pages are then used
+            self.lib.madvise(c_pointer, nbytes, self._MADV_HUGEPAGE)
+        return c_pointer
+
+    def free(self, c_pointer, size):
+        address = ctypes.cast(c_pointer, ctypes.c_void_p).value
+        if address in self._mapped:
+            self._mapped.remove(address)
+            self.lib.munmap(address, -(-size // self.HUGEPAGE) * self.HUGEPAGE)
+        else:
+            self.lib.free(c_pointer)
+
+
+class MmapAllocator(MemoryAllocator):
+
+    """
+    Memory allocator mapping the memory onto a file, through ``mmap``, so that
+    the memory footprint is bounded by the page cache rather than the physical
+    memory: the pages already written back to disk may be evicted by the
+    kernel, and are transparently read back upon access. This is meant for
+    the arrays swept once or twice in their entirety, such as the wavefields
+    saved over all timesteps.
+
+    No access pattern is assumed, as the same array is typically swept
+    forward in time and then backward (e.g., by the adjoint pass); the
+    caller may instead advise the kernel about a specific region of the
+    array through :meth:`advise` (e.g., the next few timesteps to be read
+    back, with ``'willneed'``).
+
+    The file is deleted as soon as it is mapped, so the disk space is
+    reclaimed once the memory is freed, or the process terminates. The disk
+    space is reserved upfront, where the file system allows it, so that
+    running out of disk space is reported upon allocation.
+
+    :param directory: (Optional) the directory in which the files are created.
+                      Defaults to ``configuration['save_dir']`` if set, or to
+                      the system's temporary directory.
+    """
+
+    is_Mmap = True
+
+    # From the Linux headers
+    _MAP_SHARED = 0x01
+    _MADV = {'normal': 0, 'random': 1, 'sequential': 2, 'willneed': 3,
+             'dontneed': 4}
+
+    @classmethod
+    def initialize(cls):
+        # Same `libc` entry points as the huge page allocator
+        if HugepagesAllocator.available():
+            cls.lib = HugepagesAllocator.lib
+
+    def __init__(self, directory=None):
+        super(MmapAllocator, self).__init__()
+        self.directory = directory
+
+    def _alloc_C_libcall(self, size, ctype):
+        if not self.available():
+            raise RuntimeError("Couldn't find `libc`'s `mmap` to allocate memory")
+        nbytes = size * ctypes.sizeof(ctype)
+        directory = self.directory or configuration['save_dir'] or None
+        fd, filename = tempfile.mkstemp(prefix='devito-', suffix='.data', dir=directory)
+        try:
+            os.unlink(filename)
+            os.ftruncate(fd, nbytes)
+            try:
+                os.posix_fallocate(fd, 0, nbytes)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise
+                # Unsupported by the file system; the file stays sparse
+            c_pointer = self.lib.mmap(None, nbytes, HugepagesAllocator._PROT_READ_WRITE,
+                                      self._MAP_SHARED, fd, 0)
+        finally:
+            # The mapping holds a reference to the file
+            os.close(fd)
+        if c_pointer in (None, HugepagesAllocator._MAP_FAILED):
+            return None
+        return ctypes.c_void_p(c_pointer)
+
+    def free(self, c_pointer, size):
+        self.lib.munmap(ctypes.cast(c_pointer, ctypes.c_void_p).value, size)
+
+    def advise(self, array, advice):
+        """
+        Advise the kernel, through ``madvise``, on how the memory spanned by
+        ``array``, a view of an array allocated by this allocator, will be
+        accessed.
+
+        :param array: The :class:`numpy.ndarray`, e.g. ``u.data[t0:t1]``.
+        :param advice: One of ``'normal'``, ``'random'``, ``'sequential'``,
+                       ``'willneed'`` (read the pages ahead) and ``'dontneed'``
+                       (the pages may be evicted; their content is preserved,
+                       as the mapping is backed by a file).
+        """
+        if advice not in self._MADV:
+            raise ValueError("Unknown advice `%s`; expected one of %s" %
+                             (advice, sorted(self._MADV)))
+        if array.size == 0 or not self.available():
+            return
+        start, stop = byte_bounds(array)
+        # `madvise` requires a page-aligned address
+        start -= start % mmap.PAGESIZE
+        self.lib.madvise(start, stop - start, self._MADV[advice])
+
+
+class PoolAllocator(MemoryAllocator):
+
+    """
+    Memory allocator recycling the memory released by the :class:`Data` it
+    allocated, rather than returning it to the underlying ``allocator``. This
+    saves the cost of page faults when objects of the same shape are repeatedly
+    created and dropped (e.g., the wavefields of each shot in a loop over shots).
+
+    Requests are rounded up to size classes, spaced by at most 1/8 of their
+    size, so that memory may also be recycled across similar shapes. With a
+    NUMA allocator placing memory on the "local" node, the memory allocated on
+    a NUMA node is only recycled for requests issued from the same node. The
+    retained memory is returned to ``allocator`` once the pool is dropped.
+
+    :param allocator: The :class:`MemoryAllocator` providing the memory.
+    :param capacity: (Optional) the maximum number of bytes retained for reuse;
+                     memory released beyond it is returned to ``allocator``.
+                     Defaults to None, that is no limit.
+    """
+
+    def __init__(self, allocator, capacity=None):
+        super(PoolAllocator, self).__init__()
+        self.allocator = allocator
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._pool = OrderedDict()
+        self._owned = {}
+        self._hits = 0
+        self._misses = 0
+
+    def __reduce__(self):
+        # The retained memory cannot be pickled; the single pool of the
+        # underlying allocator is used upon unpickling
+        return (pool_allocator, (self.allocator,))
+
+    def __del__(self):
+        self.trim()
+
+    def available(self):
+        return self.allocator.available()
+
+    @classmethod
+    def size_class(cls, nbytes):
+        """Return the size class, in bytes, serving a request of ``nbytes``."""
+        step = 1 << max(int(nbytes).bit_length() - 4, 12)
+        return -(-nbytes // step) * step
+
+    def _node(self):
+        """Return the NUMA node the memory of the next request must be on, or
+        None if it doesn't matter."""
+        if not getattr(self.allocator, 'put_local', False) or \
+                not self.allocator.available() or not PosixAllocator.available():
+            return None
+        return self.allocator.lib.numa_node_of_cpu(PosixAllocator.lib.sched_getcpu())
+
+    def _alloc_C_libcall(self, size, ctype):
+        key = (self.size_class(size * ctypes.sizeof(ctype)), self._node())
+        with self._lock:
+            try:
+                c_pointer = self._pool[key].pop()
+                self._hits += 1
+            except (KeyError, IndexError):
+                c_pointer = None
+                self._misses += 1
+        if c_pointer is None:
+            c_pointer = self.allocator._alloc_C_libcall(key[0], ctypes.c_char)
+        if c_pointer is None:
+            # Perhaps the retained memory is in the way
+            self.trim()
+            c_pointer = self.allocator._alloc_C_libcall(key[0], ctypes.c_char)
+            if c_pointer is None:
+                return None
+        with self._lock:
+            # The memory is recycled within the same size class and NUMA node,
+            # regardless of the thread eventually releasing it
+            self._owned[ctypes.cast(c_pointer, ctypes.c_void_p).value] = key
+        return c_pointer
+
+    def free(self, c_pointer, size):
+        with self._lock:
+            key = self._owned.pop(ctypes.cast(c_pointer, ctypes.c_void_p).value)
+            if self.capacity is None or self.cached + key[0] <= self.capacity:
+                self._pool.setdefault(key, []).append(c_pointer)
+                self._pool.move_to_end(key)
+                return
+        self.allocator.free(c_pointer, key[0])
+
+    @property
+    def cached(self):
+        """The number of bytes retained for reuse."""
+        return sum(k[0]*len(v) for k, v in self._pool.items())
+
+    def trim(self, nbytes=0):
+        """
+        Return the retained memory to the underlying allocator, the least
+        recently used size classes first, until at most ``nbytes`` are retained.
+        """
+        with self._lock:
+            released = []
+            cached = self.cached
+            for key, pointers in self._pool.items():
+                while pointers and cached > nbytes:
+                    released.append((pointers.pop(), key[0]))
+                    cached -= key[0]
+            self._pool = OrderedDict([(k, v) for k, v in self._pool.items() if v])
+        for c_pointer, size in released:
+            self.allocator.free(c_pointer, size)
+
+    def stats(self):
+        """
+        Return a dictionary of statistics: the number of requests served with
+        recycled memory (``hits``) and with fresh memory (``misses``), as well
+        as the number of bytes in use by :class:`Data` (``inuse``) and retained
+        for reuse (``cached``) by the pool.
+        """
+        with self._lock:
+            inuse = sum(i[0] for i in self._owned.values())
+            return OrderedDict([('hits', self._hits), ('misses', self._misses),
+                                ('inuse', inuse), ('cached', self.cached)])
+
+
 ALLOC_FLAT = PosixAllocator()
 ALLOC_KNL_DRAM = NumaAllocator(0)
 ALLOC_KNL_MCDRAM = NumaAllocator(1)
 ALLOC_NUMA_ANY = NumaAllocator('any')
 ALLOC_NUMA_LOCAL = NumaAllocator('local')
+ALLOC_HUGEPAGES = HugepagesAllocator()
+ALLOC_MMAP = MmapAllocator()
+
+_pools = {}
+
+
+def pool_allocator(allocator):
+    """
+    Return the :class:`PoolAllocator` recycling the memory of ``allocator``.
+    There is a single pool for each allocator, so the memory of, e.g., two
+    NUMA allocators is never mixed up.
+    """
+    try:
+        return _pools[allocator]
+    except KeyError:
+        return _pools.setdefault(allocator, PoolAllocator(allocator))
 
 
 def default_allocator():
@@ -220,26 +556,46 @@ def default_allocator():
         * ALLOC_KNL_MCDRAM: On a Knights Landing platform, allocate memory in MCDRAM.
                             Falls back to DRAM if there isn't enough space.
         * ALLOC_KNL_DRAM: On a Knights Landing platform, allocate memory in DRAM.
+        * ALLOC_HUGEPAGES: Back large allocations with (explicit or transparent)
+                           huge pages. Falls back to regular pages if huge pages
+                           cannot be used.
+        * ALLOC_MMAP: Map memory onto a file, so that it is bounded by the page
+                      cache rather than the physical memory. This is never the
+                      default, but is used for the :class:`TimeFunction`s saving
+                      all timesteps if ``configuration['save_dir']`` is set.
 
     The default allocator is chosen based on the following algorithm: ::
 
+        * If huge pages are requested (env var DEVITO_HUGEPAGES), return
+          ALLOC_HUGEPAGES;
         * If running in DEVELOP mode (env var DEVITO_DEVELOP), return ALLOC_FLAT;
-        * If ``libnuma`` is not available on the system, return ALLOC_FLAT (though
-          it typically is available, at least on relatively recent Linux distributions);
         * If on a Knights Landing platform (codename ``knl``, see ``print_defaults()``)
-          return ALLOC_KNL_MCDRAM;
-        * If on a multi-socket Intel Xeon platform, return ALLOC_NUMA_LOCAL;
+          and ``libnuma`` is available, return ALLOC_KNL_MCDRAM;
+        * If on a multi-socket Intel Xeon platform and ``libnuma`` is available
+          (it typically is, at least on relatively recent Linux distributions),
+          return ALLOC_NUMA_LOCAL;
+        * If on Linux, return ALLOC_HUGEPAGES;
         * In all other cases, return ALLOC_FLAT.
+
+    If memory pooling is enabled (env var DEVITO_ALLOC_POOL), the
+    :class:`PoolAllocator` of the chosen allocator is returned instead.
     """
-    if configuration['develop-mode']:
-        return ALLOC_FLAT
+    if configuration['hugepages'] and HugepagesAllocator.available():
+        allocator = ALLOC_HUGEPAGES
+    elif configuration['develop-mode']:
+        allocator = ALLOC_FLAT
     elif NumaAllocator.available():
         if configuration['platform'] == 'knl':
-            return ALLOC_KNL_MCDRAM
+            allocator = ALLOC_KNL_MCDRAM
         else:
-            return ALLOC_NUMA_LOCAL
+            allocator = ALLOC_NUMA_LOCAL
+    elif HugepagesAllocator.available():
+        allocator = ALLOC_HUGEPAGES
     else:
-        return ALLOC_FLAT
+        allocator = ALLOC_FLAT
+    if configuration['alloc_pool']:
+        return pool_allocator(allocator)
+    return allocator
 
 
 class Data(np.ndarray):
@@ -280,6 +636,24 @@ class Data(np.ndarray):
         obj._modulo = tuple(True if i.is_Stepping else False for i in dimensions)
         return obj
 
+    def __reduce__(self):
+        # Only the values are pickled; upon unpickling, memory is allocated afresh
+        allocator = getattr(self, '_allocator', ALLOC_FLAT)
+        return (Data._unpickle, (np.asarray(self), self._modulo, allocator))
+
+    @classmethod
+    def _unpickle(cls, values, modulo, allocator):
+        if not allocator.available():
+            # E.g., unpickling on a node without `libnuma`
+            allocator = ALLOC_FLAT
+        ndarray, c_pointer = allocator.alloc(values.shape, values.dtype.type)
+        obj = np.asarray(ndarray).view(cls)
+        obj._allocator = allocator
+        obj._c_pointer = c_pointer
+        obj._modulo = modulo
+        np.copyto(obj, values)
+        return obj
+
     def __del__(self):
         if self._c_pointer is None:
             return
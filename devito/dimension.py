@@ -5,8 +5,9 @@ from cached_property import cached_property
 from devito.exceptions import InvalidArgument
 from devito.types import AbstractSymbol, Scalar, Symbol
 
-__all__ = ['Dimension', 'SpaceDimension', 'TimeDimension', 'DefaultDimension',
-           'SteppingDimension', 'SubDimension', 'ConditionalDimension', 'dimensions']
+__all__ = ['Dimension', 'SpaceDimension', 'TimeDimension', 'BatchDimension',
+           'DefaultDimension', 'SteppingDimension', 'SubDimension',
+           'ConditionalDimension', 'dimensions']
 
 
 class Dimension(AbstractSymbol):
@@ -14,6 +15,7 @@ class Dimension(AbstractSymbol):
     is_Dimension = True
     is_Space = False
     is_Time = False
+    is_Batch = False
 
     is_Default = False
     is_Derived = False
@@ -23,6 +25,7 @@ class Dimension(AbstractSymbol):
     is_Stepping = False
 
     is_Lowered = False
+    is_Modulo = False
 
     """
     Index object that represents a problem dimension and thus defines a
@@ -221,6 +224,20 @@ class TimeDimension(Dimension):
     """
 
 
+class BatchDimension(Dimension):
+
+    is_Batch = True
+
+    """
+    Dimension symbol to represent an ensemble of independent problems (e.g.,
+    shots, or models), which advance together in the same loop nest. There
+    are no data dependences, nor halo regions, along a BatchDimension.
+
+    :param name: Name of the dimension symbol.
+    :param spacing: Optional, symbol for the spacing along this dimension.
+    """
+
+
 class DefaultDimension(Dimension):
     is_Default = True
 
@@ -471,6 +488,37 @@ class LoweredDimension(Dimension):
         return Symbol._hashable_content(self) + (self.origin,)
 
 
+class ModuloDimension(Dimension):
+
+    is_Modulo = True
+
+    """
+    Dimension symbol of statically known size, indexing a circular buffer
+    accessed modulo its size (e.g., the rotating rows created when contracting
+    a temporary along an outer dimension).
+
+    :param name: Name of the dimension symbol.
+    :param modulo: The size of the dimension.
+    """
+
+    def __new__(cls, name, modulo, **kwargs):
+        newobj = sympy.Symbol.__new__(cls, name)
+        newobj._spacing = kwargs.get('spacing', Scalar(name='h_%s' % name))
+        newobj._modulo = modulo
+        return newobj
+
+    @property
+    def modulo(self):
+        return self._modulo
+
+    @property
+    def symbolic_size(self):
+        return sympy.Integer(self.modulo)
+
+    def _hashable_content(self):
+        return super(ModuloDimension, self)._hashable_content() + (self.modulo,)
+
+
 def dimensions(names):
     """
     Shortcut for: ::
@@ -1,6 +1,7 @@
 from devito.dle.backends.common import *  # noqa
 from devito.dle.backends.utils import *  # noqa
 from devito.dle.backends.basic import BasicRewriter  # noqa
-from devito.dle.backends.parallelizer import Ompizer  # noqa
+from devito.dle.backends.parallelizer import Ompizer, default_nthreads  # noqa
 from devito.dle.backends.advanced import (AdvancedRewriter, SpeculativeRewriter,  # noqa
-                                          AdvancedRewriterSafeMath, CustomRewriter)  # noqa
+                                          AdvancedRewriterSafeMath,  # noqa
+                                          AdvancedRewriterTimeTiling, CustomRewriter)  # noqa
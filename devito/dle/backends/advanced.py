@@ -7,18 +7,24 @@ from itertools import combinations
 
 import cgen
 import numpy as np
+from sympy import Max, Min, Mod
 
 from devito.cgen_utils import ccode
-from devito.dimension import Dimension
+from devito.dimension import Dimension, ModuloDimension
 from devito.dle import fold_blockable_tree, unfold_blocked_tree
-from devito.dle.backends import (BasicRewriter, BlockingArg, Ompizer, dle_pass,
-                                 simdinfo, get_simd_flag, get_simd_items)
+from devito.dle.backends import (BasicRewriter, BlockingArg, TimeTilingArg, Ompizer,
+                                 dle_pass, simdinfo, get_simd_flag, get_simd_items)
 from devito.exceptions import DLEException
-from devito.ir.iet import (Iteration, List, PARALLEL, ELEMENTAL, REMAINDER, tagger,
-                           FindSymbols, IsPerfectIteration, Transformer, compose_nodes,
+from devito.ir.iet import (Expression, Iteration, List, Node, PARALLEL,
+                           PARALLEL_IF_ATOMIC, SEQUENTIAL, SKEWED, ELEMENTAL, REMAINDER,
+                           tagger, FindNodes, FindSymbols, IsPerfectIteration,
+                           MapExpressions, Transformer, compose_nodes,
                            retrieve_iteration_tree)
+from devito.ir.support import Backward, Forward, Scope
 from devito.logger import dle_warning
-from devito.tools import as_tuple
+from devito.symbolics import retrieve_indexed
+from devito.tools import as_tuple, filter_ordered, flatten
+from devito.types import Scalar
 
 
 class AdvancedRewriter(BasicRewriter):
@@ -28,6 +34,8 @@ class AdvancedRewriter(BasicRewriter):
     def _pipeline(self, state):
         self._avoid_denormals(state)
         self._loop_blocking(state)
+        if self.params['linebuffers'] is True:
+            self._contract_arrays(state)
         self._simdize(state)
         if self.params['openmp'] is True:
             self._parallelize(state)
@@ -56,18 +64,45 @@ class AdvancedRewriter(BasicRewriter):
         two outer loops will blocked, and the resulting 2-dimensional block will
         have size 4x7. The latter may be set to True to also block innermost parallel
         :class:`Iteration` objects.
+
+        With ``blocklevels=2``, each block is in turn blocked into sub-blocks,
+        for example to target both the L2 and the L1 caches: ::
+
+            for i_block  // step i_bs
+              for j_block  // step j_bs
+                for i_sub = i_block to i_block + i_bs - 1  // step i_sbs
+                  for j_sub = j_block to j_block + j_bs - 1  // step j_sbs
+                    for i = i_sub to min(i_sub + i_sbs, i_block + i_bs) - 1
+                      for j = j_sub to min(j_sub + j_sbs, j_block + j_bs) - 1
+                        ...
+
+        The block and sub-block sizes are distinct Operator arguments.
+
+        By default, the points left over when a dimension size isn't a multiple
+        of the block size are computed by remainder loops, that is ``2^n - 1``
+        additional Iteration trees for ``n`` blocked dimensions. With
+        ``blockremainder=False``, the Iterations within a block are instead
+        min()-bounded, so that partial blocks are computed by the blocked nest
+        itself, and no remainder loops are generated.
         """
         exclude_innermost = not self.params.get('blockinner', False)
         ignore_heuristic = self.params.get('blockalways', False)
+        two_levels = (self.params.get('blocklevels') or 1) > 1
+        use_remainders = self.params.get('blockremainder', True)
 
         # Make sure loop blocking will span as many Iterations as possible
         fold = fold_blockable_tree(nodes, exclude_innermost)
 
         mapper = {}
         blocked = OrderedDict()
+        subblocked = OrderedDict()
         for tree in retrieve_iteration_tree(fold):
-            # Is the Iteration tree blockable ?
-            iterations = [i for i in tree if i.is_Parallel]
+            if any(i.is_Skewed for i in tree):
+                # Already time-tiled
+                continue
+            # Is the Iteration tree blockable ? Note: there is no data reuse
+            # across the members of an ensemble, so BatchDimensions are not blocked
+            iterations = [i for i in tree if i.is_Parallel and not i.dim.is_Batch]
             if exclude_innermost:
                 iterations = [i for i in iterations if not i.is_Vectorizable]
             if len(iterations) <= 1:
@@ -86,10 +121,15 @@ class AdvancedRewriter(BasicRewriter):
             # Decorate intra-block iterations with an IterationProperty
             TAG = tagger(len(mapper))
 
+            # Folded trees rely on single-level blocks to shrink their temporaries
+            subblocking = two_levels and not any(i.is_IterationFold for i in iterations)
+
             # Build all necessary Iteration objects, individually. These will
             # subsequently be composed to implement loop blocking.
             inter_blocks = []
             intra_blocks = []
+            sub_blocks = []
+            intra_subblocks = []
             remainders = []
             for i in iterations:
                 name = "%s%d_block" % (i.dim.name, len(mapper))
@@ -98,18 +138,44 @@ class AdvancedRewriter(BasicRewriter):
                 dim = blocked.setdefault(i, Dimension(name=name))
                 bsize = dim.symbolic_size
                 bstart = i.limits[0]
-                binnersize = i.dim.symbolic_extent + (i.offsets[1] - i.offsets[0])
-                bfinish = i.dim.symbolic_end - (binnersize % bsize) - 1
+                if use_remainders:
+                    binnersize = i.dim.symbolic_extent + (i.offsets[1] - i.offsets[0])
+                    bfinish = i.dim.symbolic_end - (binnersize % bsize) - 1
+                else:
+                    # The last block may be a partial one
+                    bfinish = i.limits[1]
                 inter_block = Iteration([], dim, [bstart, bfinish, bsize],
                                         offsets=i.offsets, properties=PARALLEL)
                 inter_blocks.append(inter_block)
 
                 # Build Iteration within a block
-                limits = (dim, dim + bsize - 1, 1)
+                bend = dim + bsize - 1
+                if not use_remainders:
+                    bend = Min(bend, i.end_symbolic)
+                limits = (dim, bend, 1)
                 intra_block = i._rebuild([], limits=limits, offsets=(0, 0),
                                          properties=i.properties + (TAG, ELEMENTAL))
                 intra_blocks.append(intra_block)
 
+                if subblocking:
+                    # Build Iteration over the sub-blocks within a block. Note: this
+                    # isn't tagged, so that the elemental functions only embed the
+                    # Iterations within a sub-block
+                    name = "%s%d_subblock" % (i.dim.name, len(mapper))
+                    subdim = subblocked.setdefault(i, Dimension(name=name))
+                    ssize = subdim.symbolic_size
+                    sub_block = Iteration([], subdim, [dim, bend, ssize],
+                                          properties=PARALLEL)
+                    sub_blocks.append(sub_block)
+
+                    # Build Iteration within a sub-block, which may be truncated
+                    # if the block size isn't a multiple of the sub-block size
+                    limits = (subdim, Min(subdim + ssize - 1, bend), 1)
+                    intra_subblock = i._rebuild([], limits=limits, offsets=(0, 0),
+                                                properties=i.properties + (TAG,
+                                                                           ELEMENTAL))
+                    intra_subblocks.append(intra_subblock)
+
                 # Build unitary-increment Iteration over the 'leftover' region.
                 # This will be used for remainder loops, executed when any
                 # dimension size is not a multiple of the block size.
@@ -118,12 +184,16 @@ class AdvancedRewriter(BasicRewriter):
                 remainders.append(remainder)
 
             # Build blocked Iteration nest
-            blocked_tree = compose_nodes(inter_blocks + intra_blocks +
-                                         [iterations[-1].nodes])
+            if subblocking:
+                blocked_tree = compose_nodes(inter_blocks + sub_blocks + intra_subblocks +
+                                             [iterations[-1].nodes])
+            else:
+                blocked_tree = compose_nodes(inter_blocks + intra_blocks +
+                                             [iterations[-1].nodes])
 
             # Build remainder Iterations
             remainder_trees = []
-            for n in range(len(iterations)):
+            for n in range(len(iterations) if use_remainders else 0):
                 for c in combinations([i.dim for i in iterations], n + 1):
                     # First all inter-block Interations
                     nodes = [b._rebuild(properties=b.properties + (REMAINDER,))
@@ -149,13 +219,28 @@ class AdvancedRewriter(BasicRewriter):
         if not blocked:
             return processed, {}
 
-        # Determine the block shape
+        # Track any additional arguments required to execute /state.nodes/
+        if subblocked:
+            blockshape = self._blockshape(blocked, outer_blocksize_heuristic)
+        else:
+            blockshape = self._blockshape(blocked)
+        arguments = [BlockingArg(v, k, blockshape[k]) for k, v in blocked.items()]
+        arguments.extend([BlockingArg(v, k, blocksize_heuristic, blocked[k])
+                          for k, v in subblocked.items()])
+
+        return processed, {'arguments': arguments, 'flags': 'blocking'}
+
+    def _blockshape(self, blocked, heuristic=None):
+        """
+        Determine the block shape for the blocked :class:`Iteration`s in
+        ``blocked``, either from the ``blockshape`` keyword passed to the DLE
+        or through the callable ``heuristic`` (defaults to
+        :func:`blocksize_heuristic`).
+        """
         blockshape = self.params.get('blockshape')
         if not blockshape:
             # Use trivial heuristic for a suitable blockshape
-            def heuristic(dim_size):
-                ths = 8  # FIXME: This really needs to be improved
-                return ths if dim_size > ths else 1
+            heuristic = heuristic or blocksize_heuristic
             blockshape = {k: heuristic for k in blocked.keys()}
         else:
             try:
@@ -171,17 +256,360 @@ class AdvancedRewriter(BasicRewriter):
                 blockshape = {list(blocked)[0]: blockshape}
             blockshape.update({k: None for k in blocked.keys()
                                if k not in blockshape})
+        return blockshape
+
+    @dle_pass
+    def _loop_time_tiling(self, nodes, state):
+        """
+        Apply time tiling to :class:`Iteration` trees. The time loop and the
+        outer space loops are blocked together, so that several timesteps are
+        computed over a tile while its data is still in cache.
+
+        The space loops are skewed w.r.t. the time loop by the stencil radius
+        ``r``, so that tiles may be computed one after the other even if the
+        :class:`TimeFunction`s use modulo buffers (wavefront tiling). For
+        example, the :class:`Iteration` tree: ::
+
+            for time = time_m to time_M
+              for x = x_m to x_M
+                for y = y_m to y_M
+                  u[t1,x,y] = f(u[t0,x-r,y], ..., u[t0,x+r,y])
+
+        becomes: ::
+
+            for time0_tile = time_m to time_M, step time0_tile_size
+              for x0_tile = x_m to x_M + r*(time0_tile_size - 1), step x0_tile_size
+                for time = time0_tile to min(time0_tile + time0_tile_size - 1, time_M)
+                  for x = max(x0_tile - r*(time - time0_tile), x_m) to
+                          min(x0_tile + x0_tile_size - 1 - r*(time - time0_tile), x_M)
+                    for y = y_m to y_M
+                      u[t1,x,y] = ...
+
+        Only forward time loops whose body is a single, perfect nest of parallel
+        loops writing to :class:`TimeFunction`s are time-tiled (e.g., not those
+        also injecting sources). The tile sizes are runtime arguments.
+        """
+        exclude_innermost = not self.params.get('blockinner', False)
+
+        mapper = {}
+        tiled = OrderedDict()
+        arguments = []
+        for tree in retrieve_iteration_tree(nodes):
+            root = tree[0]
+            if root in mapper or not root.dim.is_Time or root.direction != Forward:
+                continue
+
+            # Is the Iteration tree time-tileable ?
+            nest = tree[1:]
+            if not nest or len(retrieve_iteration_tree(root)) > 1:
+                continue
+            if not IsPerfectIteration().visit(nest[0]):
+                continue
+            if not all(i.is_Parallel for i in nest):
+                continue
+            exprs = FindNodes(Expression).visit(root)
+            if exprs != FindNodes(Expression).visit(nest[0]):
+                continue
+            iterations = [i for i in nest if not i.dim.is_Batch]
+            if exclude_innermost:
+                iterations = [i for i in iterations if not i.is_Vectorizable]
+            skewing = skewing_factors(exprs, [i.dim for i in iterations])
+            if not iterations or skewing is None:
+                continue
+
+            # The time tile; its size is a runtime argument
+            n = len(arguments)
+            tdim = Dimension(name="%s%d_tile" % (root.dim.name, n))
+            tsize = Scalar(name="%s_size" % tdim.name, dtype=np.int32)
+            tstart, tend = root.start_symbolic, root.end_symbolic
+            tile = [Iteration([], tdim, [tstart, tend, tsize], properties=SEQUENTIAL)]
+            arguments.append(TimeTilingArg(tsize, self.params.get('timetile') or 4))
+
+            # The (skewed) space tiles
+            shift = root.dim - tdim
+            skewed = {}
+            for i in iterations:
+                dim = tiled.setdefault(i, Dimension(name="%s%d_tile" % (i.dim.name, n)))
+                bsize = dim.symbolic_size
+                start, end = i.start_symbolic, i.end_symbolic
+                r = skewing[i.dim]
+                tile.append(Iteration([], dim, [start, end + r*(tsize - 1), bsize],
+                                      properties=SEQUENTIAL))
+                limits = [Max(dim - r*shift, start),
+                          Min(dim + bsize - 1 - r*shift, end), 1]
+                skewed[i] = i._rebuild([], limits=limits, offsets=(0, 0),
+                                       properties=i.properties + (SKEWED,))
+            rebuilt = compose_nodes([skewed.get(i, i) for i in nest] + [nest[-1].nodes])
+
+            # Within a tile, the time loop only spans /tsize/ timesteps
+            body = Transformer({nest[0]: rebuilt}).visit(root.nodes)
+            timeloop = root._rebuild(body, limits=[tdim, Min(tdim + tsize - 1, tend), 1],
+                                     offsets=(0, 0))
+            mapper[root] = compose_nodes(tile + [timeloop])
+
+        if not mapper:
+            return nodes, {}
+
+        processed = Transformer(mapper).visit(nodes)
 
         # Track any additional arguments required to execute /state.nodes/
-        arguments = [BlockingArg(v, k, blockshape[k]) for k, v in blocked.items()]
+        blockshape = self._blockshape(tiled)
+        arguments.extend([BlockingArg(v, k, blockshape[k]) for k, v in tiled.items()])
 
         return processed, {'arguments': arguments, 'flags': 'blocking'}
 
+    @dle_pass
+    def _contract_arrays(self, nodes, state):
+        """
+        Contract the temporary :class:`Array`s created by the DSE into line
+        buffers along the innermost :class:`Dimension` or, if produced and
+        consumed by two distinct loop nests, into rotating rows along the
+        outermost Dimension.
+
+        A temporary that is written and then read within the same iteration
+        of some enclosing :class:`Iteration`s, always at the same index along
+        their :class:`Dimension`s, may be contracted along such Dimensions.
+        For example: ::
+
+            for x
+              for y
+                for z = z_m - 2 to z_M + 2
+                  r[x,y,z] = ...
+                for z = z_m to z_M
+                  u[x,y,z] = ... r[x,y,z-2] ... r[x,y,z+2] ...
+
+        becomes: ::
+
+            for x
+              for y
+                for z = z_m - 2 to z_M + 2
+                  r[z] = ...
+                for z = z_m to z_M
+                  u[x,y,z] = ... r[z-2] ... r[z+2] ...
+
+        The values computed at previous ``z`` iterations are still reused,
+        but the temporary stays in cache in between its production and its
+        consumption. A line buffer is allocated on the stack, thus making it
+        private to each thread. To keep the stack usage under control, only
+        temporaries which may be contracted into a single line are processed.
+
+        A temporary produced by a loop nest and consumed by the next one,
+        instead, is turned into a circular buffer of as many rows as the
+        stencil width along the outermost Dimension. For example: ::
+
+            for x = x_m - 1 to x_M + 1
+              for y
+                r[x,y] = ...
+            for x = x_m to x_M
+              for y
+                u[x,y] = ... r[x-1,y] ... r[x+1,y] ...
+
+        becomes: ::
+
+            for x = x_m - 1 to x_m
+              for y
+                r[(x - x_m + 1) % 3,y] = ...
+            for x = x_m to x_M
+              for y
+                r[(x - x_m + 3) % 3,y] = ...
+              for y
+                u[x,y] = ... r[(x - x_m) % 3,y] ... r[(x - x_m + 2) % 3,y] ...
+
+        The fused loop is sequential, so any parallelism is sought within each
+        row. See :meth:`_rotate_rows` for the conditions under which this
+        transformation is applied.
+        """
+        sections = OrderedDict((k, v) for k, v in MapExpressions().visit(nodes).items()
+                               if k.is_Expression)
+        exprs = list(sections)
+
+        rules = {}
+        for f in filter_ordered(e.write for e in exprs if e.write.is_Array):
+            if not f._mem_heap or f.ndim < 2:
+                continue
+            indexeds = [i for e in exprs for i in retrieve_indexed(e.expr, mode='all')
+                        if i.base.function is f]
+            writers = [exprs.index(e) for e in exprs if e.write is f]
+            readers = [exprs.index(e) for e in exprs
+                       if any(i.base.function is f for i in retrieve_indexed(e.expr.rhs))]
+            if not readers or max(writers) >= min(readers):
+                # Must be fully written before being read
+                continue
+
+            # The Iterations enclosing all of the accesses to /f/
+            common = []
+            for i in zip(*[sections[exprs[j]] for j in writers + readers]):
+                if any(j is not i[0] for j in i):
+                    break
+                common.append(i[0].dim)
+
+            # A Dimension may be contracted if the accesses along it are
+            # all at the same index
+            contracted = [n for n, d in enumerate(f.indices[:-1])
+                          if d in common and len({i.indices[n] for i in indexeds}) == 1]
+            if len(contracted) < f.ndim - 1:
+                continue
+
+            f.update(shape=f.shape[-1:], dimensions=f.indices[-1:], halo=f._halo[-1:],
+                     padding=f._padding[-1:], onstack=True)
+            rules.update({i: f.indexed[i.indices[-1]] for i in indexeds})
+
+        if rules:
+            mapper = {e: e._rebuild(expr=e.expr.xreplace(rules)) for e in exprs
+                      if any(i in rules for i in retrieve_indexed(e.expr, mode='all'))}
+            nodes = Transformer(mapper).visit(nodes)
+
+        processed = self._rotate_rows(nodes)
+
+        return processed, {}
+
+    def _rotate_rows(self, nodes):
+        """
+        Turn the temporary :class:`Array`s produced by an :class:`Iteration`
+        ``P`` and consumed by the next one, ``C``, into circular buffers along
+        the Dimension ``d`` of ``P`` and ``C``, then fuse ``P`` into ``C``.
+        This requires: ::
+
+            * ``P`` and ``C`` to be adjacent, unit-stride, non-backward Iterations;
+            * ``P`` to compute nothing but the temporaries, besides scalars;
+            * the temporaries to be accessed in ``P`` and ``C`` only, and
+              written at a single index along ``d``;
+            * ``P`` to cover all of the rows read by ``C``;
+            * no dependences between ``P`` and ``C`` other than through the
+              temporaries, except for those carried by an outer Dimension
+              (e.g., time).
+        """
+        sections = OrderedDict((k, v) for k, v in MapExpressions().visit(nodes).items()
+                               if k.is_Expression)
+        exprs = list(sections)
+
+        # Search for producer-consumer pairs of Iterations
+        candidates = OrderedDict()
+        for f in filter_ordered(e.write for e in exprs if e.write.is_Array):
+            if not f._mem_heap or f.ndim < 2:
+                continue
+            writers = [e for e in exprs if e.write is f]
+            readers = [e for e in exprs
+                       if any(i.base.function is f for i in retrieve_indexed(e.expr.rhs))]
+            chains = [sections[e] for e in writers + readers]
+            depth = 0
+            while all(len(i) > depth and i[depth] is chains[0][depth] for i in chains):
+                depth += 1
+            try:
+                producer, = {sections[e][depth] for e in writers}
+                consumer, = {sections[e][depth] for e in readers}
+            except (IndexError, ValueError):
+                continue
+            if producer.dim is consumer.dim and producer.dim in f.indices:
+                candidates.setdefault((producer, consumer), []).append(f)
+
+        # The sequences of sibling nodes
+        siblings = [as_tuple(nodes)]
+        siblings.extend(i for n in FindNodes(Node).visit(nodes) for i in n.children
+                        if isinstance(i, tuple))
+
+        mapper = {}
+        for (producer, consumer), targets in candidates.items():
+            d = producer.dim
+            pexprs = [e for e in exprs if producer in sections[e]]
+            cexprs = [e for e in exprs if consumer in sections[e]]
+
+            if producer in mapper or consumer in mapper:
+                continue
+            if not any(producer in i and i.index(producer) + 1 == i.index(consumer)
+                       for i in siblings if consumer in i):
+                continue
+            if any(not i.is_Linear or i.direction is Backward or i.limits[2] != 1
+                   for i in [producer, consumer]):
+                continue
+            if any(e.write not in targets and not e.write.is_Scalar for e in pexprs):
+                continue
+            if any(i.base.function in targets for e in exprs
+                   if e not in pexprs + cexprs
+                   for i in retrieve_indexed(e.expr, mode='all')):
+                continue
+
+            # The row written by /producer/ at iteration /d/, and the rows
+            # read by /consumer/ at iteration /d/, relative to /d/
+            offsets = {}
+            for f in targets:
+                n = f.indices.index(d)
+                writes = {e.expr.lhs.indices[n] - d for e in pexprs if e.write is f}
+                reads = {i.indices[n] - d for e in cexprs
+                         for i in retrieve_indexed(e.expr.rhs) if i.base.function is f}
+                if len(writes) != 1 or not all(i.is_Integer for i in writes | reads):
+                    break
+                shift = writes.pop()
+                offsets[f] = (n, shift, {int(i - shift) for i in reads})
+            if len(offsets) < len(targets):
+                continue
+            kmin = min(flatten(i for _, _, i in offsets.values()))
+            kmax = max(flatten(i for _, _, i in offsets.values()))
+
+            # /producer/ must compute all of the rows read by /consumer/
+            lower = producer.start_symbolic - consumer.start_symbolic
+            upper = producer.end_symbolic - consumer.end_symbolic
+            if not (lower.is_Integer and upper.is_Integer and
+                    lower <= kmin and upper >= kmax):
+                continue
+
+            # Fusion must not break any dependence
+            scope = Scope([e.expr for e in pexprs + cexprs])
+            dims = [i.dim for j in [producer, consumer]
+                    for i in FindNodes(Iteration).visit(j)]
+            if any((i.source.timestamp < len(pexprs)) != (i.sink.timestamp < len(pexprs))
+                   and (i.cause is None or any(i.is_carried(j) for j in dims))
+                   for i in scope.d_all if i.function not in targets):
+                continue
+
+            # Contract the targets into /nrows/ rotating rows
+            nrows = kmax - kmin + 1
+            start = consumer.start_symbolic + kmin
+            dim = ModuloDimension(name='%sr' % d.name, modulo=nrows)
+            rules = {}
+            for f, (n, shift, _) in offsets.items():
+                for i in flatten(retrieve_indexed(e.expr, mode='all')
+                                 for e in pexprs + cexprs):
+                    if i.base.function is f:
+                        indices = list(i.indices)
+                        indices[n] = Mod(indices[n] - shift - start, nrows)
+                        rules[i] = f.indexed[indices]
+                shape, dimensions, halo, padding = [list(i) for i in
+                                                    [f.shape, f.indices, f._halo,
+                                                     f._padding]]
+                shape[n], dimensions[n], halo[n], padding[n] = nrows, dim, (0, 0), (0, 0)
+                f.update(shape=tuple(shape), dimensions=tuple(dimensions),
+                         halo=tuple(halo), padding=tuple(padding))
+
+            # The first /nrows - 1/ rows are computed ahead of the fused loop,
+            # which then computes the row consumed /kmax/ iterations later
+            properties = [i for i in consumer.properties if i not in
+                          [PARALLEL, PARALLEL_IF_ATOMIC]] + [SEQUENTIAL]
+            ahead = {e: e._rebuild(expr=e.expr.xreplace(rules)) for e in pexprs}
+            prologue = producer._rebuild(Transformer(ahead).visit(producer.nodes),
+                                         limits=[start, start + nrows - 2, 1],
+                                         offsets=(0, 0), properties=properties)
+            ahead = {k: v._rebuild(expr=v.expr.xreplace({d: d + kmax}))
+                     for k, v in ahead.items()}
+            behind = {e: e._rebuild(expr=e.expr.xreplace(rules)) for e in cexprs
+                      if any(i in rules for i in retrieve_indexed(e.expr.rhs))}
+            fused = consumer._rebuild(Transformer(ahead).visit(producer.nodes) +
+                                      Transformer(behind).visit(consumer.nodes),
+                                      properties=properties)
+            body = [prologue, fused] if nrows > 1 else [fused]
+            mapper.update({producer: List(body=body), consumer: None})
+
+        return Transformer(mapper).visit(nodes)
+
     @dle_pass
     def _simdize(self, nodes, state):
         """
         Add compiler-specific or, if not available, OpenMP pragmas to the
         Iteration/Expression tree to emit SIMD-friendly code.
+
+        The tensors whose data layout guarantees SIMD-aligned rows along the
+        vectorized dimension (see :func:`is_simd_aligned`) are declared through
+        an ``aligned`` clause.
         """
         ignore_deps = as_tuple(self._compiler_decoration('ignore-deps'))
 
@@ -192,7 +620,8 @@ class AdvancedRewriter(BasicRewriter):
                 handle = FindSymbols('symbolics').visit(i)
                 try:
                     aligned = [j for j in handle if j.is_Tensor and
-                               j.shape[-1] % get_simd_items(j.dtype) == 0]
+                               j.indices[-1] in i.dim._defines and
+                               is_simd_aligned(j, get_simd_items(j.dtype))]
                 except KeyError:
                     aligned = []
                 if aligned:
@@ -214,7 +643,7 @@ class AdvancedRewriter(BasicRewriter):
         """
         def key(i):
             return i.is_ParallelRelaxed and not (i.is_Elementizable or i.is_Vectorizable)
-        return self._parallelizer(key).make_parallel(iet), {}
+        return self._parallelizer(key).make_parallel(iet)
 
     @dle_pass
     def _minimize_remainders(self, nodes, state):
@@ -286,6 +715,70 @@ class AdvancedRewriter(BasicRewriter):
         return processed, {}
 
 
+def blocksize_heuristic(dim_size):
+    """Return a suitable block size for a Dimension of size ``dim_size``."""
+    ths = 8  # FIXME: This really needs to be improved
+    return ths if dim_size > ths else 1
+
+
+def is_simd_aligned(tensor, simd_items):
+    """
+    Return True if the rows along the innermost :class:`Dimension` of ``tensor``,
+    as well as the first domain point of each row, are aligned to ``simd_items``
+    items. The base address of the data is assumed to be suitably aligned, as
+    the allocated memory is aligned to page boundaries.
+    """
+    (lpad, rpad), (lhalo, rhalo) = tensor._padding[-1], tensor._halo[-1]
+    try:
+        row = int(lpad + lhalo + tensor.shape[-1] + rhalo + rpad)
+    except TypeError:
+        # Symbolic shape, as in most temporaries
+        return False
+    return row % simd_items == 0 and (lpad + lhalo) % simd_items == 0
+
+
+def outer_blocksize_heuristic(dim_size):
+    """Return a suitable size for the outer blocks of a two-level blocking
+    along a Dimension of size ``dim_size``."""
+    ths = 32  # Large enough to contain several sub-blocks
+    return ths if dim_size > ths else dim_size
+
+
+def skewing_factors(exprs, dims):
+    """
+    Return a mapper from each :class:`Dimension` in ``dims`` to the factor by
+    which the corresponding :class:`Iteration` must be skewed for time tiling,
+    that is the largest distance along that Dimension between a point written
+    by ``exprs`` and a point read of the same :class:`TimeFunction`.
+
+    Return None if ``exprs`` write to anything other than :class:`TimeFunction`s
+    (and scalar temporaries), or if any distance isn't a constant.
+    """
+    writes = OrderedDict()
+    for e in exprs:
+        if e.is_scalar:
+            continue
+        if not e.write.is_TimeFunction:
+            return None
+        writes.setdefault(e.write, []).append(e.output)
+    if not writes:
+        return None
+
+    factors = OrderedDict([(d, 0) for d in dims])
+    for i in flatten(retrieve_indexed(e.expr) for e in exprs):
+        f = i.base.function
+        for w in writes.get(f, []):
+            for d in dims:
+                if d not in f.indices:
+                    continue
+                n = f.indices.index(d)
+                distance = i.indices[n] - w.indices[n]
+                if not distance.is_Integer:
+                    return None
+                factors[d] = max(factors[d], abs(int(distance)))
+    return factors
+
+
 class AdvancedRewriterSafeMath(AdvancedRewriter):
 
     """
@@ -295,6 +788,8 @@ class AdvancedRewriterSafeMath(AdvancedRewriter):
 
     def _pipeline(self, state):
         self._loop_blocking(state)
+        if self.params['linebuffers'] is True:
+            self._contract_arrays(state)
         self._simdize(state)
         if self.params['openmp'] is True:
             self._parallelize(state)
@@ -307,6 +802,8 @@ class SpeculativeRewriter(AdvancedRewriter):
     def _pipeline(self, state):
         self._avoid_denormals(state)
         self._loop_blocking(state)
+        if self.params['linebuffers'] is True:
+            self._contract_arrays(state)
         self._simdize(state)
         self._nontemporal_stores(state)
         if self.params['openmp'] is True:
@@ -343,11 +840,33 @@ class SpeculativeRewriter(AdvancedRewriter):
         return processed, {'flags': 'ntstores'}
 
 
+class AdvancedRewriterTimeTiling(AdvancedRewriter):
+
+    """
+    This Rewriter applies time tiling, rather than space blocking, to the
+    time-stepping :class:`Iteration` trees that support it.
+    """
+
+    def _pipeline(self, state):
+        self._avoid_denormals(state)
+        self._loop_time_tiling(state)
+        self._loop_blocking(state)
+        if self.params['linebuffers'] is True:
+            self._contract_arrays(state)
+        self._simdize(state)
+        if self.params['openmp'] is True:
+            self._parallelize(state)
+        self._create_elemental_functions(state)
+        self._minimize_remainders(state)
+
+
 class CustomRewriter(SpeculativeRewriter):
 
     passes_mapper = {
         'denormals': SpeculativeRewriter._avoid_denormals,
         'blocking': SpeculativeRewriter._loop_blocking,
+        'linebuffers': SpeculativeRewriter._contract_arrays,
+        'timetiling': SpeculativeRewriter._loop_time_tiling,
         'openmp': SpeculativeRewriter._parallelize,
         'simd': SpeculativeRewriter._simdize,
         'split': SpeculativeRewriter._create_elemental_functions
@@ -6,7 +6,8 @@ from devito.logger import dle
 from devito.tools import as_tuple
 
 
-__all__ = ['AbstractRewriter', 'Arg', 'BlockingArg', 'State', 'dle_pass']
+__all__ = ['AbstractRewriter', 'Arg', 'BlockingArg', 'RuntimeArg', 'TimeTilingArg',
+           'State', 'dle_pass']
 
 
 def dle_pass(func):
@@ -61,7 +62,7 @@ class Arg(object):
 
 class BlockingArg(Arg):
 
-    def __init__(self, blocked_dim, iteration, value):
+    def __init__(self, blocked_dim, iteration, value, parent=None):
         """
         Represent an argument introduced in the kernel by Rewriter._loop_blocking.
 
@@ -69,19 +70,67 @@ class BlockingArg(Arg):
         :param iteration: The :class:`Iteration` object from which the ``blocked_dim``
                           was derived.
         :param value: A suggested value determined by the DLE.
+        :param parent: (Optional) The blocked :class:`Dimension` of the enclosing
+                       block, if ``blocked_dim`` is a sub-block (i.e., the second
+                       level of a two-level blocking).
         """
         super(BlockingArg, self).__init__(blocked_dim, value)
         self.iteration = iteration
+        self.parent = parent
 
     def __repr__(self):
         return "DLE-BlockingArg[%s,%s,suggested=%s]" %\
             (self.argument, self.original_dim, self.value)
 
+    def __getstate__(self):
+        # The body of the blocked Iteration is not needed to derive a block size
+        state = self.__dict__.copy()
+        state['iteration'] = self.iteration._rebuild([])
+        return state
+
     @property
     def original_dim(self):
         return self.iteration.dim
 
 
+class RuntimeArg(Arg):
+
+    def __init__(self, argument, value):
+        """
+        Represent a scalar argument introduced in the kernel by the DLE, which
+        may be tuned at runtime, without recompiling (e.g., the number of
+        OpenMP threads).
+
+        :param argument: The :class:`Scalar` introduced in the kernel.
+        :param value: The default value, or a callable returning the default
+                      value, evaluated each time the Operator is run.
+        """
+        super(RuntimeArg, self).__init__(argument, value)
+
+    def __repr__(self):
+        return "DLE-RuntimeArg[%s,default=%s]" % (self.argument, self.value)
+
+    @property
+    def default(self):
+        return self.value() if callable(self.value) else self.value
+
+
+class TimeTilingArg(RuntimeArg):
+
+    def __init__(self, argument, value):
+        """
+        Represent the size of the time tiles introduced in the kernel by
+        Rewriter._loop_time_tiling.
+
+        :param argument: The :class:`Scalar` representing the time tile size.
+        :param value: A suggested value determined by the DLE.
+        """
+        super(TimeTilingArg, self).__init__(argument, value)
+
+    def __repr__(self):
+        return "DLE-TimeTilingArg[%s,suggested=%s]" % (self.argument, self.value)
+
+
 class AbstractRewriter(object):
     """
     Transform Iteration/Expression trees to generate high performance C.
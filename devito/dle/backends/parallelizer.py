@@ -1,11 +1,16 @@
 from collections import OrderedDict
+import os
 
 import cgen as c
+import numpy as np
 import psutil
 
-from devito.ir.iet import (FindSymbols, FindNodes, Transformer, Block, Expression,
-                           List, Iteration, retrieve_iteration_tree, filter_iterations,
-                           IsPerfectIteration)
+from devito.dle.backends.common import RuntimeArg
+from devito.ir.iet import (FindSymbols, FindNodes, Transformer, Block, Element,
+                           Expression, List, Iteration, retrieve_iteration_tree,
+                           filter_iterations, IsPerfectIteration)
+from devito.logger import warning
+from devito.types import Scalar
 
 
 class Ompizer(object):
@@ -14,11 +19,14 @@ class Ompizer(object):
     """Use a collapse clause if the number of available physical cores is
     greater than this threshold."""
 
+    SCHEDULES = {'static': 1, 'dynamic': 2, 'guided': 3, 'auto': 4}
+    """The OpenMP schedule kinds, as in ``omp_sched_t``."""
+
     lang = {
-        'for': c.Pragma('omp for schedule(static)'),
-        'collapse': lambda i: c.Pragma('omp for collapse(%d) schedule(static)' % i),
-        'par-region': lambda i: c.Pragma('omp parallel %s' % i),
-        'par-for': c.Pragma('omp parallel for schedule(static)'),
+        'for': c.Pragma('omp for schedule(runtime)'),
+        'collapse': lambda i: c.Pragma('omp for collapse(%d) schedule(runtime)' % i),
+        'par-region': lambda i, j: c.Pragma('omp parallel num_threads(%s) %s' % (i, j)),
+        'par-for': c.Pragma('omp parallel for schedule(runtime)'),
         'simd-for': c.Pragma('omp simd'),
         'simd-for-aligned': lambda i, j: c.Pragma('omp simd aligned(%s:%d)' % (i, j)),
         'atomic': c.Pragma('omp atomic update')
@@ -34,16 +42,26 @@ class Ompizer(object):
         """
         self.key = key
 
+        # The number of threads and the loop schedule are kernel arguments,
+        # so that they may be tuned at runtime, without recompiling
+        self.nthreads = Scalar(name='nthreads', dtype=np.int32)
+        self.sched_kind = Scalar(name='sched_kind', dtype=np.int32)
+        self.sched_chunk = Scalar(name='sched_chunk', dtype=np.int32)
+
     def _pragma_for(self, root, candidates):
         # Heuristic: if at least two parallel loops are available and the
-        # physical core count is greater than COLLAPSE, then omp-collapse them
+        # physical core count is greater than COLLAPSE, then omp-collapse them.
+        # An ensemble is usually smaller than the core count, so a BatchDimension
+        # is always collapsed with (at least) the next parallel loop
         nparallel = len(candidates)
-        if (psutil.cpu_count(logical=False) < Ompizer.COLLAPSE
-                or nparallel < 2
-                or not IsPerfectIteration().visit(root)):
+        if nparallel < 2 or not IsPerfectIteration().visit(root):
             return self.lang['for']
-        else:
+        elif psutil.cpu_count(logical=False) >= Ompizer.COLLAPSE:
             return self.lang['collapse'](nparallel)
+        elif root.dim.is_Batch:
+            return self.lang['collapse'](2)
+        else:
+            return self.lang['for']
 
     def _make_parallel_tree(self, root, candidates):
         """
@@ -69,6 +87,10 @@ class Ompizer(object):
         """
         Transform ``iet`` by decorating its parallel :class:`Iteration`s with
         suitable ``#pragma omp ...`` triggering thread-level parallelism.
+
+        :returns: The transformed ``iet`` as well as a dictionary of further
+                  metadata, namely the :class:`RuntimeArg`s introduced to
+                  control the number of threads and the loop schedule.
         """
         # Group sequences of loops that should go within the same parallel region
         was_tagged = False
@@ -100,9 +122,49 @@ class Ompizer(object):
             private = sorted(set([i.name for i in private]))
             private = ('private(%s)' % ','.join(private)) if private else ''
             rebuilt = [v for k, v in mapper.items() if k in group]
-            par_region = Block(header=self.lang['par-region'](private), body=rebuilt)
+            par_region = Block(header=self.lang['par-region'](self.nthreads.name,
+                                                              private),
+                               body=rebuilt)
             for k, v in list(mapper.items()):
                 if isinstance(v, Iteration):
                     mapper[k] = None if v.is_Remainder else par_region
 
-        return Transformer(mapper).visit(iet)
+        if not mapper:
+            return iet, {}
+
+        # Set the loop schedule, unless compiled without OpenMP support
+        schedule = [Element(c.Line('#ifdef _OPENMP')),
+                    Element(c.Statement('omp_set_schedule(%s, %s)' %
+                                        (self.sched_kind.name, self.sched_chunk.name))),
+                    Element(c.Line('#endif'))]
+        processed = List(body=schedule + [Transformer(mapper).visit(iet)])
+
+        arguments = [RuntimeArg(self.nthreads, default_nthreads),
+                     RuntimeArg(self.sched_kind, self.SCHEDULES['static']),
+                     RuntimeArg(self.sched_chunk, 0)]
+
+        return processed, {'arguments': arguments, 'includes': ['omp.h']}
+
+
+def default_nthreads():
+    """
+    Return the number of threads used by default by an OpenMP parallel region,
+    that is ``OMP_NUM_THREADS`` if set, otherwise the number of logical cores
+    the process may run on, which honours CPU affinity masks (e.g., as set by
+    ``taskset``, a batch scheduler or a container runtime). With nested
+    parallelism, ``OMP_NUM_THREADS`` is a comma-separated list (e.g., "8,1"),
+    whose first entry applies to the outermost parallel region.
+    """
+    nthreads = os.environ.get('OMP_NUM_THREADS', '').split(',')[0].strip()
+    if nthreads:
+        try:
+            if int(nthreads) > 0:
+                return int(nthreads)
+        except ValueError:
+            pass
+        warning("Ignoring invalid OMP_NUM_THREADS=`%s`" % os.environ['OMP_NUM_THREADS'])
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on all platforms (e.g., OSX)
+        return psutil.cpu_count()
@@ -11,6 +11,7 @@ default_modes = {
     'basic': None,
     'advanced': None,
     'advanced-safemath': None,
+    'advanced-timetiling': None,
     'speculative': None
 }
 """The DLE transformation modes.
@@ -19,7 +20,11 @@ This dictionary may be modified at backend-initialization time."""
 default_options = {
     'blockinner': False,
     'blockshape': None,
-    'blockalways': False
+    'blockalways': False,
+    'blocklevels': 1,
+    'blockremainder': True,
+    'linebuffers': False,
+    'timetile': None
 }
 """Default values for the supported optimization options.
 This dictionary may be modified at backend-initialization time."""
@@ -52,6 +57,9 @@ def transform(node, mode='basic', options=None):
         * 'basic': Add instructions to avoid denormal numbers and create elemental
                    functions for rapid JIT-compilation.
         * 'advanced': 'basic', vectorization, loop blocking.
+        * 'advanced-timetiling': 'advanced', but time-stepping loops are tiled
+                                 together with the space loops (time tiling),
+                                 where legal, instead of blocking space only.
         * 'speculative': Apply all of the 'advanced' transformations, plus other
                          transformations that might increase (or possibly decrease)
                          performance.
@@ -65,6 +73,22 @@ def transform(node, mode='basic', options=None):
                         heuristic.
         * 'blockalways': Apply blocking even though the DLE thinks it's not
                          worthwhile applying it.
+        * 'blocklevels': The number of levels of loop blocking, either 1 (the
+                         default) or 2. With 2 levels, each block is further
+                         blocked into sub-blocks (e.g., the blocks fit in L2
+                         and the sub-blocks in L1).
+        * 'blockremainder': By default, the iterations left over when a dimension
+                            size isn't a multiple of the block size are computed
+                            by separate remainder loops. Set this flag to False to
+                            compute partial blocks within the blocked loops, through
+                            min()-bounded loops, thus generating no remainder loops.
+        * 'linebuffers': Set this flag to True to contract the temporaries
+                         created by the DSE, whenever possible, into line
+                         buffers along the innermost dimension or into
+                         rotating rows along the outermost dimension, thus
+                         reducing their memory footprint.
+        * 'timetile': The default number of timesteps in a time tile. It may
+                      be changed at runtime, as it's an Operator argument.
     """
     assert isinstance(node, Node)
 
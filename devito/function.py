@@ -6,7 +6,7 @@ import numpy as np
 from psutil import virtual_memory
 
 from devito.cgen_utils import INT, cast_mapper
-from devito.data import Data, default_allocator, first_touch
+from devito.data import ALLOC_MMAP, Data, default_allocator, first_touch
 from devito.dimension import Dimension, DefaultDimension
 from devito.equation import Eq, Inc
 from devito.exceptions import InvalidArgument
@@ -23,6 +23,13 @@ from devito.tools import ReducerMap, prod
 __all__ = ['Constant', 'Function', 'TimeFunction', 'SparseFunction',
            'SparseTimeFunction']
 
+configuration.add('autopadding', 0, [0, 1], lambda i: bool(i))
+
+ALIGNMENT = 64
+"""The alignment, in bytes, of the rows of the innermost :class:`Dimension` when
+auto-padding. This is the size of the widest SIMD register (AVX-512) as well
+as of a cache line, so that the data layout doesn't depend on the host."""
+
 
 class Constant(AbstractCachedSymbol):
 
@@ -143,6 +150,14 @@ class TensorFunction(AbstractCachedFunction):
         """Shortcut for ``self.indexed[index]``."""
         return self.indexed[index]
 
+    def __getstate__(self):
+        state = super(TensorFunction, self).__getstate__()
+        if self._data is not None:
+            # The data is pickled, so the initializer (which might not be
+            # picklable anyway, e.g. a lambda) is no longer needed
+            state['initializer'] = None
+        return state
+
     def _allocate_memory(func):
         """Allocate memory as a :class:`Data`."""
         def wrapper(self):
@@ -161,7 +176,8 @@ class TensorFunction(AbstractCachedFunction):
                     except ValueError:
                         # Perhaps user only wants to initialise the physical domain
                         self.initializer(self._data[self._mask_domain])
-                else:
+                elif not self._allocator.is_Mmap:
+                    # Mapped files are zero-filled already
                     self._data.fill(0)
             return func(self)
         return wrapper
@@ -367,13 +383,22 @@ class Function(TensorFunction):
     :param dimensions: (Optional) symbolic dimensions that define the
                        data layout and function indices of this symbol.
     :param dtype: (Optional) data type of the buffered data.
+    :param batch: (Optional) the number of independent problems (e.g., shots,
+                  or models) in an ensemble. If provided, the leading dimension
+                  of the function is the :class:`BatchDimension` of ``grid``.
+                  Only grid-based functions (e.g., models, wavefields) may be
+                  batched, while sparse functions (e.g., sources, receivers)
+                  are shared by all members of the ensemble.
     :param staggered: (Optional) tuple containing staggering offsets.
     :param padding: (Optional) allocate extra grid points at a space dimension
-                    boundary. These may be used for data alignment. Defaults to 0.
-                    In alternative to an integer, a tuple, indicating the padding
-                    in each dimension, may be passed; in this case, an error is
-                    raised if such tuple has fewer entries then the number of space
-                    dimensions.
+                    boundary. These may be used for data alignment. Defaults to 0,
+                    unless ``configuration['autopadding']`` is set, in which case
+                    the innermost dimension is padded so that each of its rows,
+                    as well as the first domain point of each row, is aligned to
+                    ``ALIGNMENT`` bytes. In alternative to an integer, a tuple,
+                    indicating the padding in each dimension, may be passed; in
+                    this case, an error is raised if such tuple has fewer entries
+                    then the number of space dimensions.
     :param initializer: (Optional) A callable to initialize the data
     :param allocator: (Optional) An object of type :class:`MemoryAllocator` to
                       specify where to allocate the function data when running
@@ -443,11 +468,24 @@ class Function(TensorFunction):
                 padding = tuple((i,)*2 if isinstance(i, int) else i for i in padding)
             else:
                 raise ValueError("'padding' must be int or %d-tuple of ints" % self.ndim)
+            if 'padding' not in kwargs and configuration['autopadding']:
+                padding = padding[:-1] + (self._simd_padding(),)
             self._padding = padding
 
             # Dynamically add derivative short-cuts
             self._initialize_derivatives()
 
+    def _simd_padding(self):
+        """
+        Return the padding of the innermost dimension such that each row, as
+        well as its first domain point, is aligned to ``ALIGNMENT`` bytes.
+        """
+        items = max(ALIGNMENT // np.dtype(self.dtype).itemsize, 1)
+        lhalo, rhalo = self._halo[-1]
+        left = -lhalo % items
+        right = -(left + lhalo + self.shape_domain[-1] + rhalo) % items
+        return (left, right)
+
     def _initialize_derivatives(self):
         """
         Dynamically create notational shortcuts for space derivatives.
@@ -526,6 +564,10 @@ class Function(TensorFunction):
                 warning("Creating Function with 'grid' and 'dimensions' "
                         "argument; ignoring the 'dimensions' and using 'grid'.")
             dimensions = grid.dimensions
+        if kwargs.get('batch'):
+            if grid is None:
+                raise ValueError("Batched functions require a 'grid' argument")
+            dimensions = (grid.batch_dim,) + tuple(dimensions)
         return dimensions
 
     @classmethod
@@ -536,13 +578,24 @@ class Function(TensorFunction):
             if shape is None:
                 raise ValueError("Function needs either 'shape' or 'grid' argument")
         else:
-            shape = grid.shape_domain
+            shape = cls._batch_shape(grid.shape_domain, **kwargs)
         return shape
 
+    @classmethod
+    def _batch_shape(cls, shape, **kwargs):
+        """Prepend the ensemble size, if any, to ``shape``."""
+        batch = kwargs.get('batch')
+        if not batch:
+            return shape
+        if not isinstance(batch, int):
+            raise ValueError("'batch' must be an int indicating the ensemble "
+                             "size (is %s)" % type(batch))
+        return (batch,) + tuple(shape)
+
     @property
     def _halo_indices(self):
         """Return the function indices for which a halo region is defined."""
-        return self.indices
+        return tuple(i for i in self.indices if not i.is_Batch)
 
     @property
     def laplace(self):
@@ -592,17 +645,24 @@ class TimeFunction(Function):
     :param save: (Optional) Save the intermediate results to the data buffer.
                  Defaults to `None`, indicating the use of alternating buffers.
                  If intermediate results are required, the value of save must be
-                 set to the required size of the time dimension.
+                 set to the required size of the time dimension. If
+                 ``configuration['save_dir']`` is set, and no ``allocator``
+                 is given, the data buffer is mapped onto a file in such
+                 directory (see :class:`MmapAllocator`).
+    :param batch: (Optional) the number of independent problems (e.g., shots,
+                  or models) in an ensemble. If provided, the :class:`BatchDimension`
+                  of ``grid`` follows the time dimension. See :class:`Function`.
     :param time_dim: (Optional) The :class:`Dimension` object to use to represent
                      time in this symbol. Defaults to the time dimension provided
                      by the :class:`Grid`.
     :param staggered: (Optional) tuple containing staggering offsets.
     :param padding: (Optional) allocate extra grid points at a space dimension
-                    boundary. These may be used for data alignment. Defaults to 0.
-                    In alternative to an integer, a tuple, indicating the padding
-                    in each dimension, may be passed; in this case, an error is
-                    raised if such tuple has fewer entries then the number of
-                    space dimensions.
+                    boundary. These may be used for data alignment. Defaults to 0,
+                    unless ``configuration['autopadding']`` is set (see
+                    :class:`Function`). In alternative to an integer, a tuple,
+                    indicating the padding in each dimension, may be passed; in
+                    this case, an error is raised if such tuple has fewer entries
+                    then the number of space dimensions.
     :param initializer: (Optional) A callable to initialize the data
     :param allocator: (Optional) An object of type :class:`MemoryAllocator` to
                       specify where to allocate the function data when running
@@ -647,9 +707,15 @@ class TimeFunction(Function):
         if not self._cached():
             super(TimeFunction, self).__init__(*args, **kwargs)
 
+            # Unless told otherwise, map the saved timesteps onto disk
+            if kwargs.get('save') and 'allocator' not in kwargs and \
+                    configuration['save_dir']:
+                self._allocator = ALLOC_MMAP
+
             # Check we won't allocate too much memory for the system
             available_mem = virtual_memory().available
-            if np.dtype(self.dtype).itemsize * self.size > available_mem:
+            if np.dtype(self.dtype).itemsize * self.size > available_mem and \
+                    not self._allocator.is_Mmap:
                 warning("Trying to allocate more memory for symbol %s " % self.name +
                         "than available on physical device, this will start swapping")
 
@@ -697,14 +763,15 @@ class TimeFunction(Function):
                 if not isinstance(save, int):
                     raise ValueError("save must be an int indicating the number of " +
                                      "timesteps to be saved (is %s)" % type(save))
-                shape = (save,) + grid.shape_domain
+                shape = (save,) + cls._batch_shape(grid.shape_domain, **kwargs)
             else:
-                shape = (time_order + 1,) + grid.shape_domain
+                shape = ((time_order + 1,) +
+                         cls._batch_shape(grid.shape_domain, **kwargs))
         return shape
 
     @property
     def _halo_indices(self):
-        return tuple(i for i in self.indices if not i.is_Time)
+        return tuple(i for i in self.indices if not (i.is_Time or i.is_Batch))
 
     @property
     def forward(self):
@@ -757,6 +824,10 @@ class AbstractSparseFunction(TensorFunction):
 
     def __init__(self, *args, **kwargs):
         if not self._cached():
+            if kwargs.get('batch'):
+                raise ValueError("SparseFunction objects cannot be batched; the "
+                                 "sparse points are shared by all members of an "
+                                 "ensemble")
             super(AbstractSparseFunction, self).__init__(*args, **kwargs)
 
             npoint = kwargs.get('npoint')
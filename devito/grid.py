@@ -1,5 +1,6 @@
 from devito.tools import as_tuple
-from devito.dimension import SpaceDimension, TimeDimension, SteppingDimension
+from devito.dimension import (SpaceDimension, TimeDimension, SteppingDimension,
+                              BatchDimension)
 from devito.base import Constant
 
 import numpy as np
@@ -93,6 +94,9 @@ class Grid(object):
         else:
             raise ValueError("`time_dimension` must be None or of type TimeDimension")
 
+        # The ensemble dimension shared by all batched Functions (``batch=K``)
+        self.batch_dim = BatchDimension(name='batch')
+
     def __repr__(self):
         return "Grid[extent=%s, shape=%s, dimensions=%s]" % (
             self.extent, self.shape, self.dimensions
@@ -3,18 +3,38 @@ from collections import OrderedDict
 from devito.ir.support import (Scope, IterationSpace, detect_flow_directions,
                                force_directions, group_expressions)
 from devito.ir.clusters.cluster import PartialCluster, ClusterGroup
-from devito.symbolics import CondEq, CondNe, IntDiv, xreplace_indices
+from devito.parameters import configuration
+from devito.symbolics import (CondEq, CondNe, IntDiv, retrieve_indexed,
+                              xreplace_indices)
 from devito.types import Scalar
 from devito.tools import flatten, powerset
 
 __all__ = ['clusterize', 'groupby']
 
+configuration.add('fusion', 'greedy', ['greedy', 'cost'])
+
+MAX_STREAMS = 16
+"""The maximum number of memory streams in a loop nest above which the fusion
+cost model stops fusing loop nests not sharing any data. This roughly matches
+the number of streams tracked by the hardware prefetchers of modern CPUs."""
+
 
 def groupby(clusters):
     """
     Attempt grouping :class:`PartialCluster`s together to create bigger
     :class:`PartialCluster`s (i.e., containing more expressions).
 
+    The grouping policy is dictated by ``configuration['fusion']``: ::
+
+        * 'greedy': a PartialCluster is fused into the closest preceding
+                    PartialCluster, as long as data dependences allow it.
+        * 'cost': among all PartialClusters a PartialCluster may legally be
+                  fused into, the one sharing the most memory streams (see
+                  :func:`detect_streams`) is selected, which minimizes the
+                  number of passes over memory. PartialClusters not sharing
+                  any stream are kept distributed if fusion would exceed
+                  ``MAX_STREAMS`` memory streams.
+
     .. note::
 
         This function relies on advanced data dependency analysis tools
@@ -22,13 +42,15 @@ def groupby(clusters):
     """
     clusters = clusters.unfreeze()
 
+    greedy = configuration['fusion'] == 'greedy'
+
     processed = ClusterGroup()
     for c in clusters:
         if c.guards:
             # Guarded clusters cannot be grouped together
             processed.append(c)
             continue
-        fused = False
+        options = []
         for candidate in reversed(list(processed)):
             # Collect all relevant data dependences
             scope = Scope(exprs=candidate.exprs + c.exprs)
@@ -43,7 +65,7 @@ def groupby(clusters):
 
             if candidate.ispace.is_compatible(c.ispace) and\
                     all(is_local(i, candidate, c, clusters) for i in funcs):
-                # /c/ will be fused into /candidate/. All fusion-induced anti
+                # /c/ may be fused into /candidate/. All fusion-induced anti
                 # dependences are eliminated through so called "index bumping and
                 # array contraction", which transforms array accesses into scalars
 
@@ -52,10 +74,11 @@ def groupby(clusters):
                 funcs += [i.function for i in scope.d_flow.independent()
                           if is_local(i.function, candidate, c, clusters)]
 
-                bump_and_contract(funcs, candidate, c)
-                candidate.squash(c)
-                fused = True
-                break
+                options.append((candidate, funcs))
+                if greedy or any(crosses(i, candidate) for i in scope.d_all):
+                    # Either no need to look any further, or /c/ cannot be
+                    # moved past /candidate/
+                    break
             elif anti:
                 # Data dependences prevent fusion with earlier clusters, so
                 # must break up the search
@@ -65,13 +88,66 @@ def groupby(clusters):
                 # We cannot even attempt fusing with earlier clusters, as
                 # otherwise the existing flow dependences wouldn't be honored
                 break
-        # Fallback
-        if not fused:
+
+        if options and not greedy:
+            # Pick the fusion maximizing data reuse; among equally good
+            # options, the closest preceding cluster is preferred
+            streams = detect_streams(c.exprs)
+            reuse = [len(streams & detect_streams(i.exprs)) for i, _ in options]
+            best = reuse.index(max(reuse))
+            candidate, funcs = options[best]
+            if reuse[best] == 0 and\
+                    len(streams | detect_streams(candidate.exprs)) > MAX_STREAMS:
+                # No data reuse, while fusion would increase the pressure on
+                # the hardware prefetchers and the TLB: keep /c/ distributed.
+                # Only the time loop may be shared with the preceding clusters
+                c.atomics.update(i.dim for i in c.ispace.intervals if not i.dim.is_Time)
+                options = []
+            else:
+                options = [options[best]]
+
+        if options:
+            candidate, funcs = options[0]
+            bump_and_contract(funcs, candidate, c)
+            candidate.squash(c)
+        else:
+            # Fallback
             processed.append(c)
 
     return processed
 
 
+def crosses(dependence, candidate):
+    """
+    Return True if ``dependence``, detected in a :class:`Scope` built from the
+    expressions of ``candidate`` followed by those of another
+    :class:`PartialCluster`, has its source in one PartialCluster and its sink
+    in the other, False otherwise (e.g., for the time-carried dependences of an
+    equation on itself).
+    """
+    n = len(candidate.exprs)
+    return (dependence.source.timestamp < n) != (dependence.sink.timestamp < n)
+
+
+def detect_streams(exprs):
+    """
+    Return the memory streams accessed by ``exprs``. A memory stream is
+    uniquely identified by a tensor and, for time-varying tensors, the index
+    along the time dimension, as different time slots are stored in different
+    regions of memory.
+    """
+    streams = set()
+    for i in flatten(retrieve_indexed(e, mode='all') for e in exprs):
+        f = i.base.function
+        if not f.is_Tensor:
+            continue
+        elif f.is_TimeFunction:
+            streams.add((f, i.indices[f._time_position]))
+        else:
+            streams.add((f, None))
+    return streams
+
+
 def guard(clusters):
     """
     Return a new :class:`ClusterGroup` including new :class:`PartialCluster`s
@@ -196,8 +196,11 @@ class DummyEq(ClusterizedEq):
     writing tests, when there is no need to know the iteration/data spaces.
     """
 
-    def __new__(cls, *args):
-        if len(args) == 1:
+    def __new__(cls, *args, **kwargs):
+        if 'stamp' in kwargs:
+            # origin: DummyEq(lhs, rhs, stamp=DummyEq), e.g. upon ``xreplace``
+            return ClusterizedEq.__new__(cls, *args, **kwargs)
+        elif len(args) == 1:
             input_expr = args[0]
             assert isinstance(input_expr, Eq)
             obj = LoweredEq(input_expr)
@@ -12,7 +12,8 @@ import cgen as c
 from devito.cgen_utils import ccode
 from devito.ir.equations import ClusterizedEq
 from devito.ir.iet import (IterationProperty, SEQUENTIAL, PARALLEL, PARALLEL_IF_ATOMIC,
-                           VECTOR, ELEMENTAL, REMAINDER, WRAPPABLE, tagger, ntags)
+                           VECTOR, ELEMENTAL, REMAINDER, WRAPPABLE, SKEWED,
+                           tagger, ntags)
 from devito.ir.support import Forward, detect_io
 from devito.dimension import Dimension
 from devito.symbolics import FunctionFromPointer, as_symbol
@@ -392,6 +393,10 @@ class Iteration(Node):
     def is_Remainder(self):
         return REMAINDER in self.properties
 
+    @property
+    def is_Skewed(self):
+        return SKEWED in self.properties
+
     @property
     def tag(self):
         for i in self.properties:
@@ -587,13 +592,17 @@ class TimedList(List):
 
     """Wrap a Node with C-level timers."""
 
-    def __init__(self, lname, gname, body):
+    def __init__(self, lname, gname, body, counters=()):
         """
         Initialize a TimedList object.
 
         :param lname: Timer name in the local scope.
         :param gname: Name of the global struct tracking all timers.
         :param body: Timed block of code.
+        :param counters: (Optional) names of the hardware counters to be read,
+                         through the file descriptors in the ``perf_fds`` array
+                         (one row per counter, one column per thread), around
+                         the timed block of code.
         """
         self._name = lname
         # TODO: need omp master pragma to be thread safe
@@ -604,6 +613,13 @@ class TimedList(List):
                                "(double)(end_%(ln)s.tv_sec-start_%(ln)s.tv_sec)+" +
                                "(double)(end_%(ln)s.tv_usec-start_%(ln)s.tv_usec)" +
                                "/1000000") % {'gn': gname, 'ln': lname})]
+        for n, i in reversed(list(enumerate(counters or ()))):
+            values = {'gn': gname, 'ln': lname, 'cn': i, 'n': n}
+            read = "devito_perf_read(perf_fds[%(n)d], perf_nthreads)" % values
+            header.append(c.Statement(("long long start_%(ln)s_%(cn)s = " % values) +
+                                      read))
+            footer.insert(0, c.Statement(("%(gn)s->%(ln)s_%(cn)s += " % values) + read +
+                                         (" - start_%(ln)s_%(cn)s" % values)))
         super(TimedList, self).__init__(header, body, footer)
 
     def __repr__(self):
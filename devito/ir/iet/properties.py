@@ -57,6 +57,10 @@ WRAPPABLE = IterationProperty('wrappable')
 one or more buffer slots can be dropped without affecting correctness. For example,
 u[t+1, ...] = f(u[t, ...], u[t-1, ...]) --> u[t-1, ...] = f(u[t, ...], u[t-1, ...])."""
 
+SKEWED = IterationProperty('skewed')
+"""The Iteration bounds depend on an outer time Iteration, as a result of skewing
+the Iteration space (e.g., to implement time tiling)."""
+
 
 def tagger(i):
     return IterationProperty('tag', i)
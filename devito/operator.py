@@ -1,13 +1,18 @@
 from __future__ import absolute_import
 
 from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from os import path
+from platform import node
 
 from cached_property import cached_property
 import ctypes
+import threading
 import numpy as np
 import sympy
 
-from devito.compiler import jit_compile, load
+from devito.compiler import jit_compile, jit_executor, jit_hash, jit_insert, load
 from devito.dimension import Dimension
 from devito.dle import transform
 from devito.dse import rewrite
@@ -18,12 +23,14 @@ from devito.ir.clusters import clusterize
 from devito.ir.iet import (Callable, List, MetaCall, iet_build, iet_insert_C_decls,
                            ArrayCast, PointerCast, derive_parameters)
 from devito.parameters import configuration
-from devito.profiling import create_profile
+from devito.profiling import Trace, create_profile, create_trace
 from devito.symbolics import indexify
 from devito.tools import (ReducerMap, as_tuple, flatten, filter_sorted, numpy_to_ctypes,
                           split)
 from devito.types import Object
 
+configuration.add('operator_cache', 0)
+
 
 class Operator(Callable):
 
@@ -58,6 +65,20 @@ class Operator(Callable):
         dse = kwargs.get("dse", configuration['dse'])
         dle = kwargs.get("dle", configuration['dle'])
 
+        # Skip lowering altogether if an equivalent Operator was built before
+        key = self._cache_key(expressions, subs, dse, dle)
+        state = operator_cache.fetch(key)
+        if state is not None:
+            self.__dict__.update({k: v.copy() if isinstance(v, (list, dict)) else v
+                                  for k, v in state.items()})
+            return
+
+        # The DSE and DLE modes, as reported in the performance reports
+        self._dse_mode = set_dse_mode(dse)
+        self._dle_mode = set_dle_mode(dle)[0] or 'noop'
+        if isinstance(self._dle_mode, tuple):
+            self._dle_mode = ','.join(self._dle_mode)
+
         # Header files, etc.
         self._headers = list(self._default_headers)
         self._includes = list(self._default_includes)
@@ -67,6 +88,7 @@ class Operator(Callable):
         self._compiler = configuration['compiler']
         self._lib = None
         self._cfunction = None
+        self._compiling = None
 
         # References to local or external routines
         self.func_table = OrderedDict()
@@ -108,8 +130,11 @@ class Operator(Callable):
                                 if isinstance(i.argument, Dimension)])
         self._includes.extend(list(dle_state.includes))
 
+        # Introduce C-level tracing within the parallel regions
+        nodes = self._trace_threads(dle_state.nodes)
+
         # Introduce the required symbol declarations
-        nodes = iet_insert_C_decls(dle_state.nodes, self.func_table)
+        nodes = iet_insert_C_decls(nodes, self.func_table)
 
         # Insert data and pointer casts for array parameters and profiling structs
         nodes = self._build_casts(nodes)
@@ -120,6 +145,69 @@ class Operator(Callable):
         # Finish instantiation
         super(Operator, self).__init__(self.name, nodes, 'int', parameters, ())
 
+        # Track the lowered state, so that it may be reused by equivalent Operators
+        operator_cache.insert(key, self.__dict__)
+
+    def _cache_key(self, expressions, subs, dse, dle):
+        """
+        Return a key uniquely identifying the lowering of ``expressions`` in the
+        current configuration, or None if such a key cannot be built (e.g.,
+        because some of the input is unhashable).
+        """
+        mode, options = set_dle_mode(dle)
+        handle = [(k, str(v)) for k, v in configuration.items()]
+        handle.extend((k, str(v)) for k, v in configuration.backend.items())
+        handle.append(tuple(configuration['compiler'].cflags))
+        key = (type(self), expressions, self.name, frozenset(subs.items()),
+               set_dse_mode(dse), mode, tuple(sorted(options.items())), tuple(handle))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def __getstate__(self):
+        """
+        Return the state of the Operator to be pickled. Rather than the
+        Iteration/Expression tree, the generated code is pickled. If the Operator
+        has already been JIT-compiled, the shared object is pickled as well, so
+        that the unpickled Operator may run straight away, without generating
+        nor compiling any code.
+        """
+        state = {k: v for k, v in self.__dict__.items() if k not in
+                 ['_args', 'body', 'func_table', '_headers', '_includes', '_globals',
+                  '_compiler', '_lib', '_cfunction', '_compiling']}
+        state['_ccode'] = str(self.ccode)
+        if self._lib is not None:
+            with open(self._lib._name, 'rb') as f:
+                state['_soobj'] = (jit_hash(state['_ccode'], self._compiler), f.read())
+        return state
+
+    def __setstate__(self, state):
+        soobj = state.pop('_soobj', None)
+        self.__dict__.update(state)
+        self.body = None
+        self.func_table = OrderedDict()
+
+        # Use the local toolchain. The pickled shared object is only usable if
+        # it would be produced by the local toolchain too; otherwise, the code
+        # will be JIT-compiled, as usual, upon the first call to ``apply``
+        self._compiler = configuration['compiler']
+        self._lib = None
+        self._cfunction = None
+        self._compiling = None
+        if soobj is not None:
+            key, binary = soobj
+            if key == jit_hash(self._ccode, self._compiler):
+                jit_insert(self._ccode, self._compiler, binary)
+
+    @property
+    def ccode(self):
+        if self.body is None:
+            # Unpickled Operator, which only carries the generated code
+            return self._ccode
+        return super(Operator, self).ccode
+
     def prepare_arguments(self, **kwargs):
         """
         Process runtime arguments passed to ``.apply()` and derive
@@ -147,18 +235,29 @@ class Operator(Callable):
         # DLE arguments would be massaged into the IET so as to comply
         # with the rest of the argument derivation procedure.
         for arg in self.dle_args:
+            if not arg.argument.is_Dimension:
+                # A runtime-tunable argument (e.g., the number of OpenMP threads)
+                name = arg.argument.name
+                args[name] = kwargs.pop(name) if name in kwargs else arg.default
+                continue
             dim = arg.argument
             osize = args[arg.original_dim.symbolic_size.name]
             if dim.symbolic_size in self.parameters:
-                if arg.value is None:
+                if dim.symbolic_size.name in kwargs:
+                    # User-provided block size
+                    args[dim.symbolic_size.name] = kwargs.pop(dim.symbolic_size.name)
+                elif arg.value is None:
                     args[dim.symbolic_size.name] = osize
                 elif isinstance(arg.value, int):
                     args[dim.symbolic_size.name] = arg.value
                 else:
                     args[dim.symbolic_size.name] = arg.value(osize)
 
-        # Add in the profiler argument
+        # Add in the profiler argument(s)
         args[self.profiler.name] = self.profiler.new()
+        if self.profiler.trace:
+            trace = kwargs.pop(Trace.name, None)
+            args[Trace.name] = Trace() if trace is None else trace
 
         # Add in any backend-specific argument
         args.update(kwargs.pop('backend', {}))
@@ -179,6 +278,9 @@ class Operator(Callable):
         """Return an iterable of arguments that can be passed to ``apply``
         when running the operator."""
         ret = set.union(*[set(i._arg_names) for i in self.input + self.dimensions])
+        ret.update(i.argument.name for i in self.dle_args if not i.argument.is_Dimension)
+        if self.profiler.trace:
+            ret.add(Trace.name)
         return tuple(sorted(ret))
 
     def arguments(self, **kwargs):
@@ -205,32 +307,67 @@ class Operator(Callable):
         """
         if self._lib is None:
             # No need to recompile if a shared object has already been loaded.
-            return jit_compile(self.ccode, self._compiler)
+            if self._compiling is not None:
+                # Already submitted through ``compile_async``
+                return self._compiling.result()
+            return self._jit_compile(self.ccode)
         else:
             return self._lib.name
 
+    def compile_async(self):
+        """
+        JIT-compile the C code generated by the Operator in the background,
+        through the thread pool returned by :func:`jit_executor`.
+
+        Any subsequent attempt to run the Operator blocks until the
+        compilation has completed.
+
+        :returns: A :class:`concurrent.futures.Future`, whose result is the
+                  file name of the JIT-compiled function.
+        """
+        if self._compiling is None:
+            if self._lib is None:
+                # The code is generated in the calling thread, which owns the IET
+                self._compiling = jit_executor().submit(self._jit_compile,
+                                                        str(self.ccode))
+            else:
+                self._compiling = Future()
+                self._compiling.set_result(self._lib.name)
+        return self._compiling
+
+    def _jit_compile(self, ccode):
+        """JIT-compile ``ccode``, returning the name of the compilation unit."""
+        return jit_compile(ccode, self._compiler)
+
     @property
     def cfunction(self):
         """Returns the JIT-compiled C function as a ctypes.FuncPtr object."""
-        if self._lib is None:
-            basename = self.compile
-            self._lib = load(basename, self._compiler)
-            self._lib.name = basename
-
-        if self._cfunction is None:
-            self._cfunction = getattr(self._lib, self.name)
-            # Associate a C type to each argument for runtime type check
-            argtypes = []
-            for i in self.parameters:
-                if i.is_Object:
-                    argtypes.append(ctypes.c_void_p)
-                elif i.is_Scalar:
-                    argtypes.append(numpy_to_ctypes(i.dtype))
-                elif i.is_Tensor:
-                    argtypes.append(np.ctypeslib.ndpointer(dtype=i.dtype, flags='C'))
-                else:
-                    argtypes.append(ctypes.c_void_p)
-            self._cfunction.argtypes = argtypes
+        if self._cfunction is not None:
+            return self._cfunction
+
+        # Several threads may attempt to run a fresh Operator at once
+        with _load_lock:
+            if self._lib is None:
+                basename = self.compile
+                self._lib = load(basename, self._compiler)
+                self._lib.name = basename
+
+            if self._cfunction is None:
+                cfunction = getattr(self._lib, self.name)
+                # Associate a C type to each argument for runtime type check
+                argtypes = []
+                for i in self.parameters:
+                    if i.is_Object:
+                        argtypes.append(ctypes.c_void_p)
+                    elif i.is_Scalar:
+                        argtypes.append(numpy_to_ctypes(i.dtype))
+                    elif i.is_Tensor:
+                        argtypes.append(np.ctypeslib.ndpointer(dtype=i.dtype,
+                                                               flags='C'))
+                    else:
+                        argtypes.append(ctypes.c_void_p)
+                cfunction.argtypes = argtypes
+                self._cfunction = cfunction
 
         return self._cfunction
 
@@ -238,6 +375,11 @@ class Operator(Callable):
         """Introduce C-level profiling nodes within the Iteration/Expression tree."""
         return List(body=nodes), None
 
+    def _trace_threads(self, nodes):
+        """Introduce C-level per-thread tracing nodes within the parallel regions
+        of the Iteration/Expression tree."""
+        return nodes
+
     def _autotune(self, args):
         """Use auto-tuning on this Operator to determine empirically the
         best block sizes when loop blocking is in use."""
@@ -256,7 +398,12 @@ class Operator(Callable):
     def _build_parameters(self, nodes):
         """Determine the Operator parameters based on the Iteration/Expression
         tree ``nodes``."""
-        return derive_parameters(nodes, True)
+        parameters = derive_parameters(nodes, True)
+        # Some DLE arguments might only appear within pragmas (e.g., the number
+        # of OpenMP threads), so they are explicitly added
+        parameters.extend([i.argument for i in self.dle_args if
+                           not i.argument.is_Dimension and i.argument not in parameters])
+        return parameters
 
     def _build_casts(self, nodes):
         """Introduce array and pointer casts at the top of the Iteration/Expression
@@ -264,6 +411,8 @@ class Operator(Callable):
         casts = [ArrayCast(f) for f in self.input if f.is_Tensor and f._mem_external]
         profiler = Object(self.profiler.name, self.profiler.dtype, self.profiler.new)
         casts.append(PointerCast(profiler))
+        if self.profiler.trace:
+            casts.append(PointerCast(Object(Trace.name, Trace.dtype, Trace)))
         return List(body=casts + [nodes])
 
 
@@ -304,6 +453,11 @@ class OperatorRunnable(Operator):
                 ignored (raising a warning) if ``d_M`` is also provided. ``v`` is
                 an integer value.
 
+        ``apply`` may be called concurrently from several threads, as the kernel
+        runs without holding the GIL and each run gets its own profiling timers.
+        Concurrent runs must not write to the same data objects, though; see
+        :class:`ShotScheduler` to run several shots of an operator at once.
+
         Examples
         --------
         The following operator implements a trivial time-marching method which
@@ -354,6 +508,26 @@ class OperatorRunnable(Operator):
         # Output summary of performance achieved
         return self._profile_output(args)
 
+    def bind(self, **kwargs):
+        """
+        Derive and check the runtime arguments once, and return a
+        :class:`BoundOperator`, which may then run the operator repeatedly at a
+        fraction of the Python overhead of ``apply``.
+
+        :param kwargs: The runtime arguments, as in ``apply``.
+
+        Examples
+        --------
+        >>> from devito import Eq, Grid, TimeFunction, Operator
+        >>> grid = Grid(shape=(3, 3))
+        >>> u = TimeFunction(name='u', grid=grid, save=10)
+        >>> op = Operator(Eq(u.forward, u + 1))
+        >>> run = op.bind()
+        >>> for i in range(0, 8, 2):
+        ...     run(time_m=i, time_M=i+1)
+        """
+        return BoundOperator(self, **kwargs)
+
     def _profile_output(self, args):
         """Return a performance summary of the profiled sections."""
         summary = self.profiler.summary(args, self._dtype)
@@ -363,14 +537,208 @@ class OperatorRunnable(Operator):
                 gpointss = ", %.2f GPts/s" % v.gpointss if k == 'main' else ''
                 info("Section %s with OI=%.2f computed in %.3f s [%.2f GFlops/s%s]" %
                      (name, v.oi, v.time, v.gflopss, gpointss))
+                ipc, oi, bandwidth = [i[k] for i in (summary.ipc, summary.measured_oi,
+                                                     summary.bandwidth)]
+                if ipc is not None:
+                    info("Section %s executed %.2f instructions/cycle" % (name, ipc))
+                if oi is not None:
+                    info("Section %s with measured OI=%.2f moved %.2f GB/s" %
+                         (name, oi, bandwidth))
+
+        # Export a machine-readable performance report
+        report = configuration['profiling_report']
+        history = configuration['profiling_history']
+        if report or history:
+            summary.metadata = self._profile_metadata(args)
+            if report:
+                summary.save(report)
+            if history:
+                summary.append(history)
+
         return summary
 
-    def _profile_sections(self, nodes,):
+    def _profile_metadata(self, args):
+        """Return the properties of a run identifying it in a performance report."""
+        from devito import __version__
+        blocks = [i.argument.symbolic_size.name for i in self.dle_args
+                  if i.argument.is_Dimension]
+        return OrderedDict([
+            ('timestamp', datetime.now().isoformat()),
+            ('name', self.name),
+            ('code', path.basename(self._lib.name)),
+            ('version', __version__),
+            ('host', node()),
+            ('platform', configuration['platform']),
+            ('isa', configuration['isa']),
+            ('compiler', self._compiler.__class__.__name__),
+            ('dse', self._dse_mode),
+            ('dle', self._dle_mode),
+            ('blocks', OrderedDict([(i, int(args[i])) for i in blocks if i in args])),
+            ('nthreads', int(args.get('nthreads', 1)))
+        ])
+
+    def _profile_sections(self, nodes):
         """Introduce C-level profiling nodes within the Iteration/Expression tree."""
-        nodes, profiler = create_profile('timers', nodes)
+        mode = configuration['profiling']
+        nodes, profiler = create_profile('timers', nodes, mode == 'advanced',
+                                         mode == 'trace')
+        self._headers.extend(profiler.headers)
+        self._includes.extend(profiler.includes)
         self._globals.append(profiler.cdef)
+        self._globals.extend(profiler.cglobals)
         return nodes, profiler
 
+    def _trace_threads(self, nodes):
+        """Introduce C-level per-thread tracing nodes within the parallel regions
+        of the Iteration/Expression tree."""
+        return create_trace(nodes, self.profiler)
+
+
+class BoundOperator(object):
+
+    """
+    A callable running an :class:`OperatorRunnable` with a fixed set of runtime
+    arguments, which are derived and checked only once, upon construction.
+
+    Any scalar argument, such as ``time_m`` and ``time_M``, may be overridden
+    when calling a BoundOperator. Overrides are passed straight to the compiled
+    kernel, without any further processing or checking. It is therefore up to
+    the caller to provide legal values (e.g., ``time_M`` must not exceed the
+    size of any saved :class:`TimeFunction`).
+
+    The arguments are packed as raw ctypes values (e.g., data pointers rather
+    than :class:`numpy.ndarray`s), so that calling into the compiled kernel does
+    not incur any Python-level type checking. The packed arguments are
+    rebuilt only if the data of any of the bound :class:`TensorFunction`s
+    gets reallocated.
+
+    :param operator: The :class:`OperatorRunnable` to be run.
+    :param kwargs: The runtime arguments, as in ``operator.apply(**kwargs)``.
+    """
+
+    def __init__(self, operator, **kwargs):
+        self.operator = operator
+        self._kwargs = kwargs
+        self._overrides = {}
+
+        # The kernel, without any argument type checking
+        operator.cfunction
+        self._cfunction = operator._lib[operator.name]
+
+        self._position = {p.name: i for i, p in enumerate(operator.parameters)
+                          if p.is_Scalar}
+        self._ctypes = {p.name: numpy_to_ctypes(p.dtype) for p in operator.parameters
+                        if p.is_Scalar}
+
+        self._pack()
+
+    def _pack(self):
+        """Derive the runtime arguments and pack them as ctypes values."""
+        self.arguments = self.operator.arguments(**self._kwargs)
+
+        self._values = []
+        self._sources = []
+        for p in self.operator.parameters:
+            value = self.arguments[p.name]
+            if p.is_Tensor:
+                if value.dtype != p.dtype or not value.flags.c_contiguous:
+                    raise ValueError("Argument %s must be a C-contiguous array of "
+                                     "type %s" % (p.name, np.dtype(p.dtype)))
+                self._values.append(ctypes.c_void_p(value.ctypes.data))
+                # Track the data-carrying object, to detect reallocations
+                source = self._kwargs.get(p.name, p)
+                if getattr(source, 'is_TensorFunction', False):
+                    self._sources.append((source, source._data))
+            elif p.is_Scalar:
+                self._values.append(self._ctypes[p.name](value))
+            else:
+                self._values.append(value)
+
+        self._timers = self.arguments[self.operator.profiler.name]._obj
+
+    def __call__(self, **kwargs):
+        if any(f._data is not data for f, data in self._sources):
+            self._pack()
+
+        values = self._values
+        if kwargs:
+            values = list(values)
+            for k, v in kwargs.items():
+                try:
+                    values[self._position[k]] = self._ctypes[k](v)
+                except KeyError:
+                    raise ValueError("Unrecognized argument %s=%s passed to "
+                                     "a BoundOperator" % (k, v))
+
+        # Reset the timers, which are accumulated by the kernel
+        ctypes.memset(ctypes.addressof(self._timers), 0, ctypes.sizeof(self._timers))
+
+        self._cfunction(*values)
+        self._overrides = kwargs
+
+    def summary(self):
+        """Return a performance summary of the most recent run."""
+        args = dict(self.arguments)
+        args.update(self._overrides)
+        return self.operator.profiler.summary(args, self.operator._dtype)
+
+
+class OperatorCache(OrderedDict):
+
+    """
+    A LRU cache for the state of lowered :class:`Operator`s, keyed on the
+    input expressions, the DSE/DLE modes and the current configuration.
+
+    The capacity is given by ``configuration['operator_cache']``; 0 (the default)
+    disables caching. Note that cached state holds a reference to the
+    :class:`Function`s, and therefore to the data, used to build an Operator;
+    ``devito.clear_cache()`` therefore also empties the cache.
+    """
+
+    def fetch(self, key):
+        if key is None or key not in self:
+            return None
+        self.move_to_end(key)
+        return self[key]
+
+    def insert(self, key, state):
+        capacity = configuration['operator_cache']
+        if key is None or capacity <= 0:
+            return
+        self[key] = dict(state)
+        while len(self) > capacity:
+            self.popitem(last=False)
+
+    def invalidate(self, *functions):
+        """
+        Drop from the cache all entries in which any of ``functions`` appears.
+        If no ``functions`` are provided, drop all entries.
+        """
+        if not functions:
+            self.clear()
+            return
+        for key, state in list(self.items()):
+            if any(i in state['input'] or i in state['output'] for i in functions):
+                self.pop(key)
+
+
+operator_cache = OperatorCache()
+"""The cache of lowered :class:`Operator`s."""
+
+_load_lock = threading.Lock()
+"""Serialize the loading of JIT-compiled functions across threads."""
+
+
+def compile_operators(*operators):
+    """
+    JIT-compile ``operators`` concurrently, rather than one after the other,
+    and block until all of them have been compiled.
+
+    :returns: The file names of the JIT-compiled functions.
+    """
+    futures = [i.compile_async() for i in operators]
+    return [i.result() for i in futures]
+
 
 # Misc helpers
 
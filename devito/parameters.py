@@ -99,12 +99,23 @@ env_vars_mapper = {
     'DEVITO_BACKEND': 'backend',
     'DEVITO_DEVELOP': 'develop-mode',
     'DEVITO_DSE': 'dse',
+    'DEVITO_FUSION': 'fusion',
+    'DEVITO_PROFILING': 'profiling',
+    'DEVITO_PROFILING_REPORT': 'profiling_report',
+    'DEVITO_PROFILING_HISTORY': 'profiling_history',
     'DEVITO_DLE': 'dle',
     'DEVITO_DLE_OPTIONS': 'dle_options',
     'DEVITO_OPENMP': 'openmp',
     'DEVITO_LOGGING': 'log_level',
     'DEVITO_FIRST_TOUCH': 'first_touch',
+    'DEVITO_AUTOPADDING': 'autopadding',
+    'DEVITO_ALLOC_POOL': 'alloc_pool',
+    'DEVITO_HUGEPAGES': 'hugepages',
+    'DEVITO_SAVE_DIR': 'save_dir',
     'DEVITO_DEBUG_COMPILER': 'debug_compiler',
+    'DEVITO_JIT_CACHE': 'jit_cache',
+    'DEVITO_OPERATOR_CACHE': 'operator_cache',
+    'DEVITO_JIT_WORKERS': 'jit_workers',
 }
 
 configuration = Parameters("Devito-Configuration")
@@ -1,21 +1,51 @@
 from __future__ import absolute_import
 
+import csv
+import json
 import operator
 from collections import OrderedDict, namedtuple
 from functools import reduce
 
-from ctypes import Structure, byref, c_double
-from cgen import Struct, Value
+from ctypes import POINTER, Structure, byref, c_double, c_long, c_longlong
+from cgen import Initializer, Line, Pragma, Statement, Struct, Value
+import numpy as np
 
-from devito.ir.iet import (Expression, TimedList, FindNodes, Transformer,
-                           FindAdjacentIterations, retrieve_iteration_tree)
+from devito.ir.iet import (Block, Element, Expression, Iteration, List, TimedList,
+                           FindNodes, Transformer, FindAdjacentIterations,
+                           retrieve_iteration_tree)
+from devito.parameters import configuration
 from devito.symbolics import estimate_cost, estimate_memory
 from devito.tools import flatten
 
-__all__ = ['Profile', 'create_profile']
+__all__ = ['Profile', 'Trace', 'create_profile', 'create_trace']
 
+configuration.add('profiling', 'basic', ['basic', 'advanced', 'trace'])
 
-def create_profile(name, node):
+# A file to write the performance report of each run to, as CSV if its extension
+# is ".csv", as JSON otherwise (0 disables the report)
+configuration.add('profiling_report', 0)
+
+# A JSON Lines file to which the performance report of each run is appended
+# (0 disables the history)
+configuration.add('profiling_history', 0)
+
+PERF_COUNTERS = OrderedDict([
+    ('cycles', 'PERF_COUNT_HW_CPU_CYCLES'),
+    ('instructions', 'PERF_COUNT_HW_INSTRUCTIONS'),
+    ('llcmisses', 'PERF_COUNT_HW_CACHE_MISSES')
+])
+"""The hardware counters read around each profiled section, through Linux'
+``perf_event_open``, in 'advanced' profiling mode."""
+
+CACHELINE = 64
+"""The size, in bytes, of the data moved from/to memory by a last-level
+cache miss."""
+
+TRACE_CAPACITY = 2**16
+"""The default number of events a :class:`Trace` can hold."""
+
+
+def create_profile(name, node, counters=False, trace=False):
     """
     Create a :class:`Profiler` for the Iteration/Expression tree ``node``.
     The following code sections are profiled: ::
@@ -32,8 +62,14 @@ def create_profile(name, node):
           Both Iterations have dimension ``x``, and will be profiled as a single
           section, though their extent is different.
         * Any perfectly nested loops.
+
+    If ``counters`` is True, the hardware counters in ``PERF_COUNTERS`` are
+    also read around each profiled section.
+
+    If ``trace`` is True, the start and end time of each profiled section, at
+    each timestep, are also recorded into a :class:`Trace`.
     """
-    profiler = Profiler(name)
+    profiler = Profiler(name, counters, trace)
 
     trees = retrieve_iteration_tree(node)
     if not trees:
@@ -76,10 +112,23 @@ def create_profile(name, node):
 
         # Prepare to transform the Iteration/Expression tree
         body = (root,) + remainder
-        lname = 'section_%d' % len(mapper)
-        mapper[root] = TimedList(gname=name, lname=lname, body=body)
+        n = len(mapper)
+        lname = 'section_%d' % n
+        mapper[root] = TimedList(gname=name, lname=lname, body=body,
+                                 counters=profiler.counters)
         mapper.update(OrderedDict([(j, None) for j in remainder]))
 
+        if profiler.trace:
+            # The innermost time loop (if any) provides the timestep
+            outer = group[0][:group[0].index(root)]
+            timestep = outer[-1].index if outer else 0
+            profiler._traced[lname] = (n, timestep)
+            header = [Initializer(Value('double', 'tstart_%s' % lname),
+                                  'devito_clock()')]
+            footer = [Statement('devito_trace(trace, %d, %s, -1, tstart_%s, '
+                                'devito_clock())' % (n, timestep, lname))]
+            mapper[root] = List(header=header, body=mapper[root], footer=footer)
+
         # Estimate computational properties of the profiled section
         expressions = FindNodes(Expression).visit(body)
         ops = estimate_cost([e.expr for e in expressions])
@@ -91,9 +140,55 @@ def create_profile(name, node):
     # Transform the Iteration/Expression tree introducing the C-level timers
     processed = Transformer(mapper).visit(node)
 
+    # The hardware counters are opened once, upon entering the kernel, by
+    # each OpenMP thread
+    if profiler.counters:
+        header = [Initializer(Value('int', 'perf_nthreads'), 'devito_perf_nthreads()'),
+                  Statement('int perf_fds[%d][perf_nthreads]' % len(PERF_COUNTERS))]
+        header.extend([Statement('devito_perf_open(perf_fds[%d], %s, perf_nthreads)'
+                                 % (i, v)) for i, v in enumerate(PERF_COUNTERS.values())])
+        footer = [Statement('devito_perf_close(perf_fds[%d], perf_nthreads)' % i)
+                  for i in range(len(PERF_COUNTERS))]
+        processed = List(header=header, body=processed, footer=footer)
+
     return processed, profiler
 
 
+def create_trace(node, profiler):
+    """
+    Record, within each OpenMP parallel region of the sections traced by
+    ``profiler``, the time each thread spends computing its share of the
+    iteration space.
+
+    A thread's end time is taken before the implicit barrier of its last
+    parallel loop, which is therefore turned into a ``nowait`` loop; this is
+    legal since a barrier is anyway implied by the end of the parallel region.
+    """
+    if not profiler.trace:
+        return node
+
+    mapper = {}
+    for section in FindNodes(TimedList).visit(node):
+        n, timestep = profiler._traced[section.name]
+        regions = [i for i in FindNodes(Block).visit(section.body)
+                   if any(isinstance(j, Pragma) and j.value.startswith('omp parallel')
+                          for j in i.header)]
+        for region in regions:
+            body = list(region.body)
+            if isinstance(body[-1], Iteration):
+                pragmas = [Pragma('%s nowait' % i.value)
+                           if isinstance(i, Pragma) and i.value.startswith('omp for')
+                           else i for i in body[-1].pragmas]
+                body[-1] = body[-1]._rebuild(pragmas=pragmas)
+            tstart = 'tstart_%s_thread' % section.name
+            header = Element(Initializer(Value('double', tstart), 'devito_clock()'))
+            footer = Element(Statement('devito_trace(trace, %d, %s, devito_thread(), '
+                                       '%s, devito_clock())' % (n, timestep, tstart)))
+            mapper[region] = region._rebuild(body=[header] + body + [footer])
+
+    return Transformer(mapper).visit(node)
+
+
 class Profiler(object):
 
     """
@@ -102,9 +197,20 @@ class Profiler(object):
 
     structname = "profile"
 
-    def __init__(self, name):
+    def __init__(self, name, counters=False, trace=False):
         self.name = name
+        self.counters = tuple(PERF_COUNTERS) if counters else ()
+        self.trace = trace
         self._sections = OrderedDict()
+        self._traced = OrderedDict()
+
+    def __getstate__(self):
+        # Only the iteration spaces of the profiled sections are required to
+        # summarize a run, so their bodies are dropped
+        state = self.__dict__.copy()
+        state['_sections'] = OrderedDict([(tuple(i._rebuild([]) for i in k), v)
+                                          for k, v in self._sections.items()])
+        return state
 
     def add(self, name, section, ops, memory):
         """
@@ -161,14 +267,23 @@ class Profiler(object):
             gflopss = gflops/time
             gpointss = gpoints/time
 
+            # Hardware counters (a counter reading zero could not be accessed)
+            counters = OrderedDict()
+            for i in self.counters:
+                value = getattr(arguments[self.name]._obj, '%s_%s' % (profile.name, i))
+                counters[i] = value or None
+
             # Keep track of performance achieved
             summary.setsection(profile.name, time, gflopss, gpointss, oi, profile.ops,
-                               itershape, datashape)
+                               itershape, datashape, counters)
 
         # Rename the most time consuming section as 'main'
         if len(summary) > 0:
             summary['main'] = summary.pop(max(summary, key=summary.get))
 
+        if self.trace:
+            summary.trace = arguments[Trace.name]
+
         return summary
 
     @property
@@ -176,8 +291,11 @@ class Profiler(object):
         """
         Return the profiler C type in ctypes format.
         """
-        return type(Profiler.structname, (Structure,),
-                    {"_fields_": [(i.name, c_double) for i in self._sections.values()]})
+        fields = []
+        for i in self._sections.values():
+            fields.append((i.name, c_double))
+            fields.extend([('%s_%s' % (i.name, j), c_longlong) for j in self.counters])
+        return type(Profiler.structname, (Structure,), {"_fields_": fields})
 
     @property
     def cdef(self):
@@ -185,8 +303,114 @@ class Profiler(object):
         Returns a :class:`cgen.Struct` representing the profiler data structure in C
         (a ``struct``).
         """
-        return Struct(Profiler.structname,
-                      [Value('double', i.name) for i in self._sections.values()])
+        fields = []
+        for i in self._sections.values():
+            fields.append(Value('double', i.name))
+            fields.extend([Value('long long', '%s_%s' % (i.name, j))
+                           for j in self.counters])
+        return Struct(Profiler.structname, fields)
+
+    @property
+    def headers(self):
+        """Return the C preprocessor directives required by the profiler."""
+        return ['#define _GNU_SOURCE'] if self.counters else []
+
+    @property
+    def includes(self):
+        """Return the C header files required by the profiler."""
+        if not self.counters:
+            return []
+        return ['string.h', 'unistd.h', 'sys/syscall.h', 'linux/perf_event.h']
+
+    @property
+    def cglobals(self):
+        """
+        Return the C data structures and functions required by the profiler
+        to read the hardware counters and to record traces.
+        """
+        ret = []
+        if self.counters:
+            ret.append(Line(PERF_HELPERS))
+        if self.trace:
+            ret.extend([Trace.cdef, Line(TRACE_HELPERS)])
+        return ret
+
+
+class Trace(object):
+
+    """
+    A ring buffer of timing events, recorded by an :class:`Operator` profiled
+    in 'trace' mode. Each event is a row ``(section, timestep, thread, start,
+    end)``, where ``thread`` is -1 for the event recorded by the thread calling
+    the Operator, which spans the whole profiled section, and ``start`` and
+    ``end`` are in seconds. Once full, the oldest events are overwritten.
+
+    A Trace may be passed to an Operator as the ``trace`` argument, so that it
+    accumulates the events of several runs; otherwise, a new Trace is made
+    for each run and attached to the returned :class:`PerformanceSummary`.
+
+    :param capacity: (Optional) the maximum number of events in the Trace.
+    """
+
+    name = 'trace'
+
+    dtype = type(name, (Structure,), {"_fields_": [('events', POINTER(c_double)),
+                                                   ('capacity', c_long),
+                                                   ('size', c_long)]})
+    """The Trace C type in ctypes format."""
+
+    cdef = Struct(name, [Value('double', '*events'), Value('long', 'capacity'),
+                         Value('long', 'size')])
+    """The Trace C type, as a :class:`cgen.Struct`."""
+
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.data = np.zeros((capacity, 5))
+        self._obj = self.dtype(self.data.ctypes.data_as(POINTER(c_double)), capacity, 0)
+        # Allow a Trace to be passed straight to a ctypes function
+        self._as_parameter_ = byref(self._obj)
+
+    @property
+    def capacity(self):
+        return self.data.shape[0]
+
+    @property
+    def dropped(self):
+        """The number of events overwritten since the Trace was created."""
+        return max(self._obj.size - self.capacity, 0)
+
+    @property
+    def events(self):
+        """The events in the Trace, oldest first."""
+        size = self._obj.size
+        if size <= self.capacity:
+            return self.data[:size].copy()
+        position = size % self.capacity
+        return np.concatenate([self.data[position:], self.data[:position]])
+
+    def to_chrome(self, filename=None):
+        """
+        Return the events in the Chrome trace format, which can be loaded into
+        ``chrome://tracing`` or ``https://ui.perfetto.dev``. The events recorded
+        by the calling thread and by each OpenMP thread are shown on separate
+        tracks, and are annotated with the timestep.
+
+        :param filename: (Optional) a file to write the JSON trace to.
+        """
+        events = self.events
+        origin = events[:, 3].min() if len(events) > 0 else 0.
+        threads = sorted(set(events[:, 2].astype(int)))
+        ret = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': i + 1,
+                'args': {'name': 'kernel' if i < 0 else 'thread %d' % i}}
+               for i in threads]
+        for section, timestep, thread, start, end in events:
+            ret.append({'name': 'section_%d' % section, 'ph': 'X', 'pid': 0,
+                        'tid': int(thread) + 1, 'ts': (start - origin)*10**6,
+                        'dur': (end - start)*10**6, 'args': {'timestep': int(timestep)}})
+        ret = {'traceEvents': ret, 'displayTimeUnit': 'ms'}
+        if filename is not None:
+            with open(filename, 'w') as f:
+                json.dump(ret, f)
+        return ret
 
 
 class PerformanceSummary(OrderedDict):
@@ -195,8 +419,19 @@ class PerformanceSummary(OrderedDict):
     A special dictionary to track and quickly access performance data.
     """
 
-    def setsection(self, key, time, gflopss, gpointss, oi, ops, itershape, datashape):
-        self[key] = PerfEntry(time, gflopss, gpointss, oi, ops, itershape, datashape)
+    trace = None
+    """The :class:`Trace` of the run, if profiled in 'trace' mode."""
+
+    def __init__(self, *args, **kwargs):
+        super(PerformanceSummary, self).__init__(*args, **kwargs)
+        self.metadata = OrderedDict()
+        """The properties of the run (e.g., the DSE and DLE modes, the block
+        sizes), included in each record of the performance report."""
+
+    def setsection(self, key, time, gflopss, gpointss, oi, ops, itershape, datashape,
+                   counters=None):
+        self[key] = PerfEntry(time, gflopss, gpointss, oi, ops, itershape, datashape,
+                              counters or OrderedDict())
 
     @property
     def gflopss(self):
@@ -210,10 +445,196 @@ class PerformanceSummary(OrderedDict):
     def timings(self):
         return OrderedDict([(k, v.time) for k, v in self.items()])
 
+    @property
+    def counters(self):
+        return OrderedDict([(k, v.counters) for k, v in self.items()])
+
+    @property
+    def ipc(self):
+        """The measured instructions per cycle, or None if unavailable."""
+        ret = OrderedDict()
+        for k, v in self.items():
+            cycles = v.counters.get('cycles')
+            instructions = v.counters.get('instructions')
+            ret[k] = instructions/cycles if cycles and instructions else None
+        return ret
+
+    @property
+    def traffic(self):
+        """The measured memory traffic, in bytes, or None if unavailable. Each
+        last-level cache miss is assumed to move a cache line from/to memory."""
+        ret = OrderedDict()
+        for k, v in self.items():
+            misses = v.counters.get('llcmisses')
+            ret[k] = float(misses*CACHELINE) if misses else None
+        return ret
+
+    @property
+    def measured_oi(self):
+        """The operational intensity based on the measured memory traffic,
+        rather than on the compulsory traffic, or None if unavailable."""
+        return OrderedDict([(k, v.gflopss*v.time*10**9/traffic if traffic else None)
+                            for (k, v), traffic in zip(self.items(),
+                                                       self.traffic.values())])
+
+    @property
+    def bandwidth(self):
+        """The measured memory bandwidth, in GB/s, or None if unavailable."""
+        return OrderedDict([(k, traffic/v.time/10**9 if traffic else None)
+                            for (k, v), traffic in zip(self.items(),
+                                                       self.traffic.values())])
+
+    def records(self):
+        """
+        Return the performance report of the run, as a list of flat records,
+        one for each section, each record also including ``self.metadata``.
+        """
+        ret = []
+        for k, v in self.items():
+            record = OrderedDict(self.metadata)
+            record.update([('section', k), ('itershape', [int(i) for i in v.itershape]),
+                           ('time', v.time), ('gflopss', v.gflopss),
+                           ('gpointss', v.gpointss), ('oi', v.oi), ('ops', int(v.ops))])
+            record.update(v.counters)
+            ret.append(record)
+        return ret
+
+    def save(self, filename):
+        """
+        Write the performance report of the run to ``filename``, as CSV if its
+        extension is ".csv", as JSON otherwise. In a CSV file, the non-scalar
+        fields (e.g., the ``itershape``) are JSON-encoded.
+        """
+        records = self.records()
+        with open(filename, 'w') as f:
+            if filename.endswith('.csv'):
+                fields = list(OrderedDict.fromkeys(k for i in records for k in i))
+                writer = csv.DictWriter(f, fields)
+                writer.writeheader()
+                for i in records:
+                    writer.writerow({k: json.dumps(v) if isinstance(v, (list, dict))
+                                     else v for k, v in i.items()})
+            else:
+                json.dump(records, f, indent=1)
+
+    def append(self, filename):
+        """
+        Append the performance report of the run to the JSON Lines file
+        ``filename``, one record per line. The file is never rewritten, so
+        it may be used to track the performance of an Operator over time.
+        """
+        lines = ''.join('%s\n' % json.dumps(i) for i in self.records())
+        # A single write, so that concurrent runs do not interleave their records
+        with open(filename, 'a') as f:
+            f.write(lines)
+
 
 Profile = namedtuple('Profile', 'name ops memory')
 """Metadata for a profiled code section."""
 
 
-PerfEntry = namedtuple('PerfEntry', 'time gflopss gpointss oi ops itershape datashape')
+PerfEntry = namedtuple('PerfEntry',
+                       'time gflopss gpointss oi ops itershape datashape counters')
 """Structured performance data."""
+
+
+PERF_HELPERS = """\
+#ifdef _OPENMP
+#include "omp.h"
+#endif
+
+static int devito_perf_nthreads(void)
+{
+#ifdef _OPENMP
+  return omp_get_max_threads();
+#else
+  return 1;
+#endif
+}
+
+static int devito_perf_open_thread(unsigned long long config)
+{
+  struct perf_event_attr attr;
+  memset(&attr, 0, sizeof(attr));
+  attr.type = PERF_TYPE_HARDWARE;
+  attr.size = sizeof(attr);
+  attr.config = config;
+  attr.exclude_kernel = 1;
+  attr.exclude_hv = 1;
+  return syscall(__NR_perf_event_open, &attr, 0, -1, -1, 0);
+}
+
+static void devito_perf_open(int *fds, unsigned long long config, int nthreads)
+{
+  for (int i = 0; i < nthreads; i++)
+    fds[i] = -1;
+#ifdef _OPENMP
+  #pragma omp parallel num_threads(nthreads)
+  fds[omp_get_thread_num()] = devito_perf_open_thread(config);
+#else
+  fds[0] = devito_perf_open_thread(config);
+#endif
+}
+
+static long long devito_perf_read(int *fds, int nthreads)
+{
+  long long total = 0;
+  for (int i = 0; i < nthreads; i++)
+  {
+    long long value;
+    if (fds[i] >= 0 && read(fds[i], &value, sizeof(value)) == sizeof(value))
+      total += value;
+  }
+  return total;
+}
+
+static void devito_perf_close(int *fds, int nthreads)
+{
+  for (int i = 0; i < nthreads; i++)
+    if (fds[i] >= 0)
+      close(fds[i]);
+}"""
+"""C functions to open, read and close hardware counters. A counter only counts
+the events of the thread that opened it, so each OpenMP thread opens its own
+counters, and the counters of all threads are summed upon reading. A counter
+that cannot be opened (e.g., unsupported hardware, insufficient permissions)
+always reads 0."""
+
+
+TRACE_HELPERS = """\
+#ifdef _OPENMP
+#include "omp.h"
+#endif
+
+static double devito_clock(void)
+{
+  struct timeval now;
+  gettimeofday(&now, NULL);
+  return (double)now.tv_sec + (double)now.tv_usec/1000000;
+}
+
+static int devito_thread(void)
+{
+#ifdef _OPENMP
+  return omp_get_thread_num();
+#else
+  return 0;
+#endif
+}
+
+static void devito_trace(struct trace *trace, int section, int timestep,
+                         int thread, double start, double end)
+{
+  long n;
+#ifdef _OPENMP
+  #pragma omp atomic capture
+#endif
+  n = trace->size++;
+  double *event = trace->events + (n % trace->capacity)*5;
+  event[0] = section;
+  event[1] = timestep;
+  event[2] = thread;
+  event[3] = start;
+  event[4] = end;
+}"""
+"""C functions to record events into a :class:`Trace`."""
@@ -0,0 +1,108 @@
+from __future__ import absolute_import
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+from devito.logger import debug
+
+__all__ = ['ShotScheduler']
+
+
+class ShotScheduler(object):
+
+    """
+    Run several shots of an :class:`OperatorRunnable` concurrently, each worker
+    thread operating on its own, private data objects (e.g., wavefields,
+    source and receiver :class:`SparseFunction`s).
+
+    As the compiled kernel runs without holding the GIL, one node may thus run
+    many small shots at once, rather than one shot at a time using all cores.
+
+    :param operator: The :class:`OperatorRunnable` to be run.
+    :param workspace: A callable returning a mapper from argument names to
+                      newly created data objects, as in ``operator.apply(**kwargs)``.
+                      It is called once per worker, so as to provide each worker
+                      with a private copy of the data written by ``operator``.
+    :param nworkers: (Optional) The number of shots run concurrently. Defaults
+                     to the number of cores divided by ``nthreads``.
+    :param nthreads: (Optional) The number of OpenMP threads used by each
+                     shot. Only relevant if ``operator`` was compiled with
+                     OpenMP. Defaults to the OpenMP runtime setting.
+
+    Examples
+    --------
+    >>> from devito import Eq, Grid, TimeFunction, Operator
+    >>> grid = Grid(shape=(4, 4))
+    >>> u = TimeFunction(name='u', grid=grid)
+    >>> op = Operator(Eq(u.forward, u + 1))
+    >>> scheduler = ShotScheduler(op, lambda: {'u': TimeFunction(name='u', grid=grid)},
+    ...                           nworkers=2)
+    >>> def setup(shot, workspace):
+    ...     workspace['u'].data[:] = shot
+    ...     return {'time_M': 2}
+    >>> def collect(shot, workspace, summary):
+    ...     return workspace['u'].data[0].sum()
+    >>> results = scheduler.run([0., 1., 2.], setup, collect)
+    """
+
+    def __init__(self, operator, workspace, nworkers=None, nthreads=None):
+        self.operator = operator
+        self.nthreads = nthreads
+        if nworkers is None:
+            nworkers = max((os.cpu_count() or 1) // (nthreads or 1), 1)
+        self.nworkers = nworkers
+
+        self._workspaces = Queue()
+        for i in range(nworkers):
+            self._workspaces.put(workspace())
+
+        # Compile, and allocate the shared data objects, upfront, so that
+        # nothing of this sort happens concurrently within the workers
+        operator.cfunction
+        private = set(self._workspaces.queue[0])
+        for i in operator.input:
+            if i.is_TensorFunction and i.name not in private:
+                i.data_allocated
+
+        if nthreads is not None and 'nthreads' not in operator.known_arguments:
+            debug("Operator `%s` not compiled with OpenMP, ignoring `nthreads`"
+                  % operator.name)
+            self.nthreads = None
+
+    def _run(self, shot, setup, collect):
+        workspace = self._workspaces.get()
+        try:
+            kwargs = dict(workspace)
+            if self.nthreads is not None:
+                # The number of OpenMP threads is a runtime argument
+                kwargs['nthreads'] = self.nthreads
+            kwargs.update((shot if setup is None else setup(shot, workspace)) or {})
+            summary = self.operator.apply(**kwargs)
+            if collect is None:
+                return summary
+            return collect(shot, workspace, summary)
+        finally:
+            self._workspaces.put(workspace)
+
+    def run(self, shots, setup=None, collect=None):
+        """
+        Run a shot for each of the items in ``shots``, blocking until all of
+        them have been run.
+
+        :param shots: An iterable of shots, for example source positions.
+        :param setup: (Optional) A callable ``setup(shot, workspace)``, invoked
+                      before running a shot. It may initialize the data in the
+                      worker ``workspace`` (e.g., zero the wavefields, set the
+                      source coordinates) and return additional arguments for
+                      ``operator.apply``. If not provided, each shot must be a
+                      mapper of arguments for ``operator.apply``.
+        :param collect: (Optional) A callable ``collect(shot, workspace, summary)``,
+                        invoked after running a shot, to extract its results
+                        from the worker ``workspace`` before it is reused.
+        :returns: The results of ``collect`` (or, if not provided, the
+                  performance summaries), in the same order as ``shots``.
+        """
+        with ThreadPoolExecutor(max_workers=self.nworkers) as executor:
+            futures = [executor.submit(self._run, i, setup, collect) for i in shots]
+            return [i.result() for i in futures]
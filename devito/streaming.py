@@ -0,0 +1,166 @@
+from __future__ import absolute_import
+
+from queue import Queue
+import threading
+
+import numpy as np
+
+__all__ = ['SnapshotStream']
+
+
+class SnapshotStream(object):
+
+    """
+    Stream the snapshots of a :class:`TimeFunction`, taken every ``factor``
+    timesteps, to a file, without ever keeping more than ``nbuffers`` of them
+    in memory.
+
+    :meth:`run` executes an :class:`Operator` updating ``function`` in chunks
+    of ``factor`` timesteps. At the end of each chunk, the snapshot is copied
+    into one of ``nbuffers`` slots, which a background thread then writes to
+    ``filename`` while the :class:`Operator` computes the next chunk (the
+    generated code runs without holding the GIL). A slot is reused only once
+    written, so with the default double buffering the computation stalls
+    only if writing a snapshot takes longer than computing ``factor``
+    timesteps.
+
+    This replaces, e.g. for RTM, the :class:`TimeFunction` with ``save=nsnaps``
+    along a :class:`ConditionalDimension` of factor ``factor``: the snapshot
+    ``i`` is ``function`` at timestep ``i*factor``. The memory footprint drops
+    from ``nsnaps`` to ``nbuffers`` snapshots. The snapshots are read back,
+    e.g. by the adjoint pass, through :attr:`snapshots`.
+
+    :param function: The :class:`TimeFunction` to take snapshots of, over its
+                     domain region.
+    :param factor: The number of timesteps between two snapshots; also a
+                   :class:`ConditionalDimension` may be passed, in which case
+                   its factor is used.
+    :param filename: The file the snapshots are written to, one after the
+                     other, in C order. Any existing content is overwritten.
+    :param nbuffers: (Optional) The number of snapshots kept in memory.
+                     Defaults to 2.
+
+    The stream may be used as a context manager, which closes it upon exit.
+    """
+
+    def __init__(self, function, factor, filename, nbuffers=2):
+        self.function = function
+        self.factor = int(getattr(factor, 'factor', factor))
+        self.filename = filename
+        if self.factor < 1 or nbuffers < 1:
+            raise ValueError("`factor` and `nbuffers` must be positive")
+
+        self.nsnaps = 0
+        self._buffers = [np.empty(function.shape[1:], dtype=function.dtype)
+                         for _ in range(nbuffers)]
+        self._free = Queue()
+        for i in range(nbuffers):
+            self._free.put(i)
+        self._ready = Queue()
+        self._error = None
+
+        self._file = open(filename, 'wb')
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def shape(self):
+        """The shape of the array of the snapshots streamed so far."""
+        return (self.nsnaps,) + self._buffers[0].shape
+
+    @property
+    def snapshots(self):
+        """
+        The snapshots streamed so far, as a read-only :class:`numpy.memmap`;
+        the snapshots are read from disk on demand.
+        """
+        self.flush()
+        if self.nsnaps == 0:
+            return np.empty(self.shape, dtype=self.function.dtype)
+        return np.memmap(self.filename, dtype=self.function.dtype, mode='r',
+                         shape=self.shape)
+
+    def _drain(self):
+        """Write the slots made ready by :meth:`push` to file, in order."""
+        while True:
+            i = self._ready.get()
+            if i is None:
+                self._ready.task_done()
+                return
+            try:
+                if self._error is None:
+                    self._file.write(self._buffers[i].data)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._free.put(i)
+                self._ready.task_done()
+
+    def _check(self):
+        if self._error is not None:
+            raise IOError("Couldn't write to `%s`" % self.filename) from self._error
+
+    def push(self, time):
+        """
+        Append the snapshot of ``function`` at timestep ``time`` to the stream,
+        waiting for a slot to be free if needed.
+        """
+        if self._file.closed:
+            raise ValueError("Cannot push snapshots to a closed stream")
+        self._check()
+        i = self._free.get()
+        np.copyto(self._buffers[i], self.function.data[time])
+        self.nsnaps += 1
+        self._ready.put(i)
+
+    def run(self, operator, time_M, time_m=0, **kwargs):
+        """
+        Run ``operator`` over the timesteps ``[time_m, time_M]``, pushing the
+        snapshot of ``function`` at each timestep multiple of ``factor``.
+
+        :param operator: The :class:`Operator` updating ``function``.
+        :param time_M: The last timestep the :class:`Operator` runs.
+        :param time_m: (Optional) The first timestep the :class:`Operator`
+                       runs. Defaults to 0.
+        :param kwargs: The arguments passed to :meth:`Operator.apply` on each
+                       chunk of timesteps.
+
+        :returns: The :class:`PerformanceSummary` of each chunk of timesteps.
+        """
+        dim = self.function.time_dim
+        dim = dim.parent if dim.is_Derived else dim
+
+        summaries = []
+        start = time_m
+        while start <= time_M:
+            if start % self.factor == 0:
+                self.push(start)
+            stop = min(start - start % self.factor + self.factor - 1, time_M)
+            kwargs.update({dim.min_name: start, dim.max_name: stop})
+            summaries.append(operator.apply(**kwargs))
+            start = stop + 1
+        return summaries
+
+    def flush(self):
+        """Wait until all snapshots pushed so far are written to file."""
+        self._ready.join()
+        self._check()
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self):
+        """Write the pending snapshots to file and close it."""
+        if self._file.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._ready.put(None)
+            self._thread.join()
+            self._file.close()
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 import weakref
 import abc
+import ctypes
 import gc
 
 from collections import namedtuple
@@ -192,6 +193,21 @@ class AbstractSymbol(sympy.Symbol, Basic):
     def indexify(self):
         return self
 
+    def __reduce_ex__(self, proto):
+        # SymPy would only pickle the name of the symbol, thus losing all of
+        # the Devito-specific attributes
+        return (type(self)._unpickle, (self.name,), self.__getstate__())
+
+    def __getstate__(self):
+        return self.__dict__.copy()
+
+    @classmethod
+    def _unpickle(cls, name):
+        """Create an empty object, whose state is then restored by pickle."""
+        # Bypass the SymPy cache, which may return (and thus let pickle
+        # override the state of) an existing symbol
+        return sympy.Symbol.__xnew__(cls, name)
+
 
 class AbstractCachedSymbol(AbstractSymbol, Cached):
     """
@@ -219,6 +235,18 @@ class AbstractCachedSymbol(AbstractSymbol, Cached):
             newcls._cache_put(newobj)
         return newobj
 
+    def __reduce_ex__(self, proto):
+        # The symbol type is created on the fly, so it cannot be looked up by
+        # pickle; the object is rather rebuilt through the parent type
+        return (type(self).__base__._unpickle, (self.name,), self.__getstate__())
+
+    @classmethod
+    def _unpickle(cls, name):
+        newcls = cls._symbol_type(name)
+        newobj = sympy.Symbol.__new__(newcls, name)
+        newcls._cache_put(newobj)
+        return newobj
+
 
 class Symbol(AbstractCachedSymbol):
 
@@ -295,6 +323,9 @@ class AbstractFunction(sympy.Function, Basic):
 
     is_AbstractFunction = True
 
+    def __getstate__(self):
+        return self.__dict__.copy()
+
 
 class AbstractCachedFunction(AbstractFunction, Cached):
     """
@@ -331,6 +362,19 @@ class AbstractCachedFunction(AbstractFunction, Cached):
             newcls._cache_put(newobj)
         return newobj
 
+    def __reduce_ex__(self, proto):
+        # The symbol type is created on the fly, so it cannot be looked up by
+        # pickle; the object is rather rebuilt through the parent type
+        return (type(self).__base__._unpickle, (self.name, self.args),
+                self.__getstate__())
+
+    @classmethod
+    def _unpickle(cls, name, args):
+        newcls = cls._symbol_type(name)
+        newobj = sympy.Function.__new__(newcls, *args, evaluate=False)
+        newcls._cache_put(newobj)
+        return newobj
+
     @classmethod
     def __indices_setup__(cls, **kwargs):
         """Extract the function indices from ``kwargs``."""
@@ -580,6 +624,14 @@ class Object(Basic):
     def __repr__(self):
         return self.name
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if isinstance(self.dtype, type) and issubclass(self.dtype, ctypes.Structure):
+            # Structs are usually generated on the fly, so they cannot be pickled.
+            # Anyway, from the C standpoint, the Object is just an opaque pointer
+            state['dtype'] = ctypes.c_void_p
+        return state
+
     def _arg_defaults(self):
         if callable(self.value):
             return {self.name: self.value()}
@@ -653,6 +705,9 @@ class CacheManager(object):
 
     @classmethod
     def clear(cls):
+        # Cached Operators hold references to the symbolic objects
+        from devito.operator import operator_cache
+        operator_cache.invalidate()
         sympy.cache.clear_cache()
         gc.collect()
         for key, val in list(_SymbolCache.items()):
@@ -80,6 +80,7 @@ add_sub_configuration(yask_configuration, env_vars_mapper)
 modes = {'basic': BasicRewriter,
          'advanced': YaskRewriter,
          'advanced-safemath': YaskRewriter,
+         'advanced-timetiling': YaskRewriter,
          'speculative': YaskRewriter}
 init_dle(modes)
 
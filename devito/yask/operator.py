@@ -160,23 +160,10 @@ class Operator(OperatorRunnable):
         # Output summary of performance achieved
         return self._profile_output(args)
 
-    @property
-    def compile(self):
-        """
-        JIT-compile the C code generated by the Operator.
-
-        It is ensured that JIT compilation will only be performed once per
-        :class:`Operator`, reagardless of how many times this method is invoked.
-
-        :returns: The file name of the JIT-compiled function.
-        """
-        if self._lib is None:
-            # No need to recompile if a shared object has already been loaded.
-            if not isinstance(self.yk_soln, YaskNullKernel):
-                self._compiler.libraries.append(self.yk_soln.soname)
-            return jit_compile(self.ccode, self._compiler)
-        else:
-            return self._lib.name
+    def _jit_compile(self, ccode):
+        if not isinstance(self.yk_soln, YaskNullKernel):
+            self._compiler.libraries.append(self.yk_soln.soname)
+        return jit_compile(ccode, self._compiler)
 
 
 class sympy2yask(object):
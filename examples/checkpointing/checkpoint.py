@@ -18,8 +18,10 @@ class CheckpointOperator(Operator):
     def __init__(self, op, **kwargs):
         self.op = op
         self.args = kwargs
-        op_default_args = self.op.prepare_arguments(**kwargs)
-        self.start_offset = op_default_args[self.t_arg_names['t_start']]
+        # Arguments are derived and checked only once, as pyRevolve will
+        # typically call apply() many times over short time windows
+        self.bound_op = self.op.bind(**kwargs)
+        self.start_offset = self.bound_op.arguments[self.t_arg_names['t_start']]
 
     def _prepare_args(self, t_start, t_end):
         args = self.args.copy()
@@ -34,7 +36,7 @@ class CheckpointOperator(Operator):
             this method passes them on correctly to devito.Operator
         """
         args = self._prepare_args(t_start, t_end)
-        self.op.apply(**args)
+        self.bound_op(**{k: args[k] for k in self.t_arg_names.values()})
 
 
 class DevitoCheckpoint(Checkpoint):
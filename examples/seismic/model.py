@@ -292,7 +292,7 @@ def initialize_function(function, data, nbpml):
     :param data: The data array used for initialisation.
     :param nbpml: Number of PML layers for boundary damping.
     """
-    pad_list = [(nbpml + i.left, nbpml + i.right) for i in function._offset_domain]
+    pad_list = [(nbpml + i.left, nbpml + i.right) for i in function._extent_halo]
     function.data_with_halo[:] = np.pad(data, pad_list, 'edge')
 
 
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 from functools import reduce
 from operator import mul
+import json
 try:
     from StringIO import StringIO
 except ImportError:
@@ -14,9 +15,19 @@ from conftest import skipif_yask
 import numpy as np
 
 from devito import Grid, Function, TimeFunction, Eq, Operator, configuration, silencio
+from devito.core.autotuning import autotuning_db_key
 from devito.logger import logger, logging
 
 
+@pytest.fixture(autouse=True)
+def autotuning_db(tmpdir):
+    """Use a fresh auto-tuning database in each test."""
+    previous = configuration.core['autotuning_db']
+    configuration.core['autotuning_db'] = str(tmpdir.join('autotuning.json'))
+    yield configuration.core['autotuning_db']
+    configuration.core['autotuning_db'] = previous
+
+
 @silencio(log_level='DEBUG')
 @skipif_yask
 @pytest.mark.parametrize("shape,expected", [
@@ -113,3 +124,289 @@ def test_timesteps_per_at_run():
     temporary_handler.close()
     buffer.flush()
     buffer.close()
+
+
+@silencio(log_level='DEBUG')
+@skipif_yask
+def test_at_database(autotuning_db):
+    """
+    Check that the outcome of auto-tuning is stored on disk, and reused
+    by later runs, unless the problem shape changes.
+    """
+    buffer = StringIO()
+    temporary_handler = logging.StreamHandler(buffer)
+    logger.addHandler(temporary_handler)
+
+    def run(shape):
+        grid = Grid(shape=shape)
+        infield = Function(name='infield', grid=grid)
+        outfield = Function(name='outfield', grid=grid)
+        stencil = Eq(outfield.indexify(), outfield.indexify() + infield.indexify()*3.0)
+        op = Operator(stencil, dle=('blocking', {'blockalways': True}))
+        op(infield=infield, outfield=outfield, autotune=True)
+        out = buffer.getvalue().split('\n')
+        buffer.truncate(0)
+        buffer.seek(0)
+        return ([i for i in out if 'AutoTuner:' in i],
+                [i for i in out if 'from database' in i])
+
+    out, cached = run((30, 30, 30))
+    assert len(out) == 4
+    assert len(cached) == 0
+    with open(autotuning_db) as f:
+        db = json.load(f)
+    assert len(db) == 1
+    best = list(db.values())[0]
+
+    # Same kernel, same shape: no need to auto-tune again
+    out, cached = run((30, 30, 30))
+    assert len(out) == 0
+    assert len(cached) == 1
+    assert str(best) in cached[0] or all(str(v) in cached[0] for v in best.values())
+
+    # Different shape: auto-tune from scratch
+    out, cached = run((40, 30, 30))
+    assert len(out) == 4
+    with open(autotuning_db) as f:
+        assert len(json.load(f)) == 2
+
+    # Disabled database
+    configuration.core['autotuning_db'] = 0
+    out, cached = run((30, 30, 30))
+    assert len(out) == 4
+
+    logger.removeHandler(temporary_handler)
+
+    temporary_handler.flush()
+    temporary_handler.close()
+    buffer.flush()
+    buffer.close()
+
+
+@skipif_yask
+def test_at_database_key_nthreads():
+    """
+    Check that the auto-tuning database key depends on the number of threads
+    the Operator is run with, rather than on the default number of threads.
+    """
+    grid = Grid(shape=(30, 30, 30))
+    f = Function(name='f', grid=grid)
+    op = Operator(Eq(f, f + 1))
+
+    arguments = op.arguments()
+    keys = []
+    for nthreads in [2, 4]:
+        arguments['nthreads'] = nthreads
+        keys.append(autotuning_db_key(op, arguments))
+    assert keys[0] != keys[1]
+
+
+@silencio(log_level='DEBUG')
+@skipif_yask
+def test_at_model():
+    """
+    Check that the model-based auto-tuner stays within its evaluation budget,
+    and that it also attempts non-square block shapes.
+    """
+    from devito.core.autotuning import options
+
+    buffer = StringIO()
+    temporary_handler = logging.StreamHandler(buffer)
+    logger.addHandler(temporary_handler)
+
+    shape = (30, 30, 30)
+    grid = Grid(shape=shape)
+    infield = Function(name='infield', grid=grid)
+    infield.data[:] = np.arange(reduce(mul, shape), dtype=np.int32).reshape(shape)
+    outfield = Function(name='outfield', grid=grid)
+    stencil = Eq(outfield.indexify(), outfield.indexify() + infield.indexify()*3.0)
+    op = Operator(stencil, dle=('blocking', {'blockalways': True}))
+
+    configuration.core['autotuning'] = 'model'
+    op(infield=infield, outfield=outfield, autotune=True)
+    configuration.core['autotuning'] = configuration.core._defaults['autotuning']
+
+    out = [i for i in buffer.getvalue().split('\n') if 'AutoTuner:' in i]
+    assert 1 <= len(out) <= options['at_max_evaluations']
+    shapes = [i.split('<')[1].split('>')[0].split(',') for i in out]
+    if len(out) > 1:
+        assert any(len(set(i)) > 1 for i in shapes)
+    assert np.all(outfield.data == infield.data*3.0)
+
+    logger.removeHandler(temporary_handler)
+
+    temporary_handler.flush()
+    temporary_handler.close()
+    buffer.flush()
+    buffer.close()
+
+
+@silencio(log_level='DEBUG')
+@skipif_yask
+def test_at_openmp_runtime():
+    """
+    Check that the number of threads and the loop schedule are auto-tuned
+    along with the block shape, without recompiling.
+    """
+    from devito.core.autotuning import options
+
+    buffer = StringIO()
+    temporary_handler = logging.StreamHandler(buffer)
+    logger.addHandler(temporary_handler)
+
+    shape = (30, 30, 30)
+    grid = Grid(shape=shape)
+    infield = Function(name='infield', grid=grid)
+    infield.data[:] = np.arange(reduce(mul, shape), dtype=np.int32).reshape(shape)
+    outfield = Function(name='outfield', grid=grid)
+    stencil = Eq(outfield.indexify(), outfield.indexify() + infield.indexify()*3.0)
+    op = Operator(stencil, dle=('blocking,openmp', {'blockalways': True}))
+    op(infield=infield, outfield=outfield, autotune=True)
+
+    out = [i for i in buffer.getvalue().split('\n') if 'AutoTuner:' in i]
+    attempts = [i for i in out if 'sched_kind' in i]
+    assert len(attempts) >= len(options['at_schedules'])
+    assert len(out) == 4 + len(attempts)
+    assert np.all(outfield.data == infield.data*3.0)
+
+    logger.removeHandler(temporary_handler)
+
+    temporary_handler.flush()
+    temporary_handler.close()
+    buffer.flush()
+    buffer.close()
+
+
+@silencio(log_level='DEBUG')
+@skipif_yask
+def test_at_two_levels():
+    """
+    Check that the sub-block sizes of a two-level blocking are auto-tuned
+    once the best block shape is known.
+    """
+    buffer = StringIO()
+    temporary_handler = logging.StreamHandler(buffer)
+    logger.addHandler(temporary_handler)
+
+    shape = (30, 30, 30)
+    grid = Grid(shape=shape)
+    infield = Function(name='infield', grid=grid)
+    infield.data[:] = np.arange(reduce(mul, shape), dtype=np.int32).reshape(shape)
+    outfield = Function(name='outfield', grid=grid)
+    stencil = Eq(outfield.indexify(), outfield.indexify() + infield.indexify()*3.0)
+    op = Operator(stencil, dle=('blocking', {'blockalways': True, 'blocklevels': 2}))
+    op(infield=infield, outfield=outfield, autotune=True)
+
+    out = [i for i in buffer.getvalue().split('\n') if 'AutoTuner:' in i]
+    attempts = [i for i in out if 'x0_subblock_size' in i]
+    # First the block shapes (with sub-blocks as large as the blocks) ...
+    assert len(out) == 4 + len(attempts)
+    assert all('subblock' not in i for i in out[:4])
+    # ... then the sub-block shapes, all within the best block shape
+    assert len(attempts) > 0
+    for i in attempts:
+        blockshape = [int(j) for j in i.split('<')[1].split('>')[0].split(',')]
+        assert int(i.split('x0_subblock_size=')[1].split(',')[0]) <= blockshape[0]
+    assert np.all(outfield.data == infield.data*3.0)
+
+    logger.removeHandler(temporary_handler)
+
+    temporary_handler.flush()
+    temporary_handler.close()
+    buffer.flush()
+    buffer.close()
+
+
+@silencio(log_level='DEBUG')
+@skipif_yask
+def test_at_time_tiling():
+    """
+    Check that the time tile size is auto-tuned along with the block shape.
+    """
+    from devito.core.autotuning import options
+
+    buffer = StringIO()
+    temporary_handler = logging.StreamHandler(buffer)
+    logger.addHandler(temporary_handler)
+
+    grid = Grid(shape=(30, 30, 30))
+    u = TimeFunction(name='u', grid=grid, space_order=2)
+    op = Operator(Eq(u.forward, u + 0.001*u.laplace), dle='advanced-timetiling')
+    op.apply(time_M=20, autotune=True)
+
+    out = [i for i in buffer.getvalue().split('\n') if 'AutoTuner:' in i]
+    attempts = [i for i in out if 'time0_tile_size' in i]
+    tiles = set(i.split('time0_tile_size=')[1].split()[0] for i in attempts)
+    assert tiles == set(str(i) for i in options['at_time_tiles'])
+    squeezer = max([options['at_squeezer']] + options['at_time_tiles'])
+    assert all('in %d time steps' % squeezer in i for i in out)
+
+    logger.removeHandler(temporary_handler)
+
+    temporary_handler.flush()
+    temporary_handler.close()
+    buffer.flush()
+    buffer.close()
+
+
+@silencio(log_level='DEBUG')
+@skipif_yask
+@pytest.mark.parametrize('budget,expected', [(1e-12, 1), (100., 4)])
+def test_at_online(budget, expected):
+    """
+    Check that online auto-tuning runs over the actual timesteps, thus
+    computing the same result as a run without auto-tuning, and that it
+    respects the time budget.
+    """
+    buffer = StringIO()
+    temporary_handler = logging.StreamHandler(buffer)
+    logger.addHandler(temporary_handler)
+
+    grid = Grid(shape=(30, 30, 30))
+    u = TimeFunction(name='u', grid=grid, space_order=2, save=40)
+    op = Operator(Eq(u.forward, u + 0.001*u.laplace + 1.),
+                  dle=('blocking', {'blockalways': True}))
+    op.apply(time_M=38)
+    expected_data = u.data.copy()
+    u.data[:] = 0.
+
+    configuration.core['autotuning'] = 'online'
+    configuration.core['autotuning_budget'] = budget
+    summary = op.apply(time_M=38, autotune=True)
+    configuration.core['autotuning'] = configuration.core._defaults['autotuning']
+    configuration.core['autotuning_budget'] = \
+        configuration.core._defaults['autotuning_budget']
+
+    out = [i for i in buffer.getvalue().split('\n') if 'AutoTuner:' in i]
+    assert len(out) == expected
+    assert all('(online)' in i for i in out)
+    assert summary['main'].itershape[0] == 39
+    assert np.all(u.data == expected_data)
+
+    logger.removeHandler(temporary_handler)
+
+    temporary_handler.flush()
+    temporary_handler.close()
+    buffer.flush()
+    buffer.close()
+
+
+@skipif_yask
+def test_at_model_blockshape():
+    from devito.core.autotuning import descent, model_blockshape, options
+    from collections import OrderedDict
+
+    # 8 bytes accessed per point, 64 points along the unblocked dimension
+    extents = OrderedDict([('x0_block_size', 512), ('y0_block_size', 512)])
+    blockshape = model_blockshape(extents, 8*64)
+    footprint = 8*64*blockshape['x0_block_size']*blockshape['y0_block_size']
+    assert footprint <= options['at_cache_size']*options['at_cache_fraction']
+    # The outer dimension is shrunk first
+    assert blockshape['x0_block_size'] <= blockshape['y0_block_size']
+
+    # A synthetic cost, minimized by a non-square block shape
+    def run(bs):
+        return abs(bs['x0_block_size'] - 16) + abs(bs['y0_block_size'] - 64)
+    best = descent(run, OrderedDict([('x0_block_size', 64), ('y0_block_size', 64)]),
+                   extents)
+    assert dict(best) == {'x0_block_size': 16, 'y0_block_size': 64}
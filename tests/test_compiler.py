@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+
+import os
+
+from conftest import skipif_yask
+
+import numpy as np
+
+from devito import Grid, Function, Eq, Operator, compile_operators, configuration
+from devito.compiler import (GNUCompiler, clear_jit_cache, cache_options,
+                             jit_cache_entries, jit_compile, jit_hash, jit_lock)
+
+
+def test_jit_hash():
+    """
+    Test that the JIT cache key accounts for both source code and compiler flags.
+    """
+    compiler = GNUCompiler()
+    key = jit_hash('int main() {return 0;}', compiler)
+    assert key == jit_hash('int main() {return 0;}', compiler)
+    assert key != jit_hash('int main() {return 1;}', compiler)
+
+    compiler.cflags.append('-DFOO')
+    assert key != jit_hash('int main() {return 0;}', compiler)
+
+
+@skipif_yask
+def test_jit_cache_hit(tmpdir):
+    """
+    Test that an identical kernel is compiled only once, even by two different
+    Operators, since the persistent JIT cache is shared.
+    """
+    previous = configuration['jit_cache']
+    configuration['jit_cache'] = str(tmpdir)
+
+    grid = Grid(shape=(4, 4))
+    f = Function(name='f', grid=grid)
+
+    op0 = Operator(Eq(f, f + 1))
+    op0.apply()
+    assert len(jit_cache_entries(str(tmpdir))) == 1
+
+    op1 = Operator(Eq(f, f + 1))
+    assert op1.compile == op0._lib.name
+    op1.apply()
+    assert len(jit_cache_entries(str(tmpdir))) == 1
+    assert np.all(f.data == 2.)
+
+    clear_jit_cache()
+    assert len(jit_cache_entries(str(tmpdir))) == 0
+
+    configuration['jit_cache'] = previous
+
+
+def test_jit_cache_eviction(tmpdir):
+    """
+    Test that the least recently used shared objects are dropped from the
+    JIT cache once its size exceeds ``cache_options['maxsize']``.
+    """
+    previous = configuration['jit_cache'], cache_options['maxsize']
+    configuration['jit_cache'] = str(tmpdir)
+
+    compiler = GNUCompiler()
+    ccode = 'int foo%d() {return %d;}'
+
+    jit_compile(ccode % (0, 0), compiler)
+    cache_options['maxsize'] = sum(i[3] for i in jit_cache_entries(str(tmpdir)))
+
+    jit_compile(ccode % (1, 1), compiler)
+    entries = jit_cache_entries(str(tmpdir))
+    assert len(entries) == 1
+    assert entries[0][0] == jit_hash(ccode % (1, 1), compiler)
+    # The lock file of the evicted entry is dropped too
+    assert not os.path.exists(os.path.join(str(tmpdir), '%s.lock' %
+                                           jit_hash(ccode % (0, 0), compiler)))
+
+    clear_jit_cache()
+    assert not [i for i in os.listdir(str(tmpdir)) if i.endswith('.lock')]
+
+    configuration['jit_cache'], cache_options['maxsize'] = previous
+
+
+def test_jit_lock_removed(tmpdir):
+    """
+    Test that a JIT cache lock is still exclusive after its lock file has been
+    removed by a previous holder.
+    """
+    basename = os.path.join(str(tmpdir), 'foo')
+    with jit_lock(basename) as acquired:
+        assert acquired
+        os.remove('%s.lock' % basename)
+        # A newcomer locks a fresh lock file ...
+        with jit_lock(basename, blocking=False) as acquired:
+            assert acquired
+            # ... which is now exclusive
+            with jit_lock(basename, blocking=False) as acquired:
+                assert not acquired
+
+
+@skipif_yask
+def test_compile_async(tmpdir):
+    """
+    Test that an Operator may be JIT-compiled in the background, and that
+    running it waits for the compilation to complete.
+    """
+    previous = configuration['jit_cache']
+    configuration['jit_cache'] = str(tmpdir)
+
+    grid = Grid(shape=(4, 4))
+    f = Function(name='f', grid=grid)
+
+    op = Operator(Eq(f, f + 1))
+    future = op.compile_async()
+    assert op.compile_async() is future
+    op.apply()
+    assert future.done()
+    assert future.result() == op._lib.name
+    assert np.all(f.data == 1.)
+
+    configuration['jit_cache'] = previous
+
+
+@skipif_yask
+def test_compile_operators(tmpdir):
+    """
+    Test that multiple Operators can be JIT-compiled concurrently.
+    """
+    previous = configuration['jit_cache']
+    configuration['jit_cache'] = str(tmpdir)
+
+    grid = Grid(shape=(4, 4))
+    f = Function(name='f', grid=grid)
+    ops = [Operator(Eq(f, f + i)) for i in range(1, 4)]
+
+    basenames = compile_operators(*ops)
+    assert len(set(basenames)) == 3
+    assert len(jit_cache_entries(str(tmpdir))) == 3
+    for op in ops:
+        op.apply()
+    assert np.all(f.data == 6.)
+
+    configuration['jit_cache'] = previous
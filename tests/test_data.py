@@ -1,8 +1,15 @@
+import gc
+import pickle
+
 from conftest import skipif_yask
 
 import numpy as np
+import pytest
 
-from devito import Grid, Function, TimeFunction
+from devito import Eq, Grid, Function, Operator, TimeFunction, configuration
+from devito.data import (ALLOC_FLAT, ALLOC_HUGEPAGES, ALLOC_MMAP, ALLOC_NUMA_LOCAL,
+                         Data, HugepagesAllocator, NumaAllocator, PoolAllocator,
+                         PosixAllocator, default_allocator, pool_allocator)
 
 
 def test_basic_indexing():
@@ -140,6 +147,191 @@ def test_logic_indexing():
     assert np.all(v_mod.data[-2] == v_mod.data[0])
 
 
+@skipif_yask
+@pytest.mark.parametrize('shape,space_order,dtype', [
+    ((4, 4, 4), 0, np.float32),
+    ((11, 13, 21), 2, np.float32),
+    ((11, 13, 21), 4, np.float64),
+    ((40, 64), 8, np.float32),
+])
+def test_autopadding(shape, space_order, dtype):
+    """
+    Tests that, with ``autopadding``, the innermost dimension rows, as well as
+    their first domain point, are aligned to the SIMD width.
+    """
+    from devito.function import ALIGNMENT
+    items = ALIGNMENT // np.dtype(dtype).itemsize
+
+    configuration['autopadding'] = 1
+    grid = Grid(shape=shape, dtype=dtype)
+    u = TimeFunction(name='u', grid=grid, space_order=space_order)
+    v = Function(name='v', grid=grid, space_order=space_order, padding=1)
+    configuration['autopadding'] = 0
+
+    assert u.shape_allocated[-1] % items == 0
+    assert u._offset_domain[-1].left % items == 0
+    assert all(i == (0, 0) for i in u._padding[:-1])
+    assert u.shape == u.shape_domain == (2,) + shape
+    # Each row is aligned, as is the first domain point of each row
+    assert u.data_allocated.ctypes.data % ALIGNMENT == 0
+    assert u.data[0, 0].ctypes.data % ALIGNMENT == 0
+    # User-provided padding takes precedence
+    assert all(i == (1, 1) for i in v._padding)
+
+
+@skipif_yask
+def test_pool_allocator():
+    """
+    Tests that the memory released by a :class:`Data` allocated through a
+    :class:`PoolAllocator` is recycled for a similarly sized Data, and that it
+    is eventually released upon trimming the pool.
+    """
+    grid = Grid(shape=(40, 40))
+    pool = PoolAllocator(ALLOC_FLAT)
+
+    data = Data((40, 40), grid.dimensions, np.float32, allocator=pool)
+    address = data.ctypes.data
+    del data
+    assert pool.stats()['cached'] >= 40*40*4
+    assert pool.stats()['inuse'] == 0
+
+    data = Data((40, 39), grid.dimensions, np.float32, allocator=pool)
+    assert data.ctypes.data == address
+    assert pool.stats()['hits'] == 1 and pool.stats()['misses'] == 1
+    del data
+
+    pool.trim()
+    assert pool.stats()['cached'] == 0
+
+    previous = configuration['alloc_pool']
+    configuration['alloc_pool'] = 1
+    try:
+        assert isinstance(default_allocator(), PoolAllocator)
+        assert default_allocator() is default_allocator()
+    finally:
+        configuration['alloc_pool'] = previous
+
+
+@skipif_yask
+def test_pool_allocator_pickle():
+    """
+    Tests that a pickled :class:`Data` allocated through the pool of an
+    allocator is unpickled within the same pool, and that a dropped pool
+    returns the retained memory to the underlying allocator.
+    """
+    grid = Grid(shape=(40, 40))
+    pool = pool_allocator(ALLOC_FLAT)
+
+    data = Data((40, 40), grid.dimensions, np.float32, allocator=pool)
+    data[:] = 1.
+    new_data = pickle.loads(pickle.dumps(data))
+    assert new_data._allocator is pool
+    assert np.all(new_data == 1.)
+    assert pickle.loads(pickle.dumps(ALLOC_FLAT)) is ALLOC_FLAT
+    del data, new_data
+    pool.trim()
+
+    freed = []
+
+    class Allocator(PosixAllocator):
+        def free(self, c_pointer, size):
+            freed.append(size)
+            super(Allocator, self).free(c_pointer, size)
+
+    pool = PoolAllocator(Allocator())
+    data = Data((40, 40), grid.dimensions, np.float32, allocator=pool)
+    del data
+    assert not freed
+    del pool
+    gc.collect()
+    assert len(freed) == 1
+
+
+@skipif_yask
+def test_pool_allocator_numa(monkeypatch):
+    """
+    Tests that a :class:`PoolAllocator` may be stacked on top of a NUMA
+    allocator which hasn't been initialized yet.
+    """
+    monkeypatch.setattr(NumaAllocator, '_attempted_init', False)
+    monkeypatch.setattr(NumaAllocator, 'lib', None)
+    grid = Grid(shape=(40, 40))
+    pool = PoolAllocator(ALLOC_NUMA_LOCAL)
+
+    if NumaAllocator.available():
+        monkeypatch.setattr(NumaAllocator, '_attempted_init', False)
+        monkeypatch.setattr(NumaAllocator, 'lib', None)
+        data = Data((40, 40), grid.dimensions, np.float32, allocator=pool)
+        assert data.shape == (40, 40)
+        del data
+        assert pool.stats()['cached'] >= 40*40*4
+        pool.trim()
+    else:
+        with pytest.raises(RuntimeError):
+            Data((40, 40), grid.dimensions, np.float32, allocator=pool)
+
+
+@skipif_yask
+@pytest.mark.skipif(not HugepagesAllocator.available(), reason="Requires Linux")
+@pytest.mark.parametrize('shape', [(40, 40), (1024, 1024)])
+def test_hugepages_allocator(shape):
+    """
+    Tests that memory allocated through ``ALLOC_HUGEPAGES`` is aligned to huge
+    page boundaries, unless smaller than a huge page.
+    """
+    grid = Grid(shape=shape)
+    u = Function(name='u', grid=grid, allocator=ALLOC_HUGEPAGES)
+    u.data[:] = 1.
+    assert np.all(u.data == 1.)
+    if u.data_allocated.nbytes >= HugepagesAllocator.HUGEPAGE:
+        assert u.data_allocated.ctypes.data % HugepagesAllocator.HUGEPAGE == 0
+
+    previous = configuration['hugepages']
+    configuration['hugepages'] = 1
+    try:
+        assert default_allocator() is ALLOC_HUGEPAGES
+    finally:
+        configuration['hugepages'] = previous
+
+
+@skipif_yask
+@pytest.mark.skipif(not HugepagesAllocator.available(), reason="Requires Linux")
+def test_mmap_allocator(tmpdir):
+    """
+    Tests that, if ``configuration['save_dir']`` is set, the timesteps saved
+    by a :class:`TimeFunction` are mapped onto a (deleted) file, written
+    by an :class:`Operator` and read back as usual.
+    """
+    nt = 10
+    grid = Grid(shape=(11, 11))
+    previous = configuration['save_dir']
+    configuration['save_dir'] = str(tmpdir)
+    try:
+        u = TimeFunction(name='u', grid=grid, save=nt)
+        v = TimeFunction(name='v', grid=grid)
+        assert u._allocator is ALLOC_MMAP
+        assert v._allocator is not ALLOC_MMAP
+        assert np.all(u.data == 0.)
+        assert tmpdir.listdir() == []
+    finally:
+        configuration['save_dir'] = previous
+
+    op = Operator(Eq(u.forward, u + 1.))
+    op.apply(time_M=nt-2)
+    for i in range(nt):
+        assert np.all(u.data[i] == i)
+
+    # Reading back in reverse order, prefetching a few timesteps at a time
+    for i in reversed(range(nt)):
+        if i % 3 == 2:
+            ALLOC_MMAP.advise(u.data[i-2:i+1], 'willneed')
+        assert np.all(u.data[i] == i)
+    ALLOC_MMAP.advise(u.data, 'dontneed')
+    assert np.all(u.data[nt-1] == nt-1)
+    with pytest.raises(ValueError):
+        ALLOC_MMAP.advise(u.data, 'foo')
+
+
 def test_domain_vs_halo():
     """
     Tests access to domain and halo data.
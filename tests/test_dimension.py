@@ -4,7 +4,7 @@ import pytest
 from conftest import skipif_yask, configuration_override
 
 from devito import (ConditionalDimension, Grid, Function, TimeFunction, Eq, Operator,  # noqa
-                    Constant, SubDimension, DOMAIN, INTERIOR)
+                    Constant, SubDimension, SparseTimeFunction, DOMAIN, INTERIOR)
 from devito.ir.iet import Iteration, FindNodes, retrieve_iteration_tree
 
 
@@ -306,3 +306,69 @@ class TestConditionalDimension(object):
         # with u[t] = t
         # v = 16 * 1 + 64 * 2 + 144 * 3 + 256 * 4 = 1600
         assert np.all(np.allclose(v.data, 1600))
+
+
+@skipif_yask
+class TestBatchDimension(object):
+
+    def test_shape(self):
+        grid = Grid(shape=(4, 5))
+        u = TimeFunction(name='u', grid=grid, space_order=2, batch=3)
+        m = Function(name='m', grid=grid, batch=3)
+
+        assert u.indices[:2] == (grid.stepping_dim, grid.batch_dim)
+        assert m.indices[0] == grid.batch_dim
+        # No halo along the batch dimension
+        assert u.shape_allocated == (2, 3, 8, 9)
+        assert m.shape_allocated == (3, 6, 7)
+
+        with pytest.raises(ValueError):
+            Function(name='m', grid=grid, batch=3.)
+        # Only grid-based functions may be batched
+        with pytest.raises(ValueError):
+            SparseTimeFunction(name='src', grid=grid, npoint=1, nt=4, batch=3)
+
+    @pytest.mark.parametrize('dle', ['noop', 'advanced'])
+    def test_ensemble(self, dle):
+        """
+        Test that the members of an ensemble advance independently of each
+        other, exactly as if they were run one at a time.
+        """
+        grid = Grid(shape=(8, 8, 8))
+        u = TimeFunction(name='u', grid=grid, space_order=2, batch=3)
+        m = Function(name='m', grid=grid, batch=3)
+        v = TimeFunction(name='v', grid=grid, space_order=2)
+        m1 = Function(name='m1', grid=grid)
+
+        op = Operator(Eq(u.forward, u + m*u.laplace), dle=dle)
+        op1 = Operator(Eq(v.forward, v + m1*v.laplace), dle=dle)
+
+        for i in range(3):
+            m.data[i] = 0.001*(i + 1)
+            u.data[0, i, 2 + i, 4, 4] = 1.
+        op.apply(time_M=3)
+
+        for i in range(3):
+            m1.data[:] = 0.001*(i + 1)
+            v.data[:] = 0.
+            v.data[0, 2 + i, 4, 4] = 1.
+            op1.apply(time_M=3)
+            assert np.allclose(u.data[:, i], v.data)
+
+    @configuration_override('openmp', True)
+    def test_ompize(self):
+        """
+        Test that the batch dimension is parallelized, and collapsed with
+        the next parallel loop, through OpenMP.
+        """
+        grid = Grid(shape=(8, 8))
+        u = TimeFunction(name='u', grid=grid, batch=2)
+        op = Operator(Eq(u.forward, u + 1), dle='openmp')
+
+        iterations = FindNodes(Iteration).visit(op)
+        assert iterations[1].dim is grid.batch_dim
+        assert 'omp for collapse' in str(iterations[1].pragmas[0])
+        assert iterations[1].is_Parallel
+
+        op.apply(time_M=1)
+        assert np.all(u.data[0] == 2.)
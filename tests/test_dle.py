@@ -2,18 +2,24 @@ from __future__ import absolute_import
 
 from functools import reduce
 from operator import mul
+import os
 import numpy as np
 import pytest
 from conftest import skipif_yask
 from sympy import solve
 
-from conftest import EVAL
+from conftest import EVAL, array, function, x, y, z
 
 from devito.dle import transform
-from devito import Grid, Function, TimeFunction, Eq, Operator
+from devito import (Grid, Function, TimeFunction, SparseFunction, Eq, Operator,
+                    configuration)
+from devito.dle.backends import default_nthreads, get_simd_flag
 from devito.ir.equations import DummyEq
 from devito.ir.iet import (ELEMENTAL, Expression, Callable, Iteration, List, tagger,
-                           Transformer, FindNodes, iet_analyze, retrieve_iteration_tree)
+                           Transformer, FindNodes, FindSymbols, iet_analyze,
+                           retrieve_iteration_tree)
+from devito.symbolics import retrieve_indexed
+from examples.seismic.tti.tti_example import tti_setup
 from unittest.mock import patch
 
 
@@ -267,6 +273,42 @@ def test_cache_blocking_structure(blockinner, expected):
         assert 'omp for' in outermost.pragmas[0].value
 
 
+@skipif_yask
+@pytest.mark.parametrize("blockinner", [False, True])
+@pytest.mark.parametrize("blocklevels", [1, 2])
+def test_cache_blocking_no_remainders_structure(blockinner, blocklevels):
+    _, op = _new_operator1((10, 31, 45), dle=('blocking,openmp',
+                                              {'blockalways': True,
+                                               'blockshape': (2, 9, 2),
+                                               'blockinner': blockinner,
+                                               'blocklevels': blocklevels,
+                                               'blockremainder': False}))
+
+    # No remainder loops, as the partial blocks are computed by the blocked nest
+    iterations = retrieve_iteration_tree(op)
+    assert len(iterations) == 1
+    assert not any(i.is_Remainder for i in iterations[0])
+    outermost = iterations[0][0]
+    assert len(outermost.pragmas) == 1
+    assert 'omp for' in outermost.pragmas[0].value
+
+
+@skipif_yask
+@pytest.mark.parametrize("shape", [(10, 45), (20, 33), (45, 31, 45)])
+@pytest.mark.parametrize("blockshape", [2, 7, (13, 20), (11, 15, 23)])
+@pytest.mark.parametrize("blockinner", [False, True])
+@pytest.mark.parametrize("blocklevels", [1, 2])
+def test_cache_blocking_no_remainders(shape, blockshape, blockinner, blocklevels):
+    wo_blocking, _ = _new_operator2(shape, 2, dle='noop')
+    w_blocking, _ = _new_operator2(shape, 2,
+                                   dle=('blocking', {'blockshape': blockshape,
+                                                     'blockinner': blockinner,
+                                                     'blocklevels': blocklevels,
+                                                     'blockremainder': False}))
+
+    assert np.equal(wo_blocking.data, w_blocking.data).all()
+
+
 @skipif_yask
 @pytest.mark.parametrize("shape", [(10,), (10, 45), (10, 31, 45)])
 @pytest.mark.parametrize("blockshape", [2, 7, (3, 3), (2, 9, 1)])
@@ -294,6 +336,61 @@ def test_cache_blocking_time_loop(shape, time_order, blockshape, blockinner):
     assert np.equal(wo_blocking.data, w_blocking.data).all()
 
 
+@skipif_yask
+@pytest.mark.parametrize("shape,blockinner", [
+    ((10, 45), True),
+    ((10, 31, 45), False),
+    ((10, 31, 45), True)
+])
+@pytest.mark.parametrize("blockshape", [None, 7, (13, 20), (9, 15, 23)])
+def test_cache_blocking_two_levels(shape, blockinner, blockshape):
+    wo_blocking, _ = _new_operator1(shape, dle='noop')
+    w_blocking, op = _new_operator1(shape, dle=('blocking', {'blockalways': True,
+                                                             'blockshape': blockshape,
+                                                             'blockinner': blockinner,
+                                                             'blocklevels': 2}))
+
+    assert np.equal(wo_blocking.data, w_blocking.data).all()
+    # The sub-block sizes are Operator arguments, alongside the block sizes
+    dims = [i.dim.name for i in retrieve_iteration_tree(op)[0]]
+    nblocked = len([i for i in dims if i.endswith('_block')])
+    assert nblocked > 1
+    assert dims[nblocked:2*nblocked] == [i.replace('_block', '_subblock')
+                                         for i in dims[:nblocked]]
+    assert all(i in [p.name for p in op.parameters]
+               for i in ['x0_block_size', 'x0_subblock_size'])
+
+
+@skipif_yask
+@pytest.mark.parametrize("blockshape,subblockshape", [
+    ((16, 16), (4, 4)),
+    ((13, 9), (4, 5)),
+    ((8, 8), (100, 3)),
+])
+def test_cache_blocking_two_levels_arguments(blockshape, subblockshape):
+    """
+    Test that block and sub-block sizes may be changed at runtime, even to
+    sub-blocks that aren't a divisor of the enclosing blocks.
+    """
+    grid = Grid(shape=(45, 37, 21))
+    u = TimeFunction(name='u', grid=grid, space_order=4)
+    eq = Eq(u.forward, u + 0.001*u.laplace + 1.)
+
+    op0 = Operator(eq, dle='noop')
+    u.data[:, 20, 15, 10] = 1.
+    op0.apply(time_M=5)
+    expected = u.data.copy()
+
+    op1 = Operator(eq, dle=('blocking', {'blocklevels': 2}))
+    args = dict(zip(['x0_block_size', 'y0_block_size'], blockshape))
+    args.update(zip(['x0_subblock_size', 'y0_subblock_size'], subblockshape))
+    assert all(op1.arguments(time_M=5, **args)[k] == v for k, v in args.items())
+    u.data[:] = 0.
+    u.data[:, 20, 15, 10] = 1.
+    op1.apply(time_M=5, **args)
+    assert np.all(u.data == expected)
+
+
 @skipif_yask
 @pytest.mark.parametrize("shape,blockshape", [
     ((25, 25, 46), (None, None, None)),
@@ -400,6 +497,198 @@ def test_loops_ompized(fa, fb, fc, fd, t0, t1, t2, t3, exprs, expected, iters):
                 assert 'omp for' not in k.value
 
 
+@skipif_yask
+def test_openmp_runtime_arguments():
+    """
+    Test that the number of threads and the loop schedule are Operator
+    arguments, which may be changed without recompiling.
+    """
+    grid = Grid(shape=(16, 16, 16))
+    u = TimeFunction(name='u', grid=grid, space_order=2)
+    op = Operator(Eq(u.forward, u + 0.001*u.laplace),
+                  dle=('blocking,openmp', {'blockalways': True}))
+
+    assert 'omp for schedule(runtime)' in str(op)
+    assert 'omp parallel num_threads(nthreads)' in str(op)
+    assert 'omp_set_schedule(sched_kind, sched_chunk)' in str(op)
+    assert all(i in [p.name for p in op.parameters]
+               for i in ['nthreads', 'sched_kind', 'sched_chunk'])
+
+    u.data[0, 8, 8, 8] = 1.
+    op.apply(time_M=3)
+    expected = u.data.copy()
+    # Run with 2 threads and a dynamic schedule, with chunks of size 1
+    u.data[:] = 0.
+    u.data[0, 8, 8, 8] = 1.
+    op.apply(time_M=3, nthreads=2, sched_kind=2, sched_chunk=1)
+    assert np.all(u.data == expected)
+
+
+@pytest.mark.parametrize('value,expected', [('8', 8), ('8,1', 8), (' 4, 2', 4)])
+def test_default_nthreads(value, expected):
+    """
+    Test that the default number of threads is read from ``OMP_NUM_THREADS``,
+    also when a list of values is given for nested parallelism.
+    """
+    with patch.dict(os.environ, {'OMP_NUM_THREADS': value}):
+        assert default_nthreads() == expected
+
+
+@pytest.mark.parametrize('value', ['', 'abc', '0'])
+def test_default_nthreads_fallback(value):
+    """
+    Test that, without a valid ``OMP_NUM_THREADS``, the default number of
+    threads is the number of cores the process may run on.
+    """
+    ncores = len(os.sched_getaffinity(0))
+    with patch.dict(os.environ, {'OMP_NUM_THREADS': value}):
+        assert default_nthreads() == ncores
+    with patch.dict(os.environ):
+        os.environ.pop('OMP_NUM_THREADS', None)
+        with patch.object(os, 'sched_getaffinity', return_value={0}):
+            assert default_nthreads() == 1
+
+
+@skipif_yask
+@pytest.mark.parametrize('space_order,time_order', [(2, 1), (4, 1), (2, 2)])
+@pytest.mark.parametrize('tile', [1, 3, 8])
+def test_time_tiling(space_order, time_order, tile):
+    """
+    Test that time tiling computes the same results as space blocking,
+    regardless of the time and space tile sizes.
+    """
+    grid = Grid(shape=(23, 19, 17))
+    u = TimeFunction(name='u', grid=grid, space_order=space_order,
+                     time_order=time_order)
+    eq = Eq(u.forward, u + 0.001*u.laplace + 1.)
+
+    op0 = Operator(eq, dle='advanced')
+    u.data[:] = 0.
+    u.data[:, 11, 9, 8] = 1.
+    op0.apply(time_M=10)
+    expected = u.data.copy()
+
+    op1 = Operator(eq, dle=('timetiling,blocking', {'timetile': tile}))
+    assert 'time0_tile' in str(op1)
+    assert any(i.dim.name == 'x0_tile' for i in FindNodes(Iteration).visit(op1))
+    u.data[:] = 0.
+    u.data[:, 11, 9, 8] = 1.
+    op1.apply(time_M=10)
+    assert np.all(u.data == expected)
+
+    # Tile sizes are runtime arguments
+    u.data[:] = 0.
+    u.data[:, 11, 9, 8] = 1.
+    op1.apply(time_M=10, time0_tile_size=5, x0_tile_size=4, y0_tile_size=7)
+    assert np.all(u.data == expected)
+
+
+@skipif_yask
+def test_time_tiling_fallback():
+    """
+    Test that time loops which cannot be time-tiled (e.g., because of a
+    sparse injection) are left to space blocking.
+    """
+    grid = Grid(shape=(16, 16, 16))
+    u = TimeFunction(name='u', grid=grid, space_order=2)
+    src = SparseFunction(name='src', grid=grid, npoint=1, ntime=10)
+    src.coordinates.data[:] = 8.
+    src.data[:] = 1.
+    eqs = [Eq(u.forward, u + 0.001*u.laplace)] + src.inject(u.forward, expr=src)
+
+    op = Operator(eqs, dle=('timetiling,blocking', {'blockalways': True}))
+    assert 'time0_tile' not in str(op)
+    assert any(i.dim.name == 'x0_block' for i in FindNodes(Iteration).visit(op))
+
+
+@skipif_yask
+def test_linebuffers(iters):
+    """
+    Test that the temporaries written and read within the same iteration of
+    the outer loops are contracted into line buffers along the innermost
+    dimension, while the others are left untouched.
+    """
+    r0 = array('rlb0', (5, 7, 8), (x, y, z))
+    r1 = array('rlb1', (5, 7, 8), (x, y, z))
+    u = function('ulb', (5, 7, 8), (x, y, z))
+    v = function('vlb', (5, 7, 8), (x, y, z))
+    e0 = Expression(DummyEq(r0.indexed[x, y, z], u.indexed[x, y, z]*2.))
+    e1 = Expression(DummyEq(r1.indexed[x, y, z], u.indexed[x, y, z]*3.))
+    e2 = Expression(DummyEq(v.indexed[x, y, z], r0.indexed[x, y, z] +
+                            r0.indexed[x, y, z + 1] + r1.indexed[x, y + 1, z]))
+    # for x
+    #   for y
+    #     for z
+    #       e0
+    #       e1
+    #     for z
+    #       e2
+    ast = iters[6](iters[7]([iters[8]([e0, e1]), iters[8](e2)]))
+
+    nodes = transform(ast, mode='linebuffers').nodes
+    assert r0.indices == (z,) and r0._mem_stack
+    assert r1.indices == (x, y, z) and r1._mem_heap
+    exprs = FindNodes(Expression).visit(nodes)
+    assert exprs[0].expr.lhs == r0.indexed[z]
+    assert {i for i in retrieve_indexed(exprs[2].expr.rhs) if i.function is r0} ==\
+        {r0.indexed[z], r0.indexed[z + 1]}
+    assert exprs[1].expr == e1.expr
+
+
+@skipif_yask
+def test_linebuffers_rotating_rows():
+    """
+    Test that the temporaries produced and consumed by two distinct loop nests
+    are contracted into rotating rows along the outermost dimension, without
+    changing the numerical results.
+    """
+    kwargs = dict(shape=(20, 20, 20), space_order=4, tn=50., nbpml=4, dse='aggressive')
+
+    solver0 = tti_setup(dle='noop', **kwargs)
+    rec0, u0, v0, _ = solver0.forward(kernel='centered')
+
+    solver1 = tti_setup(dle='linebuffers', **kwargs)
+    op = solver1.op_fwd(kernel='centered', save=False)
+    arrays = [i for i in FindSymbols().visit(op) if i.is_Array and i._mem_heap]
+    rotating = [i for i in arrays if i.indices[0].is_Modulo]
+    assert len(rotating) == 2
+    assert all(i.shape[0] == 3 for i in rotating)
+    rec1, u1, v1, _ = solver1.forward(kernel='centered')
+
+    assert np.allclose(u0.data, u1.data, atol=0)
+    assert np.allclose(v0.data, v1.data, atol=0)
+    assert np.allclose(rec0.data, rec1.data, atol=0)
+
+
+@skipif_yask
+@pytest.mark.skipif(get_simd_flag() is None, reason="Unknown SIMD width")
+def test_simd_aligned():
+    """
+    Test that the ``aligned`` clause is emitted for the tensors whose rows,
+    along the vectorized dimension, are provably aligned to the SIMD width.
+    """
+    grid = Grid(shape=(45, 37, 21))
+
+    def pragmas(op):
+        return [i for i in str(op).split('\n') if 'omp simd' in i]
+
+    u = TimeFunction(name='u', grid=grid, space_order=4)
+    op = Operator(Eq(u.forward, u + 0.001*u.laplace + 1.), dle='advanced')
+    assert pragmas(op) and all('aligned' not in i for i in pragmas(op))
+    u.data[:, 20, 15, 10] = 1.
+    op.apply(time_M=5)
+    expected = u.data.copy()
+
+    configuration['autopadding'] = 1
+    u = TimeFunction(name='u', grid=grid, space_order=4)
+    configuration['autopadding'] = 0
+    op = Operator(Eq(u.forward, u + 0.001*u.laplace + 1.), dle='advanced')
+    assert pragmas(op) and all('aligned(u:' in i for i in pragmas(op))
+    u.data[:, 20, 15, 10] = 1.
+    op.apply(time_M=5)
+    assert np.all(u.data == expected)
+
+
 @skipif_yask
 @pytest.mark.parametrize("shape", [(41,), (20, 33), (45, 31, 45)])
 def test_composite_transformation(shape):
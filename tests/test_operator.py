@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
 from collections import OrderedDict
+import csv
+import json
 
 from conftest import EVAL, dims, time, x, y, z, skipif_yask
 
@@ -14,6 +16,7 @@ from devito.foreign import Operator as OperatorForeign
 from devito.ir.iet import (Expression, Iteration, ArrayCast, FindNodes,
                            IsPerfectIteration, retrieve_iteration_tree)
 from devito.ir.support import Any, Backward, Forward
+from devito.profiling import PerformanceSummary, Trace
 from devito.symbolics import indexify
 
 
@@ -48,7 +51,8 @@ class TestCodeGen(object):
         const = Constant(name='constant')
         eqn = Eq(a_dense, a_dense + 2.*const)
         op = Operator(eqn)
-        assert len(op.parameters) == 5
+        # With OpenMP, the number of threads and the loop schedule are arguments too
+        assert len(op.parameters) == (8 if configuration['openmp'] else 5)
         assert op.parameters[0].name == 'a_dense'
         assert op.parameters[0].is_Tensor
         assert op.parameters[1].name == 'constant'
@@ -102,6 +106,94 @@ class TestCodeGen(object):
         cast = casts[0]
         assert cast.ccode.data.replace(' ', '') == expected
 
+    @skipif_yask
+    def test_hardware_counters(self):
+        """Tests that, in advanced profiling mode, hardware counters are read
+        around each profiled section, and that the run does not fail if they
+        cannot be accessed."""
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid)
+
+        previous = configuration['profiling']
+        configuration['profiling'] = 'advanced'
+        try:
+            op = Operator(Eq(u.forward, u + 1))
+        finally:
+            configuration['profiling'] = previous
+
+        assert 'perf_fds' in str(op)
+        assert 'timers->section_0_cycles' in str(op)
+        summary = op.apply(time_M=2)
+        assert np.all(u.data[1] == 3.)
+        assert list(summary['main'].counters) == ['cycles', 'instructions', 'llcmisses']
+        assert all(i is None or i > 0 for i in summary['main'].counters.values())
+
+    @skipif_yask
+    def test_trace(self):
+        """Tests that, in trace profiling mode, an event is recorded for each
+        profiled section at each timestep, and that the trace is a ring buffer."""
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid)
+
+        previous = configuration['profiling']
+        configuration['profiling'] = 'trace'
+        try:
+            op = Operator(Eq(u.forward, u + 1))
+        finally:
+            configuration['profiling'] = previous
+
+        summary = op.apply(time_M=2)
+        assert np.all(u.data[1] == 3.)
+        events = summary.trace.events
+        kernel = events[events[:, 2] == -1]
+        assert list(kernel[:, 1]) == [0, 1, 2]
+        assert np.all(kernel[:, 4] >= kernel[:, 3])
+        chrome = summary.trace.to_chrome()
+        assert len([i for i in chrome['traceEvents'] if i['ph'] == 'X']) == len(events)
+
+        trace = Trace(capacity=2)
+        op.apply(time_M=2, trace=trace)
+        assert trace.dropped == len(events) - 2
+        assert len(trace.events) == 2
+        assert list(trace.events[-1][1:3]) == [2, -1]
+
+    @skipif_yask
+    def test_performance_report(self, tmpdir):
+        """Tests that a performance report is written for each run, and that
+        the performance history is extended with the report of each run."""
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid)
+        op = Operator(Eq(u.forward, u + 1))
+
+        report = str(tmpdir.join('report.csv'))
+        history = str(tmpdir.join('history.jsonl'))
+        previous = configuration['profiling_report'], configuration['profiling_history']
+        configuration['profiling_report'] = report
+        configuration['profiling_history'] = history
+        try:
+            op.apply(time_M=2)
+            summary = op.apply(time_M=2)
+        finally:
+            configuration['profiling_report'], configuration['profiling_history'] =\
+                previous
+
+        with open(report) as f:
+            rows = list(csv.DictReader(f))
+        assert [i['section'] for i in rows] == list(summary)
+        assert json.loads(rows[0]['itershape']) == list(summary['main'].itershape)
+        assert rows[0]['dse'] == op._dse_mode
+        assert rows[0]['code'] == summary.metadata['code']
+
+        with open(history) as f:
+            records = [json.loads(i) for i in f]
+        assert len(records) == 2*len(summary)
+        assert records[-1] == json.loads(json.dumps(summary.records()[-1]))
+
+        # The metadata of a run doesn't leak into the summaries of other runs
+        summary.metadata['foo'] = 'bar'
+        assert 'foo' not in op.apply(time_M=2).metadata
+        assert 'foo' not in PerformanceSummary().metadata
+
 
 @skipif_yask
 class TestArithmetic(object):
@@ -368,7 +460,7 @@ class TestArguments(object):
         Utility function to verify a parameter set against expected
         values.
         """
-        boilerplate = ['timers']
+        boilerplate = ['timers', 'nthreads', 'sched_kind', 'sched_chunk']
         parameters = [p.name for p in parameters]
         for exp in expected:
             if exp not in parameters + boilerplate:
@@ -790,6 +882,61 @@ class TestArguments(object):
         assert a.data[-2] == 3.
 
 
+@skipif_yask
+class TestBoundOperator(object):
+
+    def test_bind(self):
+        """Test that a bound Operator behaves as the Operator itself."""
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid, save=10)
+        v = TimeFunction(name='v', grid=grid, save=10)
+        op = Operator(Eq(u.forward, u + 1))
+
+        op.apply(time_m=2, time_M=5)
+        run = op.bind(u=v)
+        run(time_m=2, time_M=5)
+        assert np.all(v.data == u.data)
+
+        # Only the overridden arguments change from one run to the next
+        run(time_m=0, time_M=0)
+        assert np.all(v.data[1] == 1.)
+        assert np.all(v.data[3:7] == u.data[3:7])
+        assert np.all(u.data[1] == 0.)
+
+        summary = run.summary()
+        assert summary['main'].itershape[0] == 1
+
+    def test_bind_reallocation(self):
+        """
+        Test that a bound Operator notices that the data of a bound
+        Function has been reallocated.
+        """
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid, save=4)
+        op = Operator(Eq(u.forward, u + 1))
+
+        run = op.bind()
+        run(time_M=1)
+        assert np.all(u.data[2] == 2.)
+
+        # Drop the data, which gets reallocated (and zeroed) at the next run
+        u._data = None
+        run(time_m=1, time_M=1)
+        assert np.all(u.data[1] == 0.)
+        assert np.all(u.data[2] == 1.)
+
+    def test_bind_invalid(self):
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid)
+        op = Operator(Eq(u.forward, u + 1))
+
+        run = op.bind(time_M=2)
+        with pytest.raises(ValueError):
+            run(u=u)
+        with pytest.raises(ValueError):
+            run(foo=1)
+
+
 @skipif_yask
 class TestDeclarator(object):
 
@@ -1186,6 +1333,44 @@ class TestLoopScheduler(object):
         assert trees[0][-1].nodes[0].write == u1
         assert trees[0][-1].nodes[1].write == u2
 
+    def test_fusion_cost_model(self):
+        """
+        Test that, with the 'cost' fusion policy, equations are fused based on
+        data reuse rather than on program order, and that loop nests not sharing
+        any data are kept distributed once the memory streams budget is exceeded.
+        """
+        from devito.ir.clusters import algorithms
+
+        grid = Grid(shape=(4, 4, 4))
+        u, v, w = [TimeFunction(name=i, grid=grid) for i in 'uvw']
+        a = Function(name='a', grid=grid)
+        a.data[:] = 1.
+        eqns = [Eq(u.forward, u + a), Eq(v.forward, v + 1.), Eq(w.forward, w + u.forward)]
+
+        op = Operator(eqns, dse='noop', dle='noop')
+        trees = retrieve_iteration_tree(op)
+        assert len(trees) == 1
+
+        previous = configuration['fusion'], algorithms.MAX_STREAMS
+        configuration['fusion'], algorithms.MAX_STREAMS = 'cost', 4
+        try:
+            op = Operator(eqns, dse='noop', dle='noop')
+        finally:
+            configuration['fusion'], algorithms.MAX_STREAMS = previous
+        trees = retrieve_iteration_tree(op)
+        assert len(trees) == 2
+        # The time loop is still shared
+        assert trees[0][0] is trees[1][0]
+        assert trees[0][1] is not trees[1][1]
+        # /w/ is fused with /u/, its producer
+        assert [i.write for i in FindNodes(Expression).visit(trees[0][-1])] == [u, w]
+        assert [i.write for i in FindNodes(Expression).visit(trees[1][-1])] == [v]
+
+        op.apply(time_M=0)
+        assert np.all(u.data[1] == 1.)
+        assert np.all(v.data[1] == 1.)
+        assert np.all(w.data[1] == 1.)
+
     def test_flow_detection(self):
         """
         Test detection of spatial flow directions inside a time loop.
@@ -1260,6 +1445,57 @@ class TestLoopScheduler(object):
         assert all(trees[0][0] is i[0] for i in trees)
 
 
+@skipif_yask
+class TestOperatorCache(object):
+
+    def setup_method(self):
+        self.capacity = configuration['operator_cache']
+        configuration['operator_cache'] = 2
+
+    def teardown_method(self):
+        configuration['operator_cache'] = self.capacity
+        clear_cache()
+
+    def test_cache_hit(self):
+        """Test that equivalent Operators share the same lowered IET."""
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid)
+        v = TimeFunction(name='v', grid=grid)
+
+        op0 = Operator(Eq(u.forward, u + 1))
+        op1 = Operator(Eq(u.forward, u + 1))
+        assert op0.body is op1.body
+        assert str(op0.ccode) == str(op1.ccode)
+
+        # Different input or different lowering options imply a cache miss
+        assert Operator(Eq(v.forward, v + 1)).body is not op0.body
+        assert Operator(Eq(u.forward, u + 1), dle='noop').body is not op0.body
+
+        op1.apply(time_M=2)
+        assert np.all(u.data[1] == 3.)
+
+    def test_cache_eviction(self):
+        """Test LRU eviction and explicit invalidation."""
+        from devito.operator import operator_cache
+
+        grid = Grid(shape=(4, 4))
+        u = TimeFunction(name='u', grid=grid)
+        v = TimeFunction(name='v', grid=grid)
+        w = TimeFunction(name='w', grid=grid)
+
+        op0 = Operator(Eq(u.forward, u + 1))
+        Operator(Eq(v.forward, v + 1))
+        assert len(operator_cache) == 2
+        Operator(Eq(w.forward, w + 1))
+        assert len(operator_cache) == 2
+        assert Operator(Eq(u.forward, u + 1)).body is not op0.body
+
+        operator_cache.invalidate(u)
+        assert len(operator_cache) == 1
+        clear_cache()
+        assert len(operator_cache) == 0
+
+
 @skipif_yask
 @pytest.mark.xfail
 @pytest.mark.skipif(configuration['backend'] != 'foreign',
@@ -0,0 +1,158 @@
+from __future__ import absolute_import
+
+import pickle
+
+import numpy as np
+import pytest
+from conftest import skipif_yask
+
+import devito
+from devito import (Grid, Function, TimeFunction, SparseTimeFunction, Constant,
+                    Operator, Eq, configuration)
+from devito.compiler import jit_cache_entries
+from devito.dimension import SubDimension, ConditionalDimension
+
+
+def test_dimension():
+    grid = Grid(shape=(3, 4))
+    x, y = grid.dimensions
+    time = grid.time_dim
+    t = grid.stepping_dim
+    xi = SubDimension('xi', x, 1, 1)
+    tc = ConditionalDimension('tc', time, factor=2)
+
+    for d in [x, time, t, xi, tc]:
+        new_d = pickle.loads(pickle.dumps(d))
+        assert type(new_d) is type(d)
+        assert new_d.name == d.name
+        assert new_d.spacing.name == d.spacing.name
+
+    new_t = pickle.loads(pickle.dumps(t))
+    assert new_t.parent.name == time.name
+    new_xi = pickle.loads(pickle.dumps(xi))
+    assert (new_xi.lower, new_xi.upper) == (1, 1)
+    new_tc = pickle.loads(pickle.dumps(tc))
+    assert new_tc.factor == 2
+
+
+def test_constant():
+    c = Constant(name='c', value=3.)
+    new_c = pickle.loads(pickle.dumps(c))
+    assert new_c.name == c.name
+    assert new_c.dtype == c.dtype
+    assert new_c.data == 3.
+    assert isinstance(new_c, Constant)
+
+
+@skipif_yask
+@pytest.mark.parametrize('FunctionType', [Function, TimeFunction])
+def test_function(FunctionType):
+    grid = Grid(shape=(3, 4))
+    f = FunctionType(name='f', grid=grid, space_order=2,
+                     initializer=lambda data: data.fill(2.))
+    f.data  # Trigger allocation, so that the initializer need not be pickled
+
+    new_f = pickle.loads(pickle.dumps(f))
+    assert isinstance(new_f, FunctionType)
+    assert new_f.name == f.name
+    assert new_f.shape == f.shape
+    assert new_f.space_order == f.space_order
+    assert [i.name for i in new_f.dimensions] == [i.name for i in f.dimensions]
+    assert new_f.function is new_f
+    assert np.all(new_f.data_allocated == 2.)
+
+    # The unpickled data is independent of the original one
+    new_f.data[:] = 3.
+    assert np.all(f.data == 2.)
+
+
+@skipif_yask
+def test_timefunction_modulo():
+    grid = Grid(shape=(3, 4))
+    u = TimeFunction(name='u', grid=grid, time_order=2)
+    u.data[:] = np.arange(u.data.size).reshape(u.shape)
+
+    new_u = pickle.loads(pickle.dumps(u))
+    assert np.all(new_u.data[4] == u.data[1])
+
+
+@skipif_yask
+def test_sparse_function():
+    grid = Grid(shape=(3, 4))
+    sf = SparseTimeFunction(name='sf', grid=grid, npoint=3, nt=5)
+    sf.coordinates.data[:] = 1.
+    sf.data[:] = 4.
+
+    new_sf = pickle.loads(pickle.dumps(sf))
+    assert new_sf.npoint == sf.npoint
+    assert new_sf.nt == sf.nt
+    assert np.all(new_sf.coordinates.data == 1.)
+    assert np.all(new_sf.data == 4.)
+
+
+@skipif_yask
+class TestOperator(object):
+
+    def _build(self, **kwargs):
+        grid = Grid(shape=(12, 12, 12))
+        u = TimeFunction(name='u', grid=grid, space_order=2)
+        c = Constant(name='c', value=0.1)
+        u.data[0, 6, 6, 6] = 1.
+        return u, Operator(Eq(u.forward, u + c*u.laplace), **kwargs)
+
+    def test_operator(self):
+        """
+        Test that an unpickled Operator computes the same result as the
+        original one, on its own (unpickled) data.
+        """
+        u, op = self._build()
+        new_op = pickle.loads(pickle.dumps(op))
+        new_u = [i for i in new_op.input if i.name == 'u'][0]
+
+        assert str(new_op.ccode) == str(op.ccode)
+        assert [i.name for i in new_op.parameters] == [i.name for i in op.parameters]
+
+        op.apply(time_M=2)
+        summary = new_op.apply(time_M=2)
+        assert np.all(new_u.data == u.data)
+        assert summary.keys() == op.profiler.summary(op.arguments(time_M=2),
+                                                     op._dtype).keys()
+
+        # Unpickled Operators may run on user-provided data too
+        new_op.apply(u=u, time_M=2)
+        assert not np.all(new_u.data == u.data)
+
+    def test_operator_shared_object(self, tmpdir, monkeypatch):
+        """
+        Test that the shared object is pickled along with a compiled Operator,
+        so that the unpickled Operator does not need to compile any code.
+        """
+        u, op = self._build()
+        op.cfunction
+        pickled = pickle.dumps(op)
+
+        previous = configuration['jit_cache']
+        configuration['jit_cache'] = str(tmpdir)
+
+        def nocompile(*args, **kwargs):
+            raise AssertionError("The unpickled Operator must not be compiled")
+        monkeypatch.setattr(devito.compiler, 'extension_file_from_string', nocompile)
+
+        new_op = pickle.loads(pickled)
+        assert len(jit_cache_entries(str(tmpdir))) == 1
+        new_op.apply(time_M=2)
+        assert new_op.compile.startswith(str(tmpdir))
+
+        configuration['jit_cache'] = previous
+
+    def test_operator_blocking(self):
+        u, op = self._build(dle=('blocking', {'blockalways': True}))
+        assert len(op.dle_args) > 0
+        new_op = pickle.loads(pickle.dumps(op))
+        assert [i.argument.name for i in new_op.dle_args] ==\
+            [i.argument.name for i in op.dle_args]
+
+        new_u = [i for i in new_op.input if i.name == 'u'][0]
+        op.apply(time_M=2)
+        new_op.apply(time_M=2, autotune=True)
+        assert np.allclose(new_u.data, u.data)
@@ -2,7 +2,8 @@ import numpy as np
 from sympy import solve
 from conftest import skipif_yask
 
-from devito import Grid, Eq, Operator, TimeFunction
+from devito import (ConditionalDimension, Grid, Eq, Operator, SnapshotStream,
+                    TimeFunction)
 
 
 def initial(nt, nx, ny):
@@ -39,3 +40,30 @@ def run_simulation(save=False, dx=0.01, dy=0.01, a=0.5, timesteps=100):
 @skipif_yask
 def test_save():
     assert(np.array_equal(run_simulation(True), run_simulation()))
+
+
+@skipif_yask
+def test_streaming(tmpdir):
+    """
+    Tests that the snapshots streamed to disk by a :class:`SnapshotStream`
+    match those saved in memory along a :class:`ConditionalDimension`.
+    """
+    nt = 19
+    factor = 4
+    nsnaps = (nt+factor-1)//factor
+    grid = Grid(shape=(11, 11))
+    time_sub = ConditionalDimension('t_sub', parent=grid.time_dim, factor=factor)
+
+    u = TimeFunction(name='u', grid=grid)
+    usave = TimeFunction(name='usave', grid=grid, save=nsnaps, time_dim=time_sub)
+    Operator([Eq(u.forward, u + 1.), Eq(usave, u)]).apply(time_M=nt-2)
+
+    v = TimeFunction(name='v', grid=grid)
+    op = Operator(Eq(v.forward, v + 1.))
+    with SnapshotStream(v, time_sub, str(tmpdir.join('v.bin'))) as stream:
+        summaries = stream.run(op, time_M=nt-2)
+        assert len(summaries) == nsnaps
+        assert stream.nsnaps == nsnaps
+        assert np.all(stream.snapshots == usave.data)
+    assert np.all(v.data[(nt-1) % 2] == nt-1)
+    assert np.all(stream.snapshots == usave.data)
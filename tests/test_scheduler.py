@@ -0,0 +1,80 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pytest
+from conftest import skipif_yask
+
+from devito import (Grid, Function, TimeFunction, Operator, Eq, ShotScheduler,
+                    configuration)
+
+
+def setup_shot(shot, workspace):
+    workspace['u'].data[:] = 0.
+    workspace['u'].data[0, shot, shot] = 1.
+    return {'time_M': 3}
+
+
+def collect_shot(shot, workspace, summary):
+    return workspace['u'].data[0].copy()
+
+
+@skipif_yask
+@pytest.mark.parametrize('nworkers', [1, 3])
+def test_scheduler(nworkers):
+    """
+    Test that shots run concurrently compute the same results as
+    shots run one after the other.
+    """
+    grid = Grid(shape=(8, 8))
+    u = TimeFunction(name='u', grid=grid, space_order=2)
+    m = Function(name='m', grid=grid)
+    m.data[:] = 0.001
+    op = Operator(Eq(u.forward, u + m*u.laplace))
+
+    workspace = lambda: {'u': TimeFunction(name='u', grid=grid, space_order=2)}
+    scheduler = ShotScheduler(op, workspace, nworkers=nworkers)
+    shots = list(range(1, 7))
+    results = scheduler.run(shots, setup_shot, collect_shot)
+
+    for shot, result in zip(shots, results):
+        setup_shot(shot, {'u': u})
+        op.apply(time_M=3)
+        assert np.all(result == u.data[0])
+        assert result[shot, shot] != 1.
+
+
+@skipif_yask
+def test_scheduler_summaries():
+    grid = Grid(shape=(4, 4))
+    u = TimeFunction(name='u', grid=grid, save=5)
+    op = Operator(Eq(u.forward, u + 1))
+
+    scheduler = ShotScheduler(op, lambda: {'u': TimeFunction(name='u', grid=grid,
+                                                             save=5)}, nworkers=2)
+    summaries = scheduler.run([{'time_M': 1}, {'time_M': 3}])
+    assert [i['main'].itershape[0] for i in summaries] == [2, 4]
+    # The default data is never written by the scheduler
+    assert np.all(u.data == 0.)
+
+
+@skipif_yask
+def test_scheduler_openmp():
+    previous = configuration['openmp']
+    configuration['openmp'] = 1
+
+    grid = Grid(shape=(8, 8))
+    u = TimeFunction(name='u', grid=grid, space_order=2)
+    op = Operator(Eq(u.forward, u + 0.001*u.laplace), dle='openmp')
+    assert op._lib is None
+
+    workspace = lambda: {'u': TimeFunction(name='u', grid=grid, space_order=2)}
+    scheduler = ShotScheduler(op, workspace, nworkers=2, nthreads=1)
+    shots = [2, 3, 4, 5]
+    results = scheduler.run(shots, setup_shot, collect_shot)
+
+    for shot, result in zip(shots, results):
+        setup_shot(shot, {'u': u})
+        op.apply(time_M=3)
+        assert np.all(result == u.data[0])
+
+    configuration['openmp'] = previous